@@ -1,17 +1,107 @@
 # app.py
 
 import os
-from flask import Flask, request, jsonify, send_file
+import re
+import json
+import time
+import uuid
+import logging
+import contextvars
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from dotenv import load_dotenv
-from scripts.parser import call_gemini_for_spec
-from scripts.template_matcher import match_and_fill_template
-from scripts.kicad_generator import generate_kicad_schematic
+from scripts.parser import spec_cache_stats, spec_path_stats
+from scripts.pipeline import run_pipeline, stream_pipeline, PipelineError
+from scripts.jobs import get_job_manager, JobQueueFull
+from scripts.template_registry import get_template_registry
+from scripts.artifact_cache import artifact_cache_stats
+from scripts.batch import run_batch, BATCH_MAX_ITEMS, BATCH_CONCURRENCY
+from scripts.sweep import SweepError, iter_csv, point_specs, run_sweep, sweep_json
+from scripts.generation_pool import get_generation_pool
+from scripts.metrics import IN_FLIGHT, REQUESTS, REQUEST_SECONDS, render_metrics
+from scripts.logs import reset_request_id, set_request_id, setup_logging
 
 # 1) Load environment variables from .env
 load_dotenv()  
 
+setup_logging()
+log = logging.getLogger("app")
+
 app = Flask(__name__)
 
+# Load and validate every template now so broken ones show up at boot
+template_errors = get_template_registry().errors
+for circuit_type, err in template_errors.items():
+    log.warning("Broken template '%s': %s", circuit_type, err)
+
+# Spawn the netlist workers now so they load libraries before the first request;
+# the app serves right away and /readyz turns 200 once they are warm
+get_generation_pool().start()
+
+# A caller-supplied X-Request-ID is kept if it looks like an id
+_REQUEST_ID_RE = re.compile(r"^[\w.:-]{1,64}$")
+
+def _finish_request(endpoint, method, path, status, started):
+    seconds = time.perf_counter() - started
+    IN_FLIGHT.labels(endpoint=endpoint).dec()
+    REQUEST_SECONDS.labels(endpoint=endpoint).observe(seconds)
+    log.info("%s %s %s", method, path, status,
+             extra={"endpoint": endpoint, "status": status, "seconds": round(seconds, 6)})
+
+# Request id, metrics and the access log line. A streamed body is sent
+# after the request context is gone, so those requests finish when the
+# server closes the response.
+@app.before_request
+def start_request():
+    request_id = request.headers.get("X-Request-ID", "")
+    g.request_id = request_id if _REQUEST_ID_RE.match(request_id) else uuid.uuid4().hex
+    g.request_id_token = set_request_id(g.request_id)
+    if request.endpoint is None:
+        return
+    g.metrics_started = time.perf_counter()
+    IN_FLIGHT.labels(endpoint=request.endpoint).inc()
+
+@app.after_request
+def finish_response(response):
+    response.headers["X-Request-ID"] = g.get("request_id", "")
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return response
+    REQUESTS.labels(endpoint=request.endpoint, status=str(response.status_code)).inc()
+    args = (request.endpoint, request.method, request.path, response.status_code, started)
+    if response.is_streamed:
+        context = contextvars.copy_context()
+        response.call_on_close(lambda: context.run(_finish_request, *args))
+    else:
+        _finish_request(*args)
+    return response
+
+@app.teardown_request
+def teardown(exc):
+    # Unhandled errors skip after_request
+    started = g.pop("metrics_started", None)
+    if started is not None:
+        REQUESTS.labels(endpoint=request.endpoint, status="500").inc()
+        _finish_request(request.endpoint, request.method, request.path, 500, started)
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        reset_request_id(token)
+
+def in_request_context(events):
+    """
+    Run a streamed body's generator under this request's id: the body is
+    produced after the request context has been torn down.
+    """
+    context = contextvars.copy_context()
+
+    def run():
+        it = iter(events)
+        while True:
+            try:
+                yield context.run(next, it)
+            except StopIteration:
+                return
+    return run()
+
 @app.route("/generate", methods=["POST"])
 def generate():
     data = request.get_json(force=True)
@@ -19,38 +109,173 @@ def generate():
     if not prompt or not isinstance(prompt, str):
         return jsonify({"error": "Missing or invalid 'prompt'."}), 400
 
-    # 2) Parse prompt → spec
-    try:
-        spec = call_gemini_for_spec(prompt)
-    except Exception as e:
-        return jsonify({"error": f"Parsing error: {str(e)}"}), 500
+    # Set "no_cache": true to force a fresh Gemini call
+    use_cache = not bool(data.get("no_cache", False))
 
-    # 3) Spec → Filled JSON template
+    # 2) Prompt → spec → filled JSON template → KiCad netlist → board
     try:
-        filled = match_and_fill_template(spec)
-    except Exception as e:
-        return jsonify({"error": f"Template matching error: {str(e)}"}), 500
-
-    # 4) Filled JSON → KiCad schematic
-    try:
-        schem_path = generate_kicad_schematic(filled, spec)
-    except Exception as e:
-        return jsonify({"error": f"KiCad generation error: {str(e)}"}), 500
+        out = run_pipeline(prompt, use_cache=use_cache)
+    except PipelineError as e:
+        return jsonify({"error": str(e)}), 500
 
+    spec, filled, schem_path = out["spec"], out["filled"], out["path"]
     filename = os.path.basename(schem_path)
     download_url = f"/download/{filename}"
 
     return jsonify({
         "spec": spec.dict(),
         "filledTemplate": filled,
-        "kicad_sch_url": download_url
+        "kicad_sch_url": download_url,
+        # Null (with the reason in pcb_error) when only the board failed
+        "kicad_pcb_url": f"/download/{os.path.basename(out['pcb_path'])}" if out["pcb_path"] else None,
+        "pcb_error": out["pcb_error"],
     })
 
+@app.route("/generate/stream", methods=["POST"])
+def generate_stream():
+    data = request.get_json(force=True)
+    prompt = data.get("prompt")
+    if not prompt or not isinstance(prompt, str):
+        return jsonify({"error": "Missing or invalid 'prompt'."}), 400
+
+    use_cache = not bool(data.get("no_cache", False))
+    # Server-sent events by default; ?format=ndjson (or Accept) for one JSON object per line
+    ndjson = (request.args.get("format") == "ndjson"
+              or request.accept_mimetypes.best == "application/x-ndjson")
+
+    def events():
+        for event in stream_pipeline(prompt, use_cache=use_cache):
+            if ndjson:
+                yield json.dumps(event) + "\n"
+            elif event["event"] == "heartbeat":
+                yield ": heartbeat\n\n"
+            else:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    return Response(
+        stream_with_context(in_request_context(events())),
+        mimetype="application/x-ndjson" if ndjson else "text/event-stream",
+        # No caching, and no response buffering in nginx-style proxies
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/generate/batch", methods=["POST"])
+def generate_batch():
+    data = request.get_json(force=True)
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing or invalid 'items' (list of prompts or spec objects)."}), 400
+    if len(items) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"Too many items ({len(items)} > {BATCH_MAX_ITEMS})."}), 400
+
+    use_cache = not bool(data.get("no_cache", False))
+    try:
+        concurrency = min(int(data.get("concurrency", BATCH_CONCURRENCY)), BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid 'concurrency'."}), 400
+
+    # One JSON object per line, flushed as each item completes
+    def ndjson():
+        for result in run_batch(items, use_cache=use_cache, concurrency=concurrency):
+            yield json.dumps(result) + "\n"
+
+    return Response(stream_with_context(in_request_context(ndjson())), mimetype="application/x-ndjson")
+
+@app.route("/sweep", methods=["POST"])
+def sweep():
+    data = request.get_json(force=True)
+    circuit_type, params = data.get("circuit_type"), data.get("params")
+    if not isinstance(circuit_type, str) or not isinstance(params, dict):
+        return jsonify({"error": "Missing or invalid 'circuit_type' / 'params'."}), 400
+    indices = data.get("generate") or []
+    csv = (request.args.get("format") or data.get("format")) == "csv"
+    if not isinstance(indices, list) or (indices and csv):
+        return jsonify({"error": "'generate' must be a list of point indices (JSON format only)."}), 400
+
+    try:
+        table = run_sweep(circuit_type, params)
+        specs = point_specs(table, indices)
+    except SweepError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if csv:
+        return Response(stream_with_context(in_request_context(iter_csv(table))), mimetype="text/csv")
+
+    out = sweep_json(table)
+    if specs:
+        # Netlists and boards for the chosen points only, through the batch pipeline
+        results = sorted(run_batch(specs), key=lambda r: r["index"])
+        out["generated"] = [dict(r, index=indices[r["index"]]) for r in results]
+    return jsonify(out)
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    data = request.get_json(force=True)
+    prompt = data.get("prompt")
+    if not prompt or not isinstance(prompt, str):
+        return jsonify({"error": "Missing or invalid 'prompt'."}), 400
+
+    try:
+        job = get_job_manager().submit(prompt, use_cache=not bool(data.get("no_cache", False)))
+    except JobQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+
+    return jsonify({
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/jobs/{job.id}"
+    }), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job '{job_id}' not found."}), 404
+    return jsonify(job.to_dict())
+
+@app.route("/templates", methods=["GET"])
+def list_templates():
+    registry = get_template_registry()
+    return jsonify({
+        "templates": [registry.get(ct).describe() for ct in registry.circuit_types()],
+        "errors": registry.errors
+    })
+
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify({
+        "spec_cache": spec_cache_stats(),
+        "spec_paths": spec_path_stats(),
+        "artifact_cache": artifact_cache_stats()
+    })
+
+@app.route("/pool/stats", methods=["GET"])
+def pool_stats():
+    return jsonify(get_generation_pool().stats())
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and serving
+    return jsonify({"status": "ok"})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    # Readiness: SKiDL and the part libraries are loaded where netlists are generated
+    status = get_generation_pool().ready()
+    status["templates"] = len(get_template_registry().circuit_types())
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
 @app.route("/download/<filename>", methods=["GET"])
 def download(filename):
     output_dir = os.getenv("KICAD_OUTPUT_PATH", "./output")
     filepath = os.path.join(output_dir, filename)
-    if not os.path.isfile(filepath):
+    # Dotfiles in the output folder (e.g. the artifact index) are not artifacts
+    if filename.startswith(".") or not os.path.isfile(filepath):
         return jsonify({"error": f"File '{filename}' not found."}), 404
     return send_file(filepath, as_attachment=True, download_name=filename)
 
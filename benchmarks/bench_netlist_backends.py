@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+bench_netlist_backends.py
+
+Netlist generation time of the SKiDL backend vs. the native writer
+(scripts/netlist_writer.py) on resistor ladders with N components, plus
+two checks: the native output is byte-identical across runs, and both
+backends produce the same nets.
+
+Needs the KiCad "Device" symbol library and a built symbol index
+(python -m scripts.symbol_index build). The artifact cache is switched
+off so every run really generates.
+
+Usage:
+  $ python benchmarks/bench_netlist_backends.py
+  $ python benchmarks/bench_netlist_backends.py --sizes 10 100 1000 --repeat 5
+"""
+
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["ARTIFACT_CACHE_ENABLED"] = "0"
+
+
+def ladder(n_components: int) -> dict:
+    """A filled template with n resistors chained R1-R2-...-Rn between VIN and GND."""
+    components, connections = [], [{"net": "VIN", "from": "R1.1", "to": "VIN"}]
+    for i in range(1, n_components + 1):
+        components.append({"ref": f"R{i}", "type": f"{i}k", "footprint": "Resistor_SMD:R_0603"})
+        if i < n_components:
+            connections.append({"net": f"N{i}", "from": f"R{i}.2", "to": f"R{i + 1}.1"})
+    connections.append({"net": "GND", "from": f"R{n_components}.2", "to": "GND"})
+    return {"circuit_type": "voltage_divider", "components": components, "connections": connections}
+
+
+def nets_of(path: str) -> dict:
+    from scripts.sexpr import parse_sexpr, find, find_all
+    root = parse_sexpr(Path(path).read_text())
+    return {
+        find(net, "name")[1]: sorted((find(node, "ref")[1], find(node, "pin")[1]) for node in find_all(net, "node"))
+        for net in find_all(find(root, "nets"), "net")
+    }
+
+
+def best_of(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    from contextlib import redirect_stdout
+    from scripts.parser import CircuitSpec
+    from scripts.kicad_generator import generate_kicad_schematic
+
+    spec = CircuitSpec(circuit_type="voltage_divider")
+    rows = []
+    for n in args.sizes:
+        design = ladder(n)
+        # The generators print per part; keep that out of the timings' output
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            t_skidl, skidl_path = best_of(lambda: generate_kicad_schematic(design, spec, backend="skidl"), args.repeat)
+            t_native, native_path = best_of(lambda: generate_kicad_schematic(design, spec, backend="native"), args.repeat)
+            again = generate_kicad_schematic(design, spec, backend="native")
+        identical = Path(native_path).read_bytes() == Path(again).read_bytes()
+        same_nets = nets_of(native_path) == nets_of(skidl_path)
+        rows.append((n, t_skidl, t_native, identical, same_nets))
+
+    print(f"{'components':>10} {'skidl (ms)':>11} {'native (ms)':>12} {'speedup':>8} {'stable':>7} {'same nets':>10}")
+    for n, t_skidl, t_native, identical, same_nets in rows:
+        print(f"{n:>10} {t_skidl * 1e3:>11.1f} {t_native * 1e3:>12.1f} {t_skidl / t_native:>7.1f}x "
+              f"{'yes' if identical else 'NO':>7} {'yes' if same_nets else 'NO':>10}")
+    sys.exit(0 if all(r[3] and r[4] for r in rows) else 1)
+
+
+if __name__ == "__main__":
+    main()
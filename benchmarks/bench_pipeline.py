@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py
+
+End-to-end benchmark of the generation pipeline, fully offline: for every
+template in templates/ (from a fixed spec per circuit type) and for
+synthetic voltage-divider ladders of N components, time each stage:
+
+  parse    request_spec_from_gemini against canned Gemini answers
+  fill     match_and_fill_template
+  netlist  generate_kicad_schematic
+  pcb      generate_kicad_pcb
+
+Each stage is timed --repeat times (median reported), then run once more
+under tracemalloc for its allocation peak and block count; the process's
+peak RSS is recorded after each case. A stage that raises is recorded as
+an error and the rest of that case is skipped.
+
+--save writes the results as JSON; --baseline compares against such a
+file and exits 1 when a stage got slower (or allocates more) by more than
+--tolerance, or fails where it used to pass. The local spec extractor and
+every cache are switched off, and the artifacts go to a temporary
+directory unless KICAD_OUTPUT_PATH is set.
+
+The netlist stage needs the KiCad symbol libraries of the SKiDL backend
+(or a built symbol index with --backend native).
+
+Usage:
+  $ python benchmarks/bench_pipeline.py --save baseline.json
+  $ python benchmarks/bench_pipeline.py --baseline baseline.json --tolerance 0.25
+  $ python benchmarks/bench_pipeline.py --sizes 100 1000 --stages parse fill netlist --backend native
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["ARTIFACT_CACHE_ENABLED"] = "0"
+os.environ["SPEC_CACHE_ENABLED"] = "0"
+os.environ["LOCAL_SPEC_ENABLED"] = "0"
+os.environ.setdefault("KICAD_OUTPUT_PATH", tempfile.mkdtemp(prefix="bench_pipeline_"))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+STAGES = ("parse", "fill", "netlist", "pcb")
+
+# What Gemini would extract for each circuit type (units as the calculators expect)
+CANNED_SPECS = {
+    "buck_converter": {"input_voltage": "12V", "output_voltage": "5V", "output_current": "2A"},
+    "ldo_regulator": {"input_voltage": "5V", "output_voltage": "3.3V"},
+    "inverting_amplifier": {"gain": "-10"},
+    "noninverting_amplifier": {"gain": "11"},
+    "voltage_divider": {"Vin": "12", "Vout": "5"},
+    "low_pass_filter": {"cutoff_frequency": "1", "input_voltage": "5V"},
+    "high_pass_filter": {"cutoff_frequency": "1", "input_voltage": "5V"},
+    "555_timer_astable": {"frequency": "1000"},
+    "bridge_rectifier": {"input_voltage": "12V", "filter_capacitance": "1000uF"},
+    "voltage_multiplier": {"input_ac": "12V"},
+    "comparator_noninverting": {"reference_voltage": "2.5V", "input_signal": "0-5V"},
+    "led_blinker_555": {"frequency": "2", "led_current": "10"},
+    "microcontroller_board": {"mcu": "STM32F103C8T6", "sensor": "BME280", "clock_freq": "8MHz"},
+    "astable_multivibrator": {"resistor_value": "47k"},
+}
+
+
+class CannedResponse:
+    """Just enough of a requests.Response for request_spec_from_gemini."""
+
+    status_code = 200
+
+    def __init__(self, spec: dict):
+        self._body = {"candidates": [{"content": {"parts": [{"text": json.dumps(spec)}]}}]}
+        self.text = json.dumps(self._body)
+
+    def json(self):
+        return self._body
+
+
+class CannedGemini:
+    """Stands in for the pooled Gemini client: the prompt is the circuit type."""
+
+    def post(self, payload, headers=None):
+        prompt = payload["contents"][0]["parts"][0]["text"].rsplit("User Prompt: ", 1)[1]
+        return CannedResponse({"circuit_type": prompt, **CANNED_SPECS.get(prompt, {})})
+
+
+def ladder_template(n_components: int) -> dict:
+    """A voltage_divider-shaped template: n resistors chained from Vin to GND, every other one a placeholder."""
+    components, connections = [], [{"net": "Vin", "from": "R1.1", "to": "Vin"}]
+    for i in range(1, n_components + 1):
+        components.append({"ref": f"R{i}", "type": "{R2_value}k" if i % 2 else "10k",
+                           "footprint": "Resistor_SMD:R_0603"})
+        if i < n_components:
+            connections.append({"net": f"N{i}", "from": f"R{i}.2", "to": f"R{i + 1}.1"})
+    connections.append({"net": "GND", "from": f"R{n_components}.2", "to": "GND"})
+    return {"circuit_type": "voltage_divider", "description": f"Synthetic {n_components}-resistor ladder",
+            "placeholders": {"Vin": None, "Vout": None}, "components": components, "connections": connections}
+
+
+def run_stage(fn, repeat: int):
+    """Time `fn` repeat times, then once more under tracemalloc; returns (record, fn's result)."""
+    times, result = [], None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    try:
+        fn()
+        blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    record = {"seconds": round(statistics.median(times), 6), "min_seconds": round(min(times), 6),
+              "alloc_peak": peak, "alloc_blocks": blocks}
+    return record, result
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def run_case(circuit_type: str, template, stages, repeat: int, backend: str) -> dict:
+    from scripts.parser import request_spec_from_gemini
+    from scripts.template_matcher import match_and_fill_template
+    from scripts.kicad_generator import generate_kicad_schematic
+    from scripts.pcb_generator import generate_kicad_pcb
+
+    case, spec, filled = {}, None, None
+    steps = {
+        "parse": lambda: request_spec_from_gemini(circuit_type),
+        "fill": lambda: match_and_fill_template(spec, template),
+        "netlist": lambda: generate_kicad_schematic(filled, spec, backend=backend),
+        "pcb": lambda: generate_kicad_pcb(filled, spec),
+    }
+    for stage in STAGES:
+        if stage not in stages and stage not in ("parse", "fill"):
+            continue
+        try:
+            record, result = run_stage(steps[stage], repeat if stage in stages else 1)
+        except Exception as e:
+            case[stage] = {"error": f"{type(e).__name__}: {e}"[:300]}
+            break
+        if stage in stages:
+            case[stage] = record
+        if stage == "parse":
+            spec = result
+        elif stage == "fill":
+            filled = result
+    case["rss_peak"] = peak_rss()
+    return case
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta: float) -> list:
+    """Regressions of `results` against `baseline` as readable lines."""
+    problems = []
+    for name, stages in baseline["cases"].items():
+        current = results["cases"].get(name)
+        if current is None:
+            continue
+        for stage, before in stages.items():
+            after = current.get(stage)
+            if not isinstance(before, dict) or "error" in before or after is None:
+                continue
+            if "error" in after:
+                problems.append(f"{name}/{stage}: now fails ({after['error']})")
+                continue
+            if after["seconds"] > before["seconds"] * (1 + tolerance) and after["seconds"] - before["seconds"] > min_delta:
+                problems.append(f"{name}/{stage}: {before['seconds'] * 1e3:.2f} -> {after['seconds'] * 1e3:.2f} ms")
+            if after["alloc_peak"] > before["alloc_peak"] * (1 + tolerance) + 64 * 1024:
+                problems.append(f"{name}/{stage}: peak allocation {before['alloc_peak'] / 1024:.0f} -> "
+                                f"{after['alloc_peak'] / 1024:.0f} KiB")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="*", default=[100, 1000, 10000],
+                    help="component counts of the synthetic ladders")
+    ap.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--backend", choices=["skidl", "native"], help="netlist backend (default: NETLIST_BACKEND)")
+    ap.add_argument("--save", help="write the results to this JSON file")
+    ap.add_argument("--baseline", help="compare against results saved with --save")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%% (default)")
+    ap.add_argument("--min-delta", type=float, default=0.002,
+                    help="ignore slowdowns smaller than this many seconds (default 0.002)")
+    args = ap.parse_args()
+
+    import scripts.parser as parser
+    from scripts.template_registry import get_template_registry
+    from scripts.kicad_generator import NETLIST_BACKEND
+
+    parser.get_gemini_client = CannedGemini
+    backend = args.backend or NETLIST_BACKEND
+    registry = get_template_registry()
+
+    cases = [(ct, ct, None) for ct in registry.circuit_types()]
+    cases += [(f"ladder_{n}", "voltage_divider", ladder_template(n)) for n in args.sizes]
+
+    results = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(), "backend": backend,
+                 "repeat": args.repeat, "stages": args.stages, "time": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "cases": {},
+    }
+    print(f"{'case':<26}" + "".join(f"{stage + ' (ms)':>13}" for stage in args.stages)
+          + f"{'peak alloc':>12}{'peak RSS':>10}")
+    for name, circuit_type, template in cases:
+        case = run_case(circuit_type, template, args.stages, args.repeat, backend)
+        results["cases"][name] = case
+        cells = []
+        for stage in args.stages:
+            record = case.get(stage)
+            cell = "-" if record is None else "error" if "error" in record else f"{record['seconds'] * 1e3:.2f}"
+            cells.append(f"{cell:>13}")
+        alloc = max((r.get("alloc_peak", 0) for r in case.values() if isinstance(r, dict)), default=0)
+        print(f"{name:<26}" + "".join(cells) + f"{alloc / 2 ** 20:>10.1f}MB{case['rss_peak'] / 2 ** 20:>8.0f}MB")
+        for stage, record in case.items():
+            if isinstance(record, dict) and "error" in record:
+                print(f"{'':<26}{stage}: {record['error']}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"Saved results to {args.save}")
+    if args.baseline:
+        problems = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance, args.min_delta)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        if problems:
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+bench_placeholders.py
+
+Micro-benchmark: recursive regex replace_placeholders() vs. the compiled
+placeholder engine (compile once, fill many times) on synthetic templates
+with N components.
+
+Usage:
+  $ python benchmarks/bench_placeholders.py
+  $ python benchmarks/bench_placeholders.py --sizes 100 1000 10000 --repeat 20
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.utils import replace_placeholders, compile_placeholders
+
+
+def synthetic_template(n_components: int) -> dict:
+    """
+    A template shaped like templates/*.json with n_components resistors,
+    every other one carrying a placeholder value, chained by connections.
+    """
+    components, connections = [], []
+    for i in range(1, n_components + 1):
+        components.append({
+            "ref": f"R{i}",
+            "type": f"{{R{i}_value}}" if i % 2 else "10k",
+            "footprint": "Resistor_SMD:R_0603",
+            "connections": [f"N{i}", f"N{i + 1}"],
+            "params": {"tolerance": "1%", "rating": "{power_rating}"},
+        })
+        connections.append({"net": f"N{i + 1}", "from": f"R{i}.2", "to": f"R{i + 1}.1"})
+    return {
+        "circuit_type": "synthetic",
+        "description": "Synthetic {input_voltage} ladder",
+        "placeholders": {"input_voltage": None},
+        "components": components,
+        "connections": connections,
+    }
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    ap.add_argument("--repeat", type=int, default=10)
+    args = ap.parse_args()
+
+    print(f"{'components':>10} {'regex (ms)':>12} {'compile (ms)':>13} {'fill (ms)':>10} {'speedup':>8}")
+    for n in args.sizes:
+        template = synthetic_template(n)
+        values = {f"R{i}_value": f"{i}k" for i in range(1, n + 1, 2)}
+        values["input_voltage"] = "12V"  # leave {power_rating} unresolved on purpose
+
+        compiled = compile_placeholders(template)
+        expected = replace_placeholders(template, values)
+        filled, unresolved = compiled.fill(values)
+        assert filled == expected, "compiled fill differs from replace_placeholders"
+        assert unresolved == {"power_rating"}
+
+        t_regex = best_of(lambda: replace_placeholders(template, values), args.repeat)
+        t_compile = best_of(lambda: compile_placeholders(template), args.repeat)
+        t_fill = best_of(lambda: compiled.fill(values), args.repeat)
+        print(f"{n:>10} {t_regex * 1e3:>12.3f} {t_compile * 1e3:>13.3f} {t_fill * 1e3:>10.3f} {t_regex / t_fill:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
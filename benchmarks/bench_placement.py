@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+bench_placement.py
+
+Wirelength and runtime of the placement engine (scripts/placement.py)
+against the old 5-wide grid on synthetic boards of N parts. The parts
+are a mesh of 4-pin resistor arrays and 14-pin ICs where every part connects
+to its mesh neighbours, numbered in random order, so a placer that reads
+the nets can find a much shorter layout than reference order. Also
+checks that no two courtyards overlap. With --route the placed boards
+are routed too (scripts/router.py), reporting routed nets, vias,
+rip-ups and the slowest net.
+
+Needs no KiCad libraries: the footprints are synthesized.
+
+Usage:
+  $ python benchmarks/bench_placement.py
+  $ python benchmarks/bench_placement.py --sizes 100 1000 5000 --budget 5
+  $ python benchmarks/bench_placement.py --sizes 20 100 400 --route
+"""
+
+import sys
+import math
+import random
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def mesh_design(n_parts: int, seed: int = 0):
+    """({ref: Footprint}, {ref: {pad: net}}) for n parts on a hidden square mesh."""
+    from scripts.footprints import synthesize_footprint
+
+    rng = random.Random(seed)
+    side = max(1, int(math.sqrt(n_parts)))
+    refs = [f"U{i + 1}" for i in range(n_parts)]
+    rng.shuffle(refs)
+    footprints, pad_nets = {}, {ref: {} for ref in refs}
+    for i, ref in enumerate(refs):
+        pins = 14 if i % 7 == 0 else 4
+        footprints[ref] = synthesize_footprint(f"Bench:P{pins}", [str(p) for p in range(1, pins + 1)])
+    for i, ref in enumerate(refs):
+        right, below = i + 1, i + side
+        if (i + 1) % side and right < n_parts:
+            pad_nets[ref]["2"] = pad_nets[refs[right]]["1"] = f"H{i}"
+        if below < n_parts:
+            pad_nets[ref]["4"] = pad_nets[refs[below]]["3"] = f"V{i}"
+        if i % 7 == 0:
+            pad_nets[ref]["14"] = "GND"
+    return footprints, pad_nets
+
+
+def overlaps(footprints, positions) -> int:
+    boxes = sorted((x + fp.bbox[0], y + fp.bbox[1], x + fp.bbox[2], y + fp.bbox[3])
+                   for ref, fp in footprints.items() for x, y in [positions[ref]])
+    count = 0
+    for i, a in enumerate(boxes):
+        for b in boxes[i + 1:]:
+            if b[0] >= a[2]:
+                break
+            count += b[1] < a[3] and a[1] < b[3]
+    return count
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 3000])
+    ap.add_argument("--budget", type=float, default=2.0, help="annealing time budget per board (s)")
+    ap.add_argument("--route", action="store_true", help="also route the placed boards")
+    args = ap.parse_args()
+
+    import time
+    from scripts.pcb_writer import board_outline, grid_placement
+    from scripts.placement import place, wirelength
+    from scripts.router import route
+
+    print(f"{'parts':>6} {'nets':>6} {'grid HPWL':>11} {'placed HPWL':>12} {'ratio':>6} "
+          f"{'time (s)':>9} {'overlaps':>9}")
+    ok = True
+    for n in args.sizes:
+        footprints, pad_nets = mesh_design(n)
+        grid_hpwl = wirelength(footprints, pad_nets, grid_placement(footprints))
+        started = time.perf_counter()
+        positions, report = place(footprints, pad_nets, time_budget=args.budget)
+        seconds = time.perf_counter() - started
+        bad = overlaps(footprints, positions)
+        ok &= bad == 0
+        print(f"{n:>6} {report['nets']:>6} {grid_hpwl:>11.0f} {report['hpwl']:>12.0f} "
+              f"{report['hpwl'] / grid_hpwl:>6.2f} {seconds:>9.2f} {bad:>9}")
+        if args.route:
+            placed = [{"ref": ref, "value": ref, "footprint": fp, "at": positions[ref], "pad_nets": pad_nets[ref]}
+                      for ref, fp in footprints.items()]
+            _, routing = route(placed, board_outline(placed))
+            per_net = routing["seconds_per_net"]
+            slowest = max(per_net, key=per_net.get)
+            print(f"{'':>6} routed {routing['routed']}/{routing['nets']} nets, {routing['vias']} vias, "
+                  f"{routing['ripups']} rip-ups in {routing['seconds']:.2f} s "
+                  f"({routing['seconds'] / max(routing['nets'], 1) * 1e3:.1f} ms/net, "
+                  f"slowest {slowest} {per_net[slowest] * 1e3:.0f} ms)")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+bench_startup.py
+
+Start-up cost of the app, each measured in a fresh interpreter and
+counted from the moment the process is spawned:
+
+  import kicad_generator   importing scripts.kicad_generator (SKiDL stays unloaded)
+  load_skidl               the deferred SKiDL import + library discovery
+  import app               importing app.py (what a gunicorn worker does)
+  first response           the first GET /healthz answered
+  ready                    GET /readyz returns 200: the netlist workers
+                           (or, with --pool-size 0, the app process) have
+                           SKiDL and the part libraries loaded
+
+Requests go through Flask's test client, so no port is opened. Reports
+the median and the worst of --repeat runs.
+
+Usage:
+  $ python benchmarks/bench_startup.py
+  $ python benchmarks/bench_startup.py --repeat 10 --pool-size 0
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_GENERATOR = """
+import json, time
+from scripts import kicad_generator
+imported = time.time()
+kicad_generator.load_skidl()
+print(json.dumps({"import kicad_generator": imported, "load_skidl": time.time()}))
+"""
+
+SERVE_APP = """
+import json, time
+import app
+imported = time.time()
+client = app.app.test_client()
+assert client.get("/healthz").status_code == 200
+first = time.time()
+deadline = first + {timeout}
+while client.get("/readyz").status_code != 200:
+    if time.time() > deadline:
+        raise SystemExit("not ready after {timeout} s")
+    time.sleep(0.02)
+print(json.dumps({{"import app": imported, "first response": first, "ready": time.time()}}))
+"""
+
+
+def run_child(code: str, env: dict) -> dict:
+    """Run `code` in a new interpreter; returns its timestamps as seconds since spawn."""
+    spawned = time.time()
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    stamps = json.loads(out.strip().splitlines()[-1])
+    return {name: stamp - spawned for name, stamp in stamps.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--pool-size", type=int, default=1, help="GEN_POOL_SIZE for the app (0 = inline)")
+    ap.add_argument("--timeout", type=float, default=120.0, help="give up waiting for /readyz after this (s)")
+    args = ap.parse_args()
+
+    # Plain single-process metrics: no multiprocess directory to set up
+    env = {k: v for k, v in os.environ.items() if k != "PROMETHEUS_MULTIPROC_DIR"}
+    env.update(GEN_POOL_SIZE=str(args.pool_size), LOG_LEVEL="WARNING")
+    samples: dict = {}
+    for _ in range(args.repeat):
+        for code in (IMPORT_GENERATOR, SERVE_APP.format(timeout=args.timeout)):
+            for name, seconds in run_child(code, env).items():
+                samples.setdefault(name, []).append(seconds)
+
+    print(f"{'since spawn':<24} {'median (ms)':>12} {'max (ms)':>10}   (GEN_POOL_SIZE={args.pool_size}, "
+          f"{args.repeat} runs)")
+    for name, values in samples.items():
+        print(f"{name:<24} {statistics.median(values) * 1e3:>12.0f} {max(values) * 1e3:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
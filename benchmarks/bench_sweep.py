@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+bench_sweep.py
+
+The array calculators behind /sweep (scripts/sweep.py) against calling
+the scalar compute_* functions once per point, on N-point sweeps of each
+sweepable circuit type. Also checks that both give the same values.
+
+Usage:
+  $ python benchmarks/bench_sweep.py
+  $ python benchmarks/bench_sweep.py --sizes 1000 1000000
+"""
+
+import sys
+import time
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.sweep import run_sweep
+from scripts.template_matcher import (
+    compute_555_astable_values, compute_divider_R2_value, compute_high_pass_values, compute_low_pass_values,
+)
+
+# circuit_type → (sweep params for n points, scalar calculator over one row of inputs)
+CASES = {
+    "voltage_divider": (
+        lambda n: {"Vin": "24", "Vout": {"start": 0.5, "stop": 23.5, "num": n}},
+        lambda row: {"R2_value": compute_divider_R2_value(repr(row["Vin"]), repr(row["Vout"]))},
+    ),
+    "low_pass_filter": (
+        lambda n: {"cutoff_frequency": {"start": 0.1, "stop": 100, "num": n, "scale": "log"}},
+        lambda row: compute_low_pass_values(repr(row["cutoff_frequency"])),
+    ),
+    "high_pass_filter": (
+        lambda n: {"cutoff_frequency": {"start": 0.1, "stop": 100, "num": n, "scale": "log"}},
+        lambda row: compute_high_pass_values(repr(row["cutoff_frequency"])),
+    ),
+    "555_timer_astable": (
+        lambda n: {"frequency": {"start": 1, "stop": 100000, "num": n, "scale": "log"}},
+        lambda row: compute_555_astable_values(repr(row["frequency"])),
+    ),
+}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    args = ap.parse_args()
+
+    print(f"{'circuit':<20} {'points':>9} {'array (ms)':>11} {'scalar (ms)':>12} {'speedup':>8}  values")
+    ok = True
+    for circuit_type, (params, scalar) in CASES.items():
+        for n in args.sizes:
+            started = time.perf_counter()
+            table = run_sweep(circuit_type, params(n))
+            t_array = time.perf_counter() - started
+
+            def row(i):
+                return {name: float(col[i]) for name, col in table["columns"].items()} | table["constants"]
+
+            inputs = [row(i) for i in range(n)]
+            started = time.perf_counter()
+            results = [scalar(r) for r in inputs]
+            t_scalar = time.perf_counter() - started
+
+            same = all(float(value) == inputs[i][name] for i, values in enumerate(results) for name, value in values.items())
+            ok &= same
+            print(f"{circuit_type:<20} {n:>9} {t_array * 1e3:>11.2f} {t_scalar * 1e3:>12.1f} "
+                  f"{t_scalar / t_array:>7.0f}x  {'same' if same else 'DIFFERENT'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
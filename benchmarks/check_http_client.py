@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+check_http_client.py
+
+Exercises PooledJSONClient (scripts/http_client.py) against the Gemini
+stand-in (scripts/gemini_stub.py), served in-process on a free port:
+
+  retry         --error-rate 0.5: every 500 is retried until a 200 comes back
+                or the retries run out
+  retry-after   --rate-limit 1 --retry-after 0.3: every 429 is followed by
+                a wait of at least Retry-After before the next attempt
+  hedge         --error-rate 0.5 and 0.3 s latency with a 0.1 s hedge delay:
+                a failing primary takes the hedged answer instead of retrying,
+                and a primary that succeeds stops the hedge
+  slow-primary  a 3 s primary and a 0.05 s hedge fired after 0.2 s: post()
+                returns the hedge's answer in well under a second
+  queueing      pool_size 1 with 8 concurrent callers: primaries run on
+                their own threads, so none waits behind another for the pool
+
+Prints one line per check and exits non-zero if any fails.
+
+Usage:
+  $ python benchmarks/check_http_client.py
+"""
+
+import sys
+import time
+import threading
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from scripts.gemini_stub import GeminiStub, make_handler, parse_latency
+from scripts.http_client import PooledJSONClient
+
+PAYLOAD = {"contents": [{"parts": [{"text": "User Prompt: voltage divider 12V to 5V"}]}]}
+
+
+def serve(**stub_args):
+    """Start a stub server on a free port; returns (server, stub, url)."""
+    stub = GeminiStub(**stub_args)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(stub))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stub, f"http://127.0.0.1:{server.server_port}/v1beta/models/stub:generateContent"
+
+
+def check_retry():
+    server, stub, url = serve(latency=parse_latency("0"), error_rate=0.5, seed=1)
+    client = PooledJSONClient(url, max_retries=8, backoff_base=0.01)
+    try:
+        statuses = [client.post(PAYLOAD).status_code for _ in range(40)]
+    finally:
+        client.close()
+        server.shutdown()
+    stats = client.stats()
+    # every 500 is followed by a retry, except the last one of a request that ran out of retries
+    gave_up = 40 - statuses.count(200)
+    ok = stub.counters["errors"] > 0 and stats["retries"] == stub.counters["errors"] - gave_up
+    return ok, f"{statuses.count(200)}/40 answered 200 after {stats['retries']} retries " \
+               f"({stub.counters['errors']} injected 500s)"
+
+
+def check_retry_after():
+    server, stub, url = serve(latency=parse_latency("0"), rate_limit=1.0, retry_after=0.3)
+    client = PooledJSONClient(url, max_retries=2, backoff_base=0.001)
+    try:
+        started = time.perf_counter()
+        status = client.post(PAYLOAD).status_code
+        seconds = time.perf_counter() - started
+    finally:
+        client.close()
+        server.shutdown()
+    ok = status == 429 and stub.counters["rate_limited"] == 3 and seconds >= 0.6
+    return ok, f"3 attempts took {seconds:.2f} s (>= 2 x Retry-After 0.3 s), final status {status}"
+
+
+def check_hedge():
+    server, stub, url = serve(latency=parse_latency("0.3"), error_rate=0.5, seed=2)
+    client = PooledJSONClient(url, max_retries=2, backoff_base=1.0, backoff_max=1.0,
+                              hedge=True, hedge_min_samples=10 ** 6, hedge_default_delay=0.1)
+    try:
+        latencies, statuses = [], []
+        for _ in range(30):
+            started = time.perf_counter()
+            statuses.append(client.post(PAYLOAD).status_code)
+            latencies.append(time.perf_counter() - started)
+        time.sleep(0.5)  # let losing hedges finish their in-flight attempt
+    finally:
+        client.close()
+        server.shutdown()
+    stats = client.stats()
+    # every attempt the client counted reached the stub, and nothing kept retrying after the answer
+    ok = stats["hedges"] > 0 and stats["hedge_wins"] > 0 and stub.counters["requests"] == stats["attempts"]
+    return ok, f"{stats['hedges']} hedges, {stats['hedge_wins']} won, {stats['retries']} retries, " \
+               f"{statuses.count(200)}/30 answered 200, worst {max(latencies):.2f} s"
+
+
+def check_slow_primary():
+    calls = iter(range(10 ** 6))
+
+    def slow_then_fast(rng, recorded):
+        """Requests alternate 3 s (each primary) and 0.05 s (its hedge)."""
+        return 3.0 if next(calls) % 2 == 0 else 0.05
+
+    server, stub, url = serve(latency=slow_then_fast)
+    client = PooledJSONClient(url, hedge=True, hedge_min_samples=10 ** 6, hedge_default_delay=0.2)
+    try:
+        latencies, statuses = [], []
+        for _ in range(3):
+            started = time.perf_counter()
+            statuses.append(client.post(PAYLOAD).status_code)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        client.close()
+        server.shutdown()
+    stats = client.stats()
+    ok = statuses == [200] * 3 and max(latencies) < 1.0 and stats["hedge_wins"] == 3
+    return ok, f"{stats['hedge_wins']}/3 hedges won, worst {max(latencies):.2f} s against a 3 s primary"
+
+
+def check_queueing():
+    server, stub, url = serve(latency=parse_latency("0.3"))
+    client = PooledJSONClient(url, hedge=True, hedge_default_delay=5.0, pool_size=1)
+    statuses = []
+    try:
+        threads = [threading.Thread(target=lambda: statuses.append(client.post(PAYLOAD).status_code))
+                   for _ in range(8)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        seconds = time.perf_counter() - started
+    finally:
+        client.close()
+        server.shutdown()
+    ok = statuses.count(200) == 8 and seconds < 1.0 and client.stats()["hedges"] == 0
+    return ok, f"8 concurrent 0.3 s calls through pool_size 1 took {seconds:.2f} s"
+
+
+def main():
+    failed = False
+    for name, check in [("retry", check_retry), ("retry-after", check_retry_after),
+                        ("hedge", check_hedge), ("slow-primary", check_slow_primary),
+                        ("queueing", check_queueing)]:
+        ok, detail = check()
+        failed |= not ok
+        print(f"{name:<12} {'ok  ' if ok else 'FAIL'}  {detail}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+loadgen.py
+
+Closed-loop load generator for /generate: at each concurrency level, N
+client threads send requests back to back for --duration seconds (or
+--requests in total), then the level's throughput, status counts and
+p50/p95/p99 latency are reported.
+
+Pair it with the Gemini stand-in so no quota is spent:
+
+  $ python -m scripts.gemini_stub --latency lognormal:0.8,0.5 --rate-limit 0.02 &
+  $ GEMINI_API_URL=http://127.0.0.1:8090/v1beta/models/stub:generateContent \\
+    LOCAL_SPEC_ENABLED=0 gunicorn -c gunicorn.conf.py app:app &
+
+Requests are sent with "no_cache": true (so every one reaches Gemini)
+unless --cache is given. Prompts come from --prompts (one per line) or a
+built-in list covering every circuit type.
+
+Usage:
+  $ python benchmarks/loadgen.py
+  $ python benchmarks/loadgen.py --url http://localhost:8080/generate --concurrency 1 4 16 64 --duration 30
+  $ python benchmarks/loadgen.py --requests 200 --save load.json
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urljoin
+
+import requests
+
+PROMPTS = [
+    "buck converter from 24V to 5V at 3A for a sensor node",
+    "LDO regulator 5V to 3.3V",
+    "inverting amplifier with a gain of 10",
+    "non-inverting op amp, gain 5",
+    "voltage divider 12V to 3.3V",
+    "low pass filter at 2kHz",
+    "high pass filter, cutoff 500Hz",
+    "555 timer oscillating at 1kHz",
+    "bridge rectifier for 12V AC with a 2200uF reservoir cap",
+    "voltage doubler from 9V AC",
+    "comparator that trips high at 3V and low at 2V",
+    "non-inverting comparator against a 2.5V reference",
+    "LED blinker at 2Hz driving 15mA",
+    "STM32 board with a BME280 sensor and 8MHz crystal",
+    "two-transistor multivibrator with 47k base resistors",
+]
+
+
+def percentile(sorted_values, q: float) -> float:
+    """Nearest-rank q-quantile (0..1) of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+def run_level(url: str, prompts, concurrency: int, duration: float, total: int, use_cache: bool,
+              timeout: float) -> dict:
+    """Run one concurrency level; returns its report."""
+    latencies, statuses = [], Counter()
+    lock = threading.Lock()
+    issued = iter(range(total)) if total else None
+    deadline = time.perf_counter() + duration
+
+    def client(worker: int):
+        session = requests.Session()
+        i = worker
+        while True:
+            if issued is not None:
+                with lock:
+                    if next(issued, None) is None:
+                        return
+            elif time.perf_counter() >= deadline:
+                return
+            body = {"prompt": prompts[i % len(prompts)], "no_cache": not use_cache}
+            i += concurrency
+            started = time.perf_counter()
+            try:
+                status = session.post(url, json=body, timeout=timeout).status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            seconds = time.perf_counter() - started
+            with lock:
+                latencies.append(seconds)
+                statuses[str(status)] += 1
+
+    threads = [threading.Thread(target=client, args=(w,), daemon=True) for w in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ok = statuses.get("200", 0)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "ok": ok,
+        "statuses": dict(statuses),
+        "seconds": round(elapsed, 3),
+        "throughput": round(ok / elapsed, 3) if elapsed > 0 else 0.0,
+        "p50": round(percentile(latencies, 0.50), 6),
+        "p95": round(percentile(latencies, 0.95), 6),
+        "p99": round(percentile(latencies, 0.99), 6),
+        "max": round(latencies[-1], 6) if latencies else 0.0,
+    }
+
+
+def wait_ready(url: str, timeout: float) -> None:
+    """Poll the service's /readyz until it answers 200."""
+    readyz = urljoin(url, "/readyz")
+    deadline = time.time() + timeout
+    while True:
+        try:
+            if requests.get(readyz, timeout=2).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        if time.time() > deadline:
+            sys.exit(f"{readyz} not ready after {timeout:.0f} s")
+        time.sleep(0.5)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://localhost:8080/generate")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    ap.add_argument("--duration", type=float, default=15.0, help="seconds per level (default 15)")
+    ap.add_argument("--requests", type=int, default=0, help="requests per level instead of --duration")
+    ap.add_argument("--prompts", help="file with one prompt per line (default: built-in list)")
+    ap.add_argument("--cache", action="store_true", help="let the service use its spec cache")
+    ap.add_argument("--timeout", type=float, default=180.0, help="per-request timeout (s)")
+    ap.add_argument("--save", help="write the per-level reports to this JSON file")
+    args = ap.parse_args()
+
+    prompts = PROMPTS
+    if args.prompts:
+        prompts = [line.strip() for line in Path(args.prompts).read_text(encoding="utf-8").splitlines() if line.strip()]
+    wait_ready(args.url, args.timeout)
+
+    print(f"{'conc':>5} {'reqs':>6} {'ok':>6} {'req/s':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'p99 (ms)':>9}  statuses")
+    levels = []
+    for concurrency in args.concurrency:
+        level = run_level(args.url, prompts, concurrency, args.duration, args.requests, args.cache, args.timeout)
+        levels.append(level)
+        statuses = ", ".join(f"{k}: {v}" for k, v in sorted(level["statuses"].items()))
+        print(f"{concurrency:>5} {level['requests']:>6} {level['ok']:>6} {level['throughput']:>8.2f} "
+              f"{level['p50'] * 1e3:>9.0f} {level['p95'] * 1e3:>9.0f} {level['p99'] * 1e3:>9.0f}  {statuses}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps({"url": args.url, "levels": levels}, indent=2))
+        print(f"Saved results to {args.save}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+stress_parallel_generation.py
+
+Stress test: run many netlist generations at once on a thread pool and
+check that every .net file holds exactly its own design (right refs, right
+values, no parts leaking in from a neighbouring request).
+
+Each job is a voltage divider whose R2 value is unique to the job, so any
+cross-talk between requests shows up as a wrong or extra value. The spec
+and filled template are built directly; no Gemini call is made. The
+artifact cache is switched off so every job really generates.
+
+Needs the KiCad "Device" symbol library (or pass --lib-dir).
+
+Usage:
+  $ python benchmarks/stress_parallel_generation.py
+  $ python benchmarks/stress_parallel_generation.py --jobs 200 --threads 32 --lib-dir /usr/share/kicad/symbols
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["ARTIFACT_CACHE_ENABLED"] = "0"
+
+
+def divider(job: int) -> dict:
+    return {
+        "circuit_type": "voltage_divider",
+        "description": f"Stress divider #{job}",
+        "components": [
+            {"ref": "R1", "type": "10k", "footprint": "Resistor_SMD:R_0603", "connections": ["Vin", "Vmid"]},
+            {"ref": "R2", "type": f"{1000 + job}k", "footprint": "Resistor_SMD:R_0603", "connections": ["Vmid", "GND"]},
+        ],
+        "connections": [
+            {"net": "Vin", "from": "R1.1", "to": "Vin"},
+            {"net": "Vmid", "from": "R1.2", "to": "R2.1"},
+            {"net": "GND", "from": "R2.2", "to": "GND"},
+        ],
+    }
+
+
+def check(job: int, path: str) -> list:
+    """Return the problems found in the netlist for `job` (empty when correct)."""
+    text = Path(path).read_text()
+    problems = []
+    refs = sorted(re.findall(r'\(comp \(ref "?([^")\s]+)', text))
+    if refs != ["R1", "R2"]:
+        problems.append(f"refs {refs}")
+    values = sorted(re.findall(r'\(value "?([^")\s]+)', text))
+    if values != sorted(["10k", f"{1000 + job}k"]):
+        problems.append(f"values {values}")
+    return problems
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--jobs", type=int, default=64)
+    ap.add_argument("--threads", type=int, default=16)
+    ap.add_argument("--lib-dir", help="extra KiCad symbol directory to search")
+    args = ap.parse_args()
+
+    from skidl import lib_search_paths, KICAD
+    from scripts.parser import CircuitSpec
+    from scripts.kicad_generator import generate_kicad_schematic
+
+    if args.lib_dir:
+        lib_search_paths[KICAD].append(args.lib_dir)
+
+    spec = CircuitSpec(circuit_type="voltage_divider")
+    cwd = os.getcwd()
+
+    def run(job):
+        started = time.perf_counter()
+        path = generate_kicad_schematic(divider(job), spec)
+        return job, path, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        results = list(pool.map(run, range(args.jobs)))
+    wall = time.perf_counter() - started
+
+    failures = 0
+    paths = set()
+    for job, path, _ in results:
+        problems = check(job, path)
+        if path in paths:
+            problems.append("netlist path reused")
+        paths.add(path)
+        if problems:
+            failures += 1
+            print(f"✗ job {job}: {path}: {'; '.join(problems)}")
+
+    latencies = sorted(seconds for _, _, seconds in results)
+    print(f"{args.jobs} generations on {args.threads} threads in {wall:.2f}s "
+          f"(p50 {latencies[len(latencies) // 2] * 1e3:.1f} ms, max {latencies[-1] * 1e3:.1f} ms)")
+    if os.getcwd() != cwd:
+        failures += 1
+        print(f"✗ working directory changed to {os.getcwd()}")
+    print("✓ all netlists correct" if not failures else f"✗ {failures} bad netlists")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
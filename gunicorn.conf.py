@@ -0,0 +1,29 @@
+# gunicorn.conf.py
+#
+#   $ gunicorn -c gunicorn.conf.py app:app
+
+import os
+import shutil
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8080")
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# Long enough for a slow Gemini call plus a pool generation (GEN_POOL_TIMEOUT)
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+
+# Every worker (and the generation pool processes it spawns) writes its
+# metrics here; /metrics merges them. Must be set before the app imports
+# prometheus_client, which is why it lives in the config, not in app.py.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/pcbbuilder-metrics")
+
+
+def on_starting(server):
+    # Samples from a previous run would be merged into this one's
+    path = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -2,270 +2,199 @@
 """
 json_to_pcb.py
 
-Given a JSON description of a buck converter (or any circuit),
-this script will produce a minimal KiCad PCB (`.kicad_pcb`) that:
+Given JSON descriptions of circuits (a /generate response, or just its
+"filledTemplate"), produce minimal KiCad PCBs (`.kicad_pcb`) that:
 
-  • Places each footprint on a simple grid
-  • Creates nets and assigns each pad to its corresponding net
-  • Leaves “ratsnest” connections visible (no actual copper tracks are drawn)
+  • Place the footprints to keep the nets short (scripts/placement.py:
+    force-directed placement, then legalization and annealing) without
+    courtyard overlaps, inside --board WIDTHxHEIGHT if given
+  • Create nets and assign each pad to its corresponding net
+  • Route the nets on F.Cu/B.Cu with tracks and vias sized by net class
+    (scripts/router.py); whatever cannot be routed stays as ratsnest
 
-You can then open the generated `output.kicad_pcb` in KiCad’s PCB editor
-and route the connections as you wish.
+You can then open the generated boards in KiCad’s PCB editor and finish
+or rework the routing as you wish (--no-route leaves it all to you).
 
-Requirements:
-  • This script must be run with a Python interpreter that knows about `pcbnew`.
-    For example, on Linux/macOS you might do:
-      
-      $ export PYTHONPATH="/usr/lib/kicad-nightly/lib/python3/dist-packages"
-      $ python3 json_to_pcb.py
-
-    Adjust the `PYTHONPATH` to point to your KiCad installation’s `python` folder,
-    or simply use the “Python Console” inside KiCad, etc., so that `import pcbnew` works.
+No pcbnew needed: boards are written by scripts/pcb_writer.py. Footprint
+geometry comes from the memory-mapped footprint cache
+(scripts/footprint_cache.py, built from the KiCad footprint libraries on
+first use; set KICAD_FOOTPRINT_DIR if they are not in the usual place)
+and is shared by every board; missing footprints get stand-in pads.
 
 Usage:
-  1. Make the JSON below match your actual JSON structure (or load it from a file).
-  2. Run this script.
-  3. Open `output.kicad_pcb` in KiCad’s PCB editor.
+  $ python json_to_pcb.py design.json [more.json ...] [--out boards/]
+  $ python json_to_pcb.py designs.jsonl --out boards/ --workers 4
+  $ cat designs.jsonl | python json_to_pcb.py - --out boards/
+  $ python json_to_pcb.py design.json --board 80x60 --placement grid
+
+As a library:
+  from json_to_pcb import build_board
+  board_text = build_board(filled)
 """
 
+import io
+import os
+import sys
 import json
-import pcbnew
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, Dict, Iterator, Optional, Tuple
 
-# ──────────────────────────────────────────────────────────────────────────────
-# 1) Paste or load your JSON here. This example uses exactly the JSON you gave.
-#    You could also do: 
-#       with open("input.json") as f: data = json.load(f)
-# ──────────────────────────────────────────────────────────────────────────────
-data = {
-    "filledTemplate": {
-        "circuit_type": "buck_converter",
-        "components": [
-            {
-                "footprint": "Regulator_Boards:LM2676S_PowerPad",
-                "params": { "Iout": "2A", "Vin": "12V", "Vout": "5V" },
-                "ref": "U1",
-                "type": "LM2676S"
-            },
-            {
-                "connections": ["SW", "Vout"],
-                "footprint": "Inductor_SMD:L_0805",
-                "ref": "L1",
-                "type": "47uH_2A"
-            },
-            {
-                "connections": ["SW", "GND"],
-                "footprint": "Diode_SMD:BAT54",
-                "ref": "D1",
-                "type": "SR560"
-            },
-            {
-                "connections": ["Vin", "GND"],
-                "footprint": "Capacitor_SMD:C_0805",
-                "ref": "C1",
-                "type": "22uF_35V"
-            },
-            {
-                "connections": ["Vout", "GND"],
-                "footprint": "Capacitor_SMD:C_0805",
-                "ref": "C2",
-                "type": "47uF_10V"
-            }
-        ],
-        "connections": [
-            { "from": "U1.Vin",  "net": "Vin",  "to": "C1.+" },
-            { "from": "U1.GND",  "net": "GND",  "to": "C1.-" },
-            { "from": "U1.SW",   "net": "SW",   "to": "L1.1" },
-            { "from": "L1.2",    "net": "Vout", "to": "C2.+" },
-            { "from": "L1.2",    "net": "GND",  "to": "C2.-" },
-            { "from": "U1.Vout", "net": "Vout", "to": "C2.+" }
-        ],
-        "description": "Step-down (buck) DC–DC converter",
-        "placeholders": {
-          "input_voltage": None,
-          "output_current": None,
-          "output_voltage": None
-        }
-    },
-    "kicad_sch_url": "/download/buck_converter_1748703256.kicad_sch",
-    "spec": {
-        "Vin": None,
-        "Vout": None,
-        "circuit_type": "buck_converter",
-        "clock_freq": None,
-        "cutoff_frequency": None,
-        "filter_capacitance": None,
-        "frequency": None,
-        "gain": None,
-        "input_ac": None,
-        "input_signal": None,
-        "input_voltage": "12V",
-        "led_current": None,
-        "mcu": None,
-        "output_current": "2A",
-        "output_voltage": "5V",
-        "reference_voltage": None,
-        "resistor_value": None,
-        "sensor": None,
-        "threshold_high": None,
-        "threshold_low": None
-    }
-}
-
-# Convenience variables
-filled = data["filledTemplate"]
-components = filled["components"]
-connections = filled["connections"]
-
-
-# ──────────────────────────────────────────────────────────────────────────────
-# 2) Create a brand‐new PCB board
-# ──────────────────────────────────────────────────────────────────────────────
-board = pcbnew.BOARD()
+sys.path.insert(0, str(Path(__file__).resolve().parent))
 
-
-# Optionally set some metadata
-board.SetDesignSettings(
-    pcbnew.DESIGN_SETTINGS(
-        default_net_class="Default",     # You can change net classes if desired
-        interactive_router=True
-    )
+from scripts.footprint_cache import FOOTPRINT_CACHE_ENABLED, get_footprint_cache
+from scripts.pcb_generator import (
+    PLACEMENT_ENGINE, ROUTER_ENABLED, place_board, placement_summary, route_board, routing_summary,
 )
-board.SetTitle(filled["description"])  # Set the board title to the description
-
-
-# ──────────────────────────────────────────────────────────────────────────────
-# 3) Parse components: load footprints, assign references, and place them on a grid
-# ──────────────────────────────────────────────────────────────────────────────
-#
-# We will place each part on a simple 10 mm × 10 mm grid for clarity.
-# Feel free to adjust the grid spacing or positions to suit your layout.
-
-GRID_X_SPACING = 20  # mm
-GRID_Y_SPACING = 20  # mm
-
-def mm_to_coord(x_mm, y_mm):
-    """Convert millimeters to pcbnew internal coordinates (nanometers)."""
-    return pcbnew.wxPoint(int(pcbnew.FromMM(x_mm)), int(pcbnew.FromMM(y_mm)))
-
-
-# Keep a dictionary from reference → footprint module so we can assign nets later
-ref_to_module = {}
-
-# Loop through each component in JSON and place it
-x_idx = 0
-y_idx = 0
-
-for comp in components:
-    ref     = comp["ref"]         # e.g. "U1", "L1", "D1", etc.
-    footprint_full = comp["footprint"]  # e.g. "Regulator_Boards:LM2676S_PowerPad"
-    
-    # Some JSONs might omit the "library:" prefix—KiCad can still find it if installed in default path.
-    # We’ll pass exactly footprint_full to FootprintLoad. 
-    # (KiCad’s default search paths will resolve e.g. "Diode_SMD:BAT54" etc.)
-    #
-    footprint_lib, footprint_name = footprint_full.split(":")
-    
-    # Use pcbnew.FootprintLoad("", "Library:Name") to let KiCad search its default libs
-    module = pcbnew.FootprintLoad("", footprint_full)
-    if module is None:
-        raise ValueError(f"Could not load footprint '{footprint_full}' for {ref}")
-
-    # Assign the reference designator
-    module.SetReference(ref)
+from scripts.pcb_writer import write_pcb
+from scripts.logs import setup_logging
 
-    # Place it on the board at (x_idx, y_idx) grid
-    pos = mm_to_coord(x_idx * GRID_X_SPACING, y_idx * GRID_Y_SPACING)
-    module.SetPosition(pos)
 
-    board.Add(module)
-    ref_to_module[ref] = module
+def filled_template(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Accept a whole /generate response or a bare filled template."""
+    return record.get("filledTemplate", record)
 
-    # Advance the grid: move in X; wrap around every 5 parts
-    x_idx += 1
-    if x_idx >= 5:
-        x_idx = 0
-        y_idx += 1
 
+def build_board(filled: Dict[str, Any], **options) -> str:
+    """Return the .kicad_pcb text for one filled template (options: see write_board)."""
+    out = io.StringIO()
+    write_board(filled, out, **options)
+    return out.getvalue()
 
-# ──────────────────────────────────────────────────────────────────────────────
-# 4) Create nets and assign pads according to the JSON “connections”
-# ──────────────────────────────────────────────────────────────────────────────
-#
-# We will:
-#   • Iterate through each connection record (e.g. { "from": "U1.Vin", "net": "Vin", "to": "C1.+" })
-#   • For each distinct net name (“Vin”, “GND”, “SW”, “Vout”), we either find or create a NETINFO_ITEM.
-#   • Grab the pad on the “from” module and on the “to” module, and set both pads to that net.
-#
-#   Note: Pad‐naming must match exactly the pad names inside the footprint. If the footprint uses numeric
-#   pad numbers (like “1”, “2”), then JSON must use those. In your JSON you have “U1.Vin” or “C1.+”,
-#   so this assumes that in the Regulator_Boards:LM2676S_PowerPad footprint, one pad is actually named “Vin”,
-#   another “GND”, “SW”, etc., and that for the capacitors, KiCad uses “+” and “–” pad names (common for polarized).
-#
 
-# Keep a dictionary of net_name → NETINFO_ITEM on this board
-net_dict = {}
-
-def get_or_create_net(board, net_name):
+def write_board(filled: Dict[str, Any], out, board: Optional[Tuple[float, float]] = None,
+                engine: Optional[str] = None, routed: bool = ROUTER_ENABLED) -> Dict[str, Any]:
     """
-    Return a NETINFO_ITEM for net_name, creating it if it doesn’t exist yet.
+    Stream the board for `filled` into `out`, placed by `engine` inside
+    `board` (width, height in mm) and routed if `routed`. Returns the
+    placement report, with the routing report under "routing".
     """
-    if net_name in net_dict:
-        return net_dict[net_name]
-
-    # Create a new net on the board
-    net = pcbnew.NETINFO_ITEM(board, net_name)
-    board.Add(net)
-    net_dict[net_name] = net
-    return net
-
-# Assign pads to nets
-for conn in connections:
-    net_name = conn["net"]
-    from_token = conn["from"]  # e.g. "U1.Vin"
-    to_token   = conn["to"]    # e.g. "C1.+"
-
-    # Helper to parse "Ref.PadName" → (ref, pad_name)
-    def parse_ref_pin(token: str):
-        if "." not in token:
-            raise ValueError(f"Invalid token format (no dot): {token}")
-        return tuple(token.split(".", 1))
-
-    from_ref, from_pin = parse_ref_pin(from_token)
-    to_ref,   to_pin   = parse_ref_pin(to_token)
-
-    # Find the modules by reference
-    if from_ref not in ref_to_module or to_ref not in ref_to_module:
-        raise ValueError(f"Component reference not found: {from_ref} or {to_ref}")
-
-    mod_from = ref_to_module[from_ref]
-    mod_to   = ref_to_module[to_ref]
-
-    # Make sure the net exists on the board
-    net = get_or_create_net(board, net_name)
-
-    # Helper: find a pad on a module by pad‐name or by pad‐number
-    def find_pad(module, pad_name):
-        """
-        Try module.FindPadByName(pad_name). If that fails, try module.FindPadByNumber(pad_name).
-        """
-        pad = module.FindPadByName(pad_name)
-        if pad is None:
-            pad = module.FindPadByNumber(pad_name)
-        if pad is None:
-            raise ValueError(f"Pad '{pad_name}' not found on module '{module.GetReference()}'")
-        return pad
-
-    pad_from = find_pad(mod_from, from_pin)
-    pad_to   = find_pad(mod_to,   to_pin)
-
-    # Assign those pads to the net
-    pad_from.SetNet(net)
-    pad_to.SetNet(net)
-
-# ──────────────────────────────────────────────────────────────────────────────
-# 5) Save out the board to “output.kicad_pcb”
-# ──────────────────────────────────────────────────────────────────────────────
-output_path = Path("output.kicad_pcb")
-pcbnew.SaveBoard(str(output_path), board)
-print(f"✅ Board written to {output_path.resolve()}")
+    circuit_type = filled.get("circuit_type", "board")
+    placed, report = place_board(filled, circuit_type, board=board, engine=engine)
+    comments, tracks = [placement_summary(report)], None
+    if routed:
+        tracks, report["routing"] = route_board(placed, report)
+        comments.append(routing_summary(report["routing"]))
+    write_pcb(out, circuit_type, placed, title=filled.get("description") or circuit_type,
+              outline=report["outline"], comments=comments, tracks=tracks)
+    return report
+
+
+def iter_records(inputs) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Yield (name, filled template) from .json files (one design each) and
+    .jsonl files or "-" for stdin (one design per line).
+    """
+    for source in inputs:
+        if source == "-" or source.endswith(".jsonl"):
+            stem = "stdin" if source == "-" else Path(source).stem
+            f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+            try:
+                for lineno, line in enumerate(f, start=1):
+                    if line.strip():
+                        yield f"{stem}_{lineno}", filled_template(json.loads(line))
+            finally:
+                if f is not sys.stdin:
+                    f.close()
+        else:
+            yield Path(source).stem, filled_template(json.loads(Path(source).read_text(encoding="utf-8")))
+
+
+def parse_board_size(text: str) -> Tuple[float, float]:
+    """ "80x60" → (80.0, 60.0) mm."""
+    try:
+        width, height = (float(v) for v in text.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT in mm, got {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"board size must be positive, got {text!r}")
+    return width, height
+
+
+def _convert(job: Tuple[str, Dict[str, Any], str, Dict[str, Any]]) -> Tuple[str, Optional[str], float, Any]:
+    """Write one board; returns (name, path, seconds, placement report) or (name, None, seconds, error)."""
+    name, filled, out_dir, options = job
+    started = time.perf_counter()
+    path = Path(out_dir) / f"{name}.kicad_pcb"
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            report = write_board(filled, f, **options)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return name, None, time.perf_counter() - started, f"{type(e).__name__}: {e}"
+    return name, str(path), time.perf_counter() - started, report
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("inputs", nargs="+", help=".json / .jsonl files, or - for JSONL on stdin")
+    ap.add_argument("--out", default=".", help="directory for the .kicad_pcb files (default: .)")
+    ap.add_argument("--workers", type=int, default=1, help="processes to use (default: 1)")
+    ap.add_argument("--board", type=parse_board_size, help="board size WIDTHxHEIGHT in mm (default: fit the parts)")
+    ap.add_argument("--placement", choices=["anneal", "grid"], default=PLACEMENT_ENGINE,
+                    help=f"placement engine (default: {PLACEMENT_ENGINE})")
+    ap.add_argument("--no-route", dest="route", action="store_false", default=ROUTER_ENABLED,
+                    help="leave the nets as ratsnest (no copper tracks)")
+    args = ap.parse_args()
+
+    # Warnings (missing footprints, unresolved pins) go to stderr as plain text
+    setup_logging(fmt=os.getenv("LOG_FORMAT", "text"))
+    Path(args.out).mkdir(parents=True, exist_ok=True)
+    options = {"board": args.board, "engine": args.placement, "routed": args.route}
+    jobs = ((name, filled, args.out, options) for name, filled in iter_records(args.inputs))
+
+    started = time.perf_counter()
+    done = failed = 0
+    total_hpwl = placement_seconds = routing_seconds = 0.0
+    nets = nets_routed = 0
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+        results = executor.map(_convert, jobs, chunksize=8)
+    else:
+        executor, results = None, map(_convert, jobs)
+    try:
+        for name, path, seconds, report in results:
+            if path is not None:
+                done += 1
+                total_hpwl += report["hpwl"]
+                placement_seconds += report["seconds"]
+                print(f"ok     {name}: {path} ({seconds * 1e3:.1f} ms; HPWL {report['hpwl']:.1f} mm, "
+                      f"placed in {report['seconds'] * 1e3:.1f} ms)")
+                routing = report.get("routing")
+                if routing:
+                    nets += routing["nets"]
+                    nets_routed += routing["routed"]
+                    routing_seconds += routing["seconds"]
+                    per_net = routing["seconds_per_net"]
+                    slowest = max(per_net, key=per_net.get) if per_net else None
+                    print(f"       routed {routing['routed']}/{routing['nets']} nets, {routing['vias']} vias "
+                          f"in {routing['seconds'] * 1e3:.1f} ms"
+                          + (f" (slowest: {slowest} {per_net[slowest] * 1e3:.1f} ms)" if slowest else "")
+                          + (f"; unrouted: {', '.join(routing['unrouted'])}" if routing["unrouted"] else ""))
+            else:
+                failed += 1
+                print(f"error  {name}: {report}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed * 60 if elapsed > 0 else 0.0
+    print(f"Boards written: {done}, failed: {failed}, {elapsed:.2f}s ({rate:.0f} boards/min)")
+    print(f"Placement ({args.placement}): total HPWL {total_hpwl:.1f} mm, {placement_seconds:.2f}s placing")
+    if args.route:
+        print(f"Routing: {nets_routed}/{nets} nets routed, {routing_seconds:.2f}s routing")
+    if executor is None and FOOTPRINT_CACHE_ENABLED:
+        stats = get_footprint_cache().stats()
+        print(f"Footprint cache: {stats['footprints']} footprints in {stats['libraries']} libraries mapped, "
+              f"{stats['builds']} built, {stats['hits']} hits / {stats['misses']} misses")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+# scripts/artifact_cache.py
+
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+# Bump when generator output changes so stale artifacts stop matching
+ARTIFACT_VERSION = "1"
+
+_SI_PREFIX = {"": 1.0, "p": 1e-12, "n": 1e-9, "u": 1e-6, "µ": 1e-6, "m": 1e-3, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9}
+_UNITS = {"v": "V", "a": "A", "hz": "Hz", "f": "F", "h": "H", "w": "W", "ω": "ohm", "ohm": "ohm", "ohms": "ohm"}
+
+# "12 V", "12V", "12.0v", "100 nF", "0.1uF", "2.2kΩ"
+_QUANTITY_RE = re.compile(
+    r"(?<![\w.])(\d+(?:\.\d+)?)\s*([pnuµmkKMG]?)(v|a|hz|f|h|w|Ω|ohms?)(?![a-zA-Z0-9])",
+    re.I,
+)
+
+
+def normalize_units(text: str) -> str:
+    """
+    Rewrite every quantity in `text` as <SI value><unit>, so "12 V",
+    "12V" and "12.0V" all become "12V" and "100nF" equals "0.1uF".
+    """
+    def repl(m):
+        number, prefix, unit = m.group(1), m.group(2), m.group(3).lower()
+        # Only "M" means mega; "m" is milli (except "mHz", which is always MHz in practice)
+        if prefix == "m" and unit == "hz":
+            prefix = "M"
+        value = float(number) * _SI_PREFIX.get(prefix, 1.0)
+        return f"{value:.6g}{_UNITS[unit]}"
+    return _QUANTITY_RE.sub(repl, text)
+
+
+def _canonical(obj: Any) -> Any:
+    if isinstance(obj, str):
+        return normalize_units(obj.strip())
+    if isinstance(obj, dict):
+        return {k: _canonical(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, list):
+        return [_canonical(v) for v in obj]
+    return obj
+
+
+def artifact_key(filled: Dict[str, Any], spec: Any, backend: str = "") -> str:
+    """
+    Content hash of a design: the filled template plus the spec, with keys
+    sorted, nulls dropped and units normalized.
+    """
+    spec_dict = spec.model_dump() if hasattr(spec, "model_dump") else dict(spec or {})
+    canonical = json.dumps(
+        {"v": ARTIFACT_VERSION, "backend": backend, "filled": _canonical(filled), "spec": _canonical(spec_dict)},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ArtifactCache:
+    """
+    Index of generated artifacts by content hash, stored as SQLite next to
+    the files so every worker shares it. Entries older than `max_age`
+    seconds are dropped, and least-recently-used files are deleted once
+    the total size passes `max_bytes`. Hit, miss, store and eviction
+    counts live in the index too: lookups happen in the generation pool
+    workers, and the web process reports them.
+    """
+
+    def __init__(self, output_dir: str, max_bytes: int = 512 * 1024 * 1024, max_age: float = 7 * 86400.0):
+        self.output_dir = Path(output_dir).resolve()
+        self.index_path = self.output_dir / ".artifact_index.sqlite3"
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+
+    def _db(self) -> sqlite3.Connection:
+        """Return this process's SQLite connection (re-opened after fork)."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.index_path), timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS artifacts ("
+                " key TEXT PRIMARY KEY,"
+                " filename TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS artifacts_accessed ON artifacts(accessed)")
+            conn.execute("CREATE TABLE IF NOT EXISTS artifact_counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _count(self, db: sqlite3.Connection, name: str) -> None:
+        """Bump a shared counter (committed with the caller's transaction)."""
+        db.execute(
+            "INSERT INTO artifact_counters (name, value) VALUES (?, 1)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """Return the path of the artifact for `key`, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute("SELECT filename, created FROM artifacts WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                path = self.output_dir / row[0]
+                if now - row[1] <= self.max_age and path.is_file():
+                    db.execute("UPDATE artifacts SET accessed = ?, hits = hits + 1 WHERE key = ?", (now, key))
+                    self._count(db, "hits")
+                    db.commit()
+                    return path
+                self._drop(db, key, row[0])
+            self._count(db, "misses")
+            db.commit()
+            return None
+
+    def store(self, key: str, path: Path) -> None:
+        """Record a freshly generated artifact, then enforce retention."""
+        path = Path(path).resolve()
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO artifacts (key, filename, size, created, accessed, hits)"
+                " VALUES (?, ?, ?, ?, ?, 0)",
+                (key, path.name, path.stat().st_size, now, now),
+            )
+            self._count(db, "stores")
+            self._enforce_retention(db, now)
+            db.commit()
+
+    def _drop(self, db: sqlite3.Connection, key: str, filename: str) -> None:
+        db.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+        try:
+            (self.output_dir / filename).unlink()
+        except FileNotFoundError:
+            pass
+        self._count(db, "evictions")
+
+    def _enforce_retention(self, db: sqlite3.Connection, now: float) -> None:
+        for key, filename in db.execute(
+            "SELECT key, filename FROM artifacts WHERE created < ?", (now - self.max_age,)
+        ).fetchall():
+            self._drop(db, key, filename)
+
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, filename, size in db.execute(
+            "SELECT key, filename, size FROM artifacts ORDER BY accessed ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._drop(db, key, filename)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            db = self._db()
+            stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+            stats.update(db.execute("SELECT name, value FROM artifact_counters").fetchall())
+            count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        lookups = stats["hits"] + stats["misses"]
+        stats["entries"] = count
+        stats["bytes"] = size
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+ARTIFACT_CACHE_ENABLED = os.getenv("ARTIFACT_CACHE_ENABLED", "1") != "0"
+
+_artifact_cache: Optional[ArtifactCache] = None
+_artifact_cache_lock = threading.Lock()
+
+
+def get_artifact_cache() -> ArtifactCache:
+    """
+    Return the process-wide artifact cache for KICAD_OUTPUT_PATH.
+    """
+    global _artifact_cache
+    with _artifact_cache_lock:
+        if _artifact_cache is None:
+            _artifact_cache = ArtifactCache(
+                os.getenv("KICAD_OUTPUT_PATH", "./output"),
+                max_bytes=int(os.getenv("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024))),
+                max_age=float(os.getenv("ARTIFACT_CACHE_MAX_AGE", str(7 * 86400))),
+            )
+    return _artifact_cache
+
+
+def artifact_cache_stats() -> Dict[str, Any]:
+    if not ARTIFACT_CACHE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_artifact_cache().stats()}
@@ -0,0 +1,118 @@
+# scripts/batch.py
+
+import os
+import time
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from scripts.parser import CircuitSpec, call_gemini_for_spec
+from scripts.template_matcher import match_and_fill_template
+from scripts.generation_pool import get_generation_pool
+from scripts.pipeline import STAGES
+from scripts.metrics import count_error, observe_stage
+
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+
+def _resolve_spec(item: Union[str, Dict[str, Any]], use_cache: bool) -> Tuple[CircuitSpec, float]:
+    """
+    Turn a batch item into a CircuitSpec: prompts go through Gemini (or the
+    spec cache), dicts are validated directly.
+    """
+    started = time.perf_counter()
+    if isinstance(item, str):
+        spec = call_gemini_for_spec(item, use_cache=use_cache)
+    elif isinstance(item, dict):
+        spec = CircuitSpec(**item)
+    else:
+        raise ValueError("Each item must be a prompt string or a CircuitSpec object.")
+    return spec, round(time.perf_counter() - started, 6)
+
+
+def _observe(timings: Dict[str, float], spec: Optional[CircuitSpec]) -> None:
+    for stage, seconds in timings.items():
+        observe_stage(stage, spec.circuit_type if spec is not None else None, seconds)
+
+
+def _error(index: int, stage: str, e: Exception, timings: Dict[str, float],
+           spec: Optional[CircuitSpec] = None) -> Dict[str, Any]:
+    _observe(timings, spec)
+    count_error(stage)
+    return {"index": index, "ok": False, "stage": stage, "error": f"{STAGES[stage]}: {e}", "timings": timings}
+
+
+def _run_item(index: int, item: Union[str, Dict[str, Any]], use_cache: bool, part_cache: dict) -> Dict[str, Any]:
+    """
+    Run one batch item through parse → fill → generate → pcb.
+    """
+    timings: Dict[str, float] = {}
+
+    try:
+        spec, timings["parse"] = _resolve_spec(item, use_cache)
+    except Exception as e:
+        return _error(index, "parse", e, timings)
+
+    started = time.perf_counter()
+    try:
+        filled = match_and_fill_template(spec)
+    except Exception as e:
+        return _error(index, "fill", e, timings, spec)
+    timings["fill"] = round(time.perf_counter() - started, 6)
+
+    started = time.perf_counter()
+    try:
+        path = get_generation_pool().generate(filled, spec, part_cache=part_cache)
+    except Exception as e:
+        return _error(index, "generate", e, timings, spec)
+    timings["generate"] = round(time.perf_counter() - started, 6)
+
+    # A failed board still leaves a usable netlist: report it, keep the item
+    started = time.perf_counter()
+    try:
+        pcb_path, pcb_error = get_generation_pool().generate_pcb(filled, spec), None
+    except Exception as e:
+        pcb_path, pcb_error = None, f"{STAGES['pcb']}: {e}"
+        count_error("pcb")
+    timings["pcb"] = round(time.perf_counter() - started, 6)
+
+    _observe(timings, spec)
+    return {
+        "index": index,
+        "ok": True,
+        "spec": spec.model_dump(),
+        "filledTemplate": filled,
+        "kicad_sch_url": f"/download/{os.path.basename(path)}",
+        "kicad_pcb_url": f"/download/{os.path.basename(pcb_path)}" if pcb_path else None,
+        "pcb_error": pcb_error,
+        "timings": timings,
+    }
+
+
+def run_batch(
+    items: List[Union[str, Dict[str, Any]]],
+    use_cache: bool = True,
+    concurrency: int = BATCH_CONCURRENCY,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Generate many designs, yielding one result dict per item as soon as it
+    is finished (so results arrive in completion order, tagged with the
+    item's `index`).
+
+    Items run on up to `concurrency` threads; netlists are generated on the
+    shared generation pool (or inline with one part cache for the whole
+    batch when the pool is disabled). Templates come from the shared registry.
+    """
+    part_cache: dict = {}
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch")
+    try:
+        # Items log under the batch request's id (a context can only be entered once at a time)
+        futures = [pool.submit(contextvars.copy_context().run, _run_item, i, item, use_cache, part_cache)
+                   for i, item in enumerate(items)]
+        for fut in as_completed(futures):
+            yield fut.result()
+    finally:
+        # Client went away or we finished: don't wait on queued items
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,314 @@
+# scripts/footprint_cache.py
+"""
+Footprint geometry cache. Each KiCad footprint library (<Lib>.pretty) is
+parsed once into one compact file: pad numbers in a small JSON header,
+pad rectangles (x, y, width, height) and courtyard outlines (x, y) as
+packed float32 arrays. The files are memory-mapped, so every gunicorn
+worker shares one copy through the page cache. A file is named after
+its library's checksum (names, sizes and mtimes of the .kicad_mod
+files), so editing a library simply produces a new file.
+
+  $ python -m scripts.footprint_cache build [--lib Resistor_SMD ...]
+  $ python -m scripts.footprint_cache show Resistor_SMD:R_0603_1608Metric
+  $ python -m scripts.footprint_cache stats
+"""
+
+import os
+import sys
+import json
+import mmap
+import time
+import array
+import struct
+import hashlib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from scripts.footprints import Pad, courtyard_outline, footprint_dirs, read_pads
+from scripts.sexpr import parse_sexpr
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"PCBFPC1\n"
+# magic, header length; the float32 data starts at the next multiple of 8
+_PREAMBLE = struct.Struct("<8sI")
+
+FOOTPRINT_CACHE_ENABLED = os.getenv("FOOTPRINT_CACHE_ENABLED", "1") != "0"
+
+
+def library_dirs() -> Dict[str, Path]:
+    """library name → <Lib>.pretty directory; earlier footprint dirs win."""
+    libs: Dict[str, Path] = {}
+    for root in footprint_dirs():
+        for path in sorted(Path(root).glob("*.pretty")):
+            if path.is_dir():
+                libs.setdefault(path.stem, path)
+    return libs
+
+
+def library_checksum(pretty_dir: Path) -> str:
+    """Hash of the names, sizes and mtimes of the library's footprint files."""
+    h = hashlib.sha1()
+    for path in sorted(Path(pretty_dir).glob("*.kicad_mod")):
+        st = path.stat()
+        h.update(f"{path.name}\0{st.st_size}\0{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def build_library_file(lib: str, pretty_dir: Path, out_path: Path) -> Dict[str, Any]:
+    """
+    Parse every footprint of `pretty_dir` and write the cache file
+    atomically. Returns {"footprints": n, "failed": {file: error}}.
+    """
+    floats = array.array("f")
+    footprints: Dict[str, List[Any]] = {}
+    failed: Dict[str, str] = {}
+    for path in sorted(Path(pretty_dir).glob("*.kicad_mod")):
+        try:
+            tree = parse_sexpr(path.read_text(encoding="utf-8"))
+            pads, outline = read_pads(tree), courtyard_outline(tree)
+        except (OSError, ValueError) as e:
+            failed[path.name] = str(e)
+            continue
+        pad_offset = len(floats)
+        for pad in pads:
+            floats.extend((pad.x, pad.y, pad.width, pad.height))
+        outline_offset = len(floats)
+        for x, y in outline:
+            floats.extend((x, y))
+        footprints[path.stem] = [pad_offset, len(pads), outline_offset, len(outline), [p.number for p in pads]]
+
+    header = json.dumps({
+        "library": lib,
+        "checksum": out_path.stem.rsplit(".", 1)[-1],
+        "source": str(Path(pretty_dir).resolve()),
+        "footprints": footprints,
+    }, separators=(",", ":")).encode("utf-8")
+    if sys.byteorder != "little":
+        floats.byteswap()
+    data_offset = -(-(_PREAMBLE.size + len(header)) // 8) * 8
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = out_path.with_name(f".{out_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_PREAMBLE.pack(MAGIC, len(header)))
+            f.write(header)
+            f.write(b"\0" * (data_offset - _PREAMBLE.size - len(header)))
+            f.write(floats.tobytes())
+        os.replace(tmp_path, out_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return {"footprints": len(footprints), "failed": failed}
+
+
+class FootprintGeometry:
+    """
+    One footprint's geometry, viewed straight from the mapped file:
+    `pads` is a flat float32 memoryview (x, y, width, height per pad) and
+    `courtyard` a flat one of (x, y) points; both work with
+    numpy.frombuffer without copying.
+    """
+
+    __slots__ = ("name", "path", "pad_numbers", "pads", "courtyard")
+
+    def __init__(self, name: str, path: Path, pad_numbers: List[str], pads: memoryview, courtyard: memoryview):
+        self.name = name
+        self.path = path
+        self.pad_numbers = pad_numbers
+        self.pads = pads
+        self.courtyard = courtyard
+
+    # float32 → float, rounded to KiCad's 1 nm resolution
+    def pad_list(self) -> List[Pad]:
+        p = [round(v, 6) for v in self.pads]
+        return [Pad(n, p[4 * i], p[4 * i + 1], p[4 * i + 2], p[4 * i + 3]) for i, n in enumerate(self.pad_numbers)]
+
+    def courtyard_points(self) -> List[Tuple[float, float]]:
+        c = [round(v, 6) for v in self.courtyard]
+        return [(c[i], c[i + 1]) for i in range(0, len(c), 2)]
+
+
+class MappedLibrary:
+    """A read-only memory map of one library's cache file."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path}: not a footprint cache file")
+        header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        data_offset = -(-(_PREAMBLE.size + header_len) // 8) * 8
+        self.library = header["library"]
+        self.checksum = header["checksum"]
+        self.source = Path(header["source"])
+        self._footprints = header["footprints"]
+        self._floats = memoryview(self._mm)[data_offset:].cast("f")
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._footprints
+
+    def __len__(self) -> int:
+        return len(self._footprints)
+
+    def get(self, name: str) -> Optional[FootprintGeometry]:
+        entry = self._footprints.get(name)
+        if entry is None:
+            return None
+        pad_offset, n_pads, outline_offset, n_points, numbers = entry
+        return FootprintGeometry(
+            f"{self.library}:{name}",
+            self.source / f"{name}.kicad_mod",
+            numbers,
+            self._floats[pad_offset:pad_offset + 4 * n_pads],
+            self._floats[outline_offset:outline_offset + 2 * n_points],
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._mm)
+
+
+class FootprintCache:
+    """
+    Library name → MappedLibrary, built on first use. The footprint
+    libraries are re-checked at most every `check_interval` seconds; a
+    changed checksum maps (building if needed) the library's new file.
+    """
+
+    def __init__(self, cache_dir: str, check_interval: float = 30.0):
+        self.cache_dir = Path(cache_dir)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._dirs: Dict[str, Path] = {}
+        self._dirs_checked: Optional[float] = None
+        self._libs: Dict[str, Tuple[float, Optional[MappedLibrary]]] = {}
+        self._counters = {"hits": 0, "misses": 0, "builds": 0}
+
+    def _library_dirs(self, now: float) -> Dict[str, Path]:
+        if self._dirs_checked is None or now - self._dirs_checked > self.check_interval:
+            self._dirs = library_dirs()
+            self._dirs_checked = now
+        return self._dirs
+
+    def library(self, lib: str) -> Optional[MappedLibrary]:
+        """The mapped cache of `lib`, or None if no such library is installed."""
+        now = time.monotonic()
+        with self._lock:
+            checked, mapped = self._libs.get(lib, (0.0, None))
+            if lib in self._libs and now - checked <= self.check_interval:
+                return mapped
+            pretty_dir = self._library_dirs(now).get(lib)
+            if pretty_dir is None:
+                mapped = None
+            else:
+                path = self.cache_dir / f"{lib}.{library_checksum(pretty_dir)}.fpc"
+                if mapped is None or mapped.path != path:
+                    mapped = self._map(lib, pretty_dir, path)
+            self._libs[lib] = (now, mapped)
+            return mapped
+
+    def _map(self, lib: str, pretty_dir: Path, path: Path) -> MappedLibrary:
+        if not path.is_file():
+            result = build_library_file(lib, pretty_dir, path)
+            self._counters["builds"] += 1
+            for name, err in result["failed"].items():
+                log.warning("Skipped footprint %s/%s: %s", lib, name, err)
+            # Older checksums of this library are dead weight now
+            for old in self.cache_dir.glob(f"{lib}.*.fpc"):
+                if old != path:
+                    try:
+                        old.unlink()
+                    except OSError:
+                        pass
+        return MappedLibrary(path)
+
+    def get(self, name: str) -> Optional[FootprintGeometry]:
+        """Geometry of "Lib:Name", or None if it is not installed."""
+        lib, _, fp = name.partition(":")
+        mapped = self.library(lib) if fp else None
+        geometry = mapped.get(fp) if mapped is not None else None
+        with self._lock:
+            self._counters["hits" if geometry is not None else "misses"] += 1
+        return geometry
+
+    def build(self, libs: Optional[List[str]] = None) -> Dict[str, int]:
+        """Build (or re-map) the cache for `libs`, default every installed library."""
+        with self._lock:
+            self._dirs_checked = None
+            names = libs or sorted(self._library_dirs(time.monotonic()))
+            for lib in names:
+                self._libs.pop(lib, None)
+        return {lib: len(mapped) for lib in names for mapped in [self.library(lib)] if mapped is not None}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            mapped = [m for _, m in self._libs.values() if m is not None]
+            return {
+                **self._counters,
+                "libraries": len(mapped),
+                "footprints": sum(len(m) for m in mapped),
+                "mapped_bytes": sum(m.nbytes for m in mapped),
+                "cache_dir": str(self.cache_dir),
+            }
+
+
+_footprint_cache: Optional[FootprintCache] = None
+_footprint_cache_lock = threading.Lock()
+
+
+def get_footprint_cache() -> FootprintCache:
+    """
+    Return the process-wide cache in FOOTPRINT_CACHE_DIR (default
+    ./cache/footprints).
+    """
+    global _footprint_cache
+    with _footprint_cache_lock:
+        if _footprint_cache is None:
+            _footprint_cache = FootprintCache(
+                os.getenv("FOOTPRINT_CACHE_DIR", "./cache/footprints"),
+                check_interval=float(os.getenv("FOOTPRINT_CACHE_CHECK_INTERVAL", "30")),
+            )
+        return _footprint_cache
+
+
+def main():
+    ap = argparse.ArgumentParser(description="KiCad footprint geometry cache")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="parse footprint libraries into the cache")
+    b.add_argument("--lib", action="append", help="library to build (repeatable; default: all)")
+    s = sub.add_parser("show", help="print one footprint's cached geometry")
+    s.add_argument("name", help="Lib:Name")
+    sub.add_parser("stats", help="map every installed library and print totals")
+    args = ap.parse_args()
+
+    cache = get_footprint_cache()
+    if args.cmd == "build":
+        started = time.perf_counter()
+        built = cache.build(args.lib)
+        print(f"ok: {len(built)} libraries, {sum(built.values())} footprints "
+              f"in {time.perf_counter() - started:.2f}s → {cache.cache_dir}")
+    elif args.cmd == "show":
+        geometry = cache.get(args.name)
+        if geometry is None:
+            print(f"error: {args.name} is not installed")
+            sys.exit(1)
+        print(json.dumps({
+            "name": geometry.name,
+            "path": str(geometry.path),
+            "pads": [pad._asdict() for pad in geometry.pad_list()],
+            "courtyard": geometry.courtyard_points(),
+        }, indent=2))
+    else:
+        cache.build()
+        print(json.dumps(cache.stats(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+# scripts/footprints.py
+"""
+KiCad footprints for the PCB writer: find "Lib:Name" in the footprint
+libraries (<Lib>.pretty/<Name>.kicad_mod), read its pads and courtyard,
+and synthesize a stand-in when the footprint is not installed.
+"""
+
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from scripts.sexpr import Quoted, parse_sexpr, find, find_all
+
+log = logging.getLogger(__name__)
+
+# Where KiCad installs its footprint libraries (first existing ones are used)
+DEFAULT_FOOTPRINT_DIRS = [
+    "/Applications/KiCad/KiCad.app/Contents/SharedSupport/footprints",
+    "/usr/share/kicad/footprints",
+    "C:/Program Files/KiCad/share/kicad/footprints",
+    "C:/Program Files (x86)/KiCad/share/kicad/footprints",
+]
+FOOTPRINT_DIR_ENV_VARS = ["KICAD_FOOTPRINT_DIR", "KICAD8_FOOTPRINT_DIR", "KICAD7_FOOTPRINT_DIR", "KICAD6_FOOTPRINT_DIR"]
+
+# Courtyard margin around the pads when a footprint has no F.CrtYd
+COURTYARD_MARGIN = 0.25
+
+
+class Pad(NamedTuple):
+    """A pad in footprint coordinates (mm, rotation already applied to the size)."""
+    number: str
+    x: float
+    y: float
+    width: float
+    height: float
+
+
+class Footprint:
+    """
+    One footprint: `pads` its copper pads, `courtyard` the convex outline
+    of its F.CrtYd graphics as (x, y) points and `bbox` (x0, y0, x1, y1).
+    `tree` is the parsed .kicad_mod (quotes kept, see sexpr.parse_sexpr)
+    that the PCB writer copies into the board; footprints built from the
+    geometry cache read it from `path` on first use.
+    """
+
+    def __init__(self, name: str, tree: Optional[List[Any]] = None, synthesized: bool = False,
+                 path: Optional[Path] = None, pads: Optional[Iterable[Pad]] = None,
+                 courtyard: Optional[Iterable[Tuple[float, float]]] = None):
+        self.name = name
+        self.path = path
+        self.synthesized = synthesized
+        self._tree = tree
+        self.pads = tuple(pads) if pads is not None else read_pads(self.tree)
+        self.courtyard = tuple(courtyard) if courtyard is not None else courtyard_outline(self.tree)
+        self.bbox = _bbox(self.courtyard, self.pads)
+        # pad number → its pads (a number can repeat, e.g. exposed pads), built once
+        self.pads_by_number: Dict[str, List[Pad]] = {}
+        for pad in self.pads:
+            self.pads_by_number.setdefault(pad.number, []).append(pad)
+
+    @property
+    def tree(self) -> List[Any]:
+        if self._tree is None:
+            self._tree = _read_tree(self.path)
+        return self._tree
+
+    @property
+    def pad_numbers(self) -> List[str]:
+        return list(self.pads_by_number)
+
+
+def footprint_dirs() -> List[str]:
+    """
+    Footprint library roots: FOOTPRINT_DIRS (os.pathsep separated) if set,
+    otherwise the KICAD*_FOOTPRINT_DIR variables and the usual install paths.
+    """
+    explicit = os.getenv("FOOTPRINT_DIRS")
+    if explicit:
+        candidates = explicit.split(os.pathsep)
+    else:
+        candidates = [os.getenv(var, "") for var in FOOTPRINT_DIR_ENV_VARS] + DEFAULT_FOOTPRINT_DIRS
+    dirs = []
+    for d in candidates:
+        if d and os.path.isdir(d) and os.path.realpath(d) not in map(os.path.realpath, dirs):
+            dirs.append(d)
+    return dirs
+
+
+def find_footprint_file(name: str) -> Optional[Path]:
+    """Path of the .kicad_mod for "Lib:Name", or None if not installed."""
+    if ":" not in name:
+        return None
+    lib, fp = name.split(":", 1)
+    for d in footprint_dirs():
+        path = Path(d) / f"{lib}.pretty" / f"{fp}.kicad_mod"
+        if path.is_file():
+            return path
+    return None
+
+
+def _num(text: str) -> float:
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def read_pads(tree: List[Any]) -> Tuple[Pad, ...]:
+    """Copper pads of a parsed footprint (non-plated holes are skipped)."""
+    pads = []
+    for node in find_all(tree, "pad"):
+        if len(node) < 3 or node[2] == "np_thru_hole":
+            continue
+        at, size = find(node, "at"), find(node, "size")
+        if at is None or size is None:
+            continue
+        width, height = _num(size[1]), _num(size[2])
+        if len(at) > 3 and round(_num(at[3])) % 180 == 90:
+            width, height = height, width
+        pads.append(Pad(str(node[1]), _num(at[1]), _num(at[2]), width, height))
+    return tuple(pads)
+
+
+def _hull(points: List[Tuple[float, float]]) -> Tuple[Tuple[float, float], ...]:
+    """Convex hull, counter-clockwise (monotone chain)."""
+    points = sorted(set(points))
+    if len(points) <= 2:
+        return tuple(points)
+
+    def cross(o, a, b):
+        return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
+
+    lower: List[Tuple[float, float]] = []
+    upper: List[Tuple[float, float]] = []
+    for p in points:
+        while len(lower) >= 2 and cross(lower[-2], lower[-1], p) <= 0:
+            lower.pop()
+        lower.append(p)
+    for p in reversed(points):
+        while len(upper) >= 2 and cross(upper[-2], upper[-1], p) <= 0:
+            upper.pop()
+        upper.append(p)
+    return tuple(lower[:-1] + upper[:-1])
+
+
+def courtyard_outline(tree: List[Any]) -> Tuple[Tuple[float, float], ...]:
+    """Convex outline of the F.CrtYd graphics; empty if there are none."""
+    points: List[Tuple[float, float]] = []
+    for node in tree:
+        if not isinstance(node, list) or not node or not str(node[0]).startswith("fp_"):
+            continue
+        layer = find(node, "layer")
+        if layer is None or len(layer) < 2 or layer[1] != "F.CrtYd":
+            continue
+        center, end = find(node, "center"), find(node, "end")
+        if node[0] == "fp_circle" and center is not None and end is not None:
+            cx, cy = _num(center[1]), _num(center[2])
+            r = ((_num(end[1]) - cx) ** 2 + (_num(end[2]) - cy) ** 2) ** 0.5
+            points += [(cx - r, cy - r), (cx + r, cy - r), (cx + r, cy + r), (cx - r, cy + r)]
+            continue
+        if node[0] == "fp_rect":
+            start = find(node, "start")
+            if start is not None and end is not None:
+                x0, y0, x1, y1 = _num(start[1]), _num(start[2]), _num(end[1]), _num(end[2])
+                points += [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+            continue
+        for key in ("start", "end", "mid"):
+            point = find(node, key)
+            if point is not None and len(point) > 2:
+                points.append((_num(point[1]), _num(point[2])))
+        pts = find(node, "pts")
+        for xy in find_all(pts, "xy") if pts is not None else []:
+            points.append((_num(xy[1]), _num(xy[2])))
+    return _hull(points)
+
+
+def _bbox(courtyard: Iterable[Tuple[float, float]], pads: Iterable[Pad]) -> Tuple[float, float, float, float]:
+    """Bounding box of the courtyard, or of the pads plus a margin."""
+    courtyard = list(courtyard)
+    if courtyard:
+        xs, ys = [p[0] for p in courtyard], [p[1] for p in courtyard]
+        return min(xs), min(ys), max(xs), max(ys)
+
+    pads = list(pads)
+    if not pads:
+        return -1.0, -1.0, 1.0, 1.0
+    m = COURTYARD_MARGIN
+    return (min(p.x - p.width / 2 for p in pads) - m, min(p.y - p.height / 2 for p in pads) - m,
+            max(p.x + p.width / 2 for p in pads) + m, max(p.y + p.height / 2 for p in pads) + m)
+
+
+def _read_tree(path: Path) -> List[Any]:
+    tree = parse_sexpr(Path(path).read_text(encoding="utf-8"), keep_quotes=True)
+    if not isinstance(tree, list) or not tree or tree[0] not in ("footprint", "module"):
+        raise ValueError(f"{path}: not a KiCad footprint")
+    return tree
+
+
+def parse_footprint(path: Path, name: str) -> Footprint:
+    """Read a .kicad_mod file as footprint `name` ("Lib:Name")."""
+    return Footprint(name, _read_tree(path), path=Path(path))
+
+
+def synthesize_footprint(name: str, pad_numbers: Iterable[str]) -> Footprint:
+    """
+    Stand-in for a footprint that is not installed: SMD pads for every
+    pad number, two pads side by side for passives, otherwise two columns
+    at 2.54 mm pitch (pads 1..n/2 down the left, the rest up the right).
+    """
+    numbers = list(dict.fromkeys(pad_numbers)) or ["1", "2"]
+    if len(numbers) <= 2:
+        pads = [(n, -1.0 + 2.0 * i, 0.0, 1.0, 1.2) for i, n in enumerate(numbers)]
+    else:
+        per_side = (len(numbers) + 1) // 2
+        top = -(per_side - 1) * 2.54 / 2
+        pads = [(n, -2.7, top + i * 2.54, 1.6, 0.8) for i, n in enumerate(numbers[:per_side])]
+        pads += [(n, 2.7, top + (per_side - 1 - i) * 2.54, 1.6, 0.8) for i, n in enumerate(numbers[per_side:])]
+
+    half_h = max(abs(y) + h / 2 for _, _, y, _, h in pads) + COURTYARD_MARGIN
+    half_w = max(abs(x) + w / 2 for _, x, _, w, _ in pads) + COURTYARD_MARGIN
+
+    def fmt(v: float) -> str:
+        return f"{v:.4f}".rstrip("0").rstrip(".") or "0"
+
+    def text(kind: str, value: str, y: float) -> List[Any]:
+        return ["fp_text", kind, Quoted(value), ["at", "0", fmt(y)], ["layer", Quoted("F.SilkS")],
+                ["effects", ["font", ["size", "1", "1"], ["thickness", "0.15"]]]]
+
+    tree: List[Any] = [
+        "footprint", Quoted(name.split(":", 1)[-1]),
+        ["layer", Quoted("F.Cu")],
+        ["descr", Quoted(f"Synthesized stand-in for {name} (footprint not installed)")],
+        ["attr", "smd"],
+        text("reference", "REF**", -half_h - 1.0),
+        text("value", name.split(":", 1)[-1], half_h + 1.0),
+        ["fp_rect", ["start", fmt(-half_w), fmt(-half_h)], ["end", fmt(half_w), fmt(half_h)],
+         ["stroke", ["width", "0.05"], ["type", "solid"]], ["fill", "none"], ["layer", Quoted("F.CrtYd")]],
+    ]
+    for number, x, y, w, h in pads:
+        tree.append(["pad", Quoted(number), "smd", "rect", ["at", fmt(x), fmt(y)], ["size", fmt(w), fmt(h)],
+                     ["layers", Quoted("F.Cu"), Quoted("F.Paste"), Quoted("F.Mask")]])
+    return Footprint(name, tree, synthesized=True)
+
+
+# "Lib:Name" → Footprint (None: not installed), per process
+_footprints: Dict[str, Optional[Footprint]] = {}
+# ("Lib:Name", pad numbers) → synthesized stand-in
+_synthesized: Dict[Tuple[str, Tuple[str, ...]], Footprint] = {}
+_footprints_lock = threading.Lock()
+
+
+def _load_installed(name: str) -> Optional[Footprint]:
+    """Footprint "Lib:Name" from the geometry cache, else from its file; None if not installed."""
+    from scripts.footprint_cache import FOOTPRINT_CACHE_ENABLED, get_footprint_cache
+    if FOOTPRINT_CACHE_ENABLED:
+        geometry = get_footprint_cache().get(name)
+        if geometry is None:
+            return None
+        return Footprint(name, path=geometry.path, pads=geometry.pad_list(), courtyard=geometry.courtyard_points())
+
+    path = find_footprint_file(name)
+    try:
+        return parse_footprint(path, name) if path is not None else None
+    except (OSError, ValueError) as e:
+        log.warning("Could not read footprint %s (%s): %s", name, path, e)
+        return None
+
+
+def installed_footprint(name: str) -> Optional[Footprint]:
+    """
+    Footprint "Lib:Name" from the libraries (parsed once per process and
+    shared by every board; writers copy it, never modify it), or None when
+    it is not installed or cannot be read.
+    """
+    with _footprints_lock:
+        cached = _footprints.get(name, False)
+    if cached is False:
+        cached = _load_installed(name)
+        with _footprints_lock:
+            _footprints[name] = cached
+    return cached
+
+
+def load_footprint(name: str, pad_numbers: Iterable[str] = ()) -> Footprint:
+    """
+    The installed footprint "Lib:Name" (see installed_footprint), or a
+    synthesized stand-in with `pad_numbers` when it is not installed.
+    """
+    cached = installed_footprint(name)
+    if cached is not None:
+        return cached
+    key = (name, tuple(pad_numbers))
+    synthesized = _synthesized.get(key)
+    if synthesized is None:
+        log.warning("Footprint %s not installed, using synthesized pads", name)
+        synthesized = _synthesized.setdefault(key, synthesize_footprint(name, key[1]))
+    return synthesized
+
+
+def preload_footprints(names: Iterable[str]) -> Dict[str, Any]:
+    """
+    Load footprints up front (e.g. in a worker initializer) so the first
+    board does not pay for it. Returns {"loaded": n, "missing": [names]}.
+    """
+    loaded, missing = 0, []
+    for name in sorted(set(names)):
+        if load_footprint(name).synthesized:
+            missing.append(name)
+        else:
+            loaded += 1
+    return {"loaded": loaded, "missing": missing}
+
+
+def missing_pads(name: str, pin_numbers: Iterable[str]) -> List[str]:
+    """
+    Symbol pin numbers that have no pad on the installed footprint `name`
+    (nothing to check, and so [], when it is not installed).
+    """
+    footprint = load_footprint(name)
+    if footprint.synthesized:
+        return []
+    return [number for number in pin_numbers if number not in footprint.pads_by_number]
@@ -0,0 +1,271 @@
+# scripts/gemini_stub.py
+"""
+Local stand-in for the Gemini generateContent API, for load and latency
+tests without network or quota. Point the service at it with
+GEMINI_API_URL=http://127.0.0.1:8090/v1beta/models/stub:generateContent
+(and LOCAL_SPEC_ENABLED=0 / no_cache so prompts actually reach it).
+
+Answers are taken from, in order:
+  • a replay file (--replay): JSONL of {"prompt", "status", "body", "seconds"}
+    as written by --record, looked up by the user prompt
+  • a synthesized CircuitSpec: extract_spec_locally where it recognises
+    the prompt, with SYNTHETIC_DEFAULTS filling what it could not find
+
+With --upstream the stub proxies to the real API instead and appends
+every exchange to --record.
+
+Latency is drawn per request from --latency: "0.8" or "fixed:0.8",
+"uniform:0.3,1.2", "normal:0.8,0.2", "lognormal:0.8,0.5" (median, sigma),
+"exp:0.8" (mean), or "recorded" to replay the recorded durations.
+--rate-limit and --error-rate inject 429 (with Retry-After) and 500
+answers. GET /stats returns the counters.
+
+Usage:
+  $ python -m scripts.gemini_stub --port 8090 --latency lognormal:0.8,0.5 --rate-limit 0.02
+  $ python -m scripts.gemini_stub --replay cache/gemini.jsonl --latency recorded
+  $ python -m scripts.gemini_stub --upstream "$REAL_GEMINI_URL" --record cache/gemini.jsonl
+"""
+
+import os
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Field values for a synthesized spec when the prompt does not give them
+SYNTHETIC_DEFAULTS = {
+    "buck_converter":          {"input_voltage": "12V", "output_voltage": "5V", "output_current": "2A"},
+    "ldo_regulator":           {"input_voltage": "5V", "output_voltage": "3.3V"},
+    "inverting_amplifier":     {"gain": "10"},
+    "noninverting_amplifier":  {"gain": "11"},
+    "voltage_divider":         {"Vin": "12V", "Vout": "5V"},
+    "low_pass_filter":         {"cutoff_frequency": "1"},
+    "high_pass_filter":        {"cutoff_frequency": "1"},
+    "555_timer_astable":       {"frequency": "1000"},
+    "bridge_rectifier":        {"input_voltage": "12V", "filter_capacitance": "1000uF"},
+    "voltage_multiplier":      {"input_ac": "12V"},
+    "comparator":              {"threshold_high": "3V", "threshold_low": "2V"},
+    "comparator_noninverting": {"reference_voltage": "2.5V", "input_signal": "SIG"},
+    "led_blinker_555":         {"frequency": "2", "led_current": "10"},
+    "microcontroller_board":   {"mcu": "STM32F103C8T6", "sensor": "BME280", "clock_freq": "8MHz"},
+    "astable_multivibrator":   {"resistor_value": "47k"},
+}
+
+Sampler = Callable[[random.Random, Optional[float]], float]
+
+
+def parse_latency(text: str) -> Sampler:
+    """Turn a --latency string into sampler(rng, recorded_seconds) → seconds."""
+    kind, _, args = text.partition(":") if ":" in text else ("fixed", "", text)
+    if kind == "recorded":
+        return lambda rng, recorded: recorded or 0.0
+    try:
+        values = [float(v) for v in args.split(",")] if args else []
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bad latency numbers in {text!r}")
+    shapes = {
+        "fixed": (1, lambda rng, a: a[0]),
+        "uniform": (2, lambda rng, a: rng.uniform(a[0], a[1])),
+        "normal": (2, lambda rng, a: rng.gauss(a[0], a[1])),
+        "lognormal": (2, lambda rng, a: a[0] * rng.lognormvariate(0.0, a[1])),
+        "exp": (1, lambda rng, a: rng.expovariate(1.0 / a[0]) if a[0] > 0 else 0.0),
+    }
+    if kind not in shapes or len(values) != shapes[kind][0]:
+        raise argparse.ArgumentTypeError(
+            f"expected fixed:S, uniform:LO,HI, normal:MEAN,SD, lognormal:MEDIAN,SIGMA, exp:MEAN or recorded; "
+            f"got {text!r}")
+    draw = shapes[kind][1]
+    return lambda rng, recorded: max(0.0, draw(rng, values))
+
+
+def user_prompt(payload: Dict[str, Any]) -> str:
+    """The user's prompt from a generateContent payload (parser.py prefixes it with the system prompt)."""
+    text = payload["contents"][-1]["parts"][0]["text"]
+    return text.rsplit("User Prompt: ", 1)[-1]
+
+
+def synthesize_spec(prompt: str) -> Dict[str, Any]:
+    """A valid CircuitSpec (as a dict, nulls included) for any prompt."""
+    from scripts.parser import CircuitSpec, _CIRCUIT_TYPE_RES, extract_spec_locally
+
+    spec, _ = extract_spec_locally(prompt)
+    if spec is None:
+        circuit_type = next((ct for ct, rx in _CIRCUIT_TYPE_RES if rx.search(prompt)), "voltage_divider")
+        spec = CircuitSpec(circuit_type=circuit_type)
+    missing = {k: v for k, v in SYNTHETIC_DEFAULTS[spec.circuit_type].items() if getattr(spec, k) is None}
+    return spec.model_copy(update=missing).model_dump()
+
+
+def gemini_body(text: str) -> Dict[str, Any]:
+    """A generateContent response carrying `text` as the model's answer."""
+    return {
+        "candidates": [{
+            "content": {"role": "model", "parts": [{"text": text}]},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": 0, "candidatesTokenCount": 0, "totalTokenCount": 0},
+    }
+
+
+def gemini_error(code: int, status: str, message: str) -> Dict[str, Any]:
+    return {"error": {"code": code, "message": message, "status": status}}
+
+
+class GeminiStub:
+    """Picks the answer, the delay and any injected failure for each request."""
+
+    def __init__(self, latency: Sampler, replay: Optional[str] = None, record: Optional[str] = None,
+                 upstream: Optional[str] = None, rate_limit: float = 0.0, error_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.upstream = upstream
+        self.record = Path(record) if record else None
+        self.recorded: Dict[str, Dict[str, Any]] = {}
+        if replay:
+            with open(replay, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.recorded[entry["prompt"]] = entry
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "replayed": 0, "synthesized": 0, "proxied": 0,
+                         "rate_limited": 0, "errors": 0, "bad_requests": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counters[key] += 1
+
+    def answer(self, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        """(status, JSON body, extra headers) for one generateContent call, after its delay."""
+        self._count("requests")
+        try:
+            prompt = user_prompt(payload)
+        except (KeyError, IndexError, TypeError):
+            self._count("bad_requests")
+            return 400, gemini_error(400, "INVALID_ARGUMENT", "contents[].parts[].text is required"), {}
+
+        if self.upstream:
+            return self._proxy(prompt, payload)
+
+        entry = self.recorded.get(prompt)
+        with self._lock:
+            roll = self._rng.random()
+            delay = self.latency(self._rng, entry.get("seconds") if entry else None)
+        time.sleep(delay)
+
+        if roll < self.rate_limit:
+            self._count("rate_limited")
+            return 429, gemini_error(429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (stub)."), \
+                {"Retry-After": f"{self.retry_after:g}"}
+        if roll < self.rate_limit + self.error_rate:
+            self._count("errors")
+            return 500, gemini_error(500, "INTERNAL", "An internal error has occurred (stub)."), {}
+        if entry is not None:
+            self._count("replayed")
+            return entry["status"], entry["body"], {}
+        self._count("synthesized")
+        return 200, gemini_body(json.dumps(synthesize_spec(prompt))), {}
+
+    def _proxy(self, prompt: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any], Dict[str, str]]:
+        import requests
+
+        started = time.perf_counter()
+        response = requests.post(self.upstream, json=payload, params={"key": os.getenv("GEMINI_API_KEY")},
+                                 timeout=(3.05, 60))
+        seconds = time.perf_counter() - started
+        try:
+            body = response.json()
+        except ValueError:
+            body = gemini_error(response.status_code, "UNPARSEABLE", response.text[:500])
+        self._count("proxied")
+        if self.record is not None:
+            line = json.dumps({"prompt": prompt, "status": response.status_code, "body": body,
+                               "seconds": round(seconds, 6)}, ensure_ascii=False)
+            with self._lock, open(self.record, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        return response.status_code, body, {}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.counters, "recorded_prompts": len(self.recorded)}
+
+
+def make_handler(stub: GeminiStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, gemini_error(400, "INVALID_ARGUMENT", "Invalid JSON payload."))
+            if not self.path.split("?", 1)[0].endswith(":generateContent"):
+                return self._send(404, gemini_error(404, "NOT_FOUND", f"Unknown method {self.path}"))
+            self._send(*stub.answer(payload))
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] == "/stats":
+                return self._send(200, stub.stats())
+            self._send(404, gemini_error(404, "NOT_FOUND", f"Unknown path {self.path}"))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8090)
+    ap.add_argument("--latency", type=parse_latency, default=parse_latency("0"),
+                    help="per-request delay distribution (default: none)")
+    ap.add_argument("--replay", help="JSONL of recorded exchanges to answer from")
+    ap.add_argument("--upstream", help="proxy to this generateContent URL instead (uses GEMINI_API_KEY)")
+    ap.add_argument("--record", help="with --upstream: append every exchange to this JSONL file")
+    ap.add_argument("--rate-limit", type=float, default=0.0, help="fraction of requests answered 429")
+    ap.add_argument("--retry-after", type=float, default=1.0, help="Retry-After on injected 429s (s)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 500")
+    ap.add_argument("--seed", type=int, help="seed the latency and failure draws")
+    args = ap.parse_args()
+    if args.record and not args.upstream:
+        ap.error("--record needs --upstream")
+
+    stub = GeminiStub(args.latency, replay=args.replay, record=args.record, upstream=args.upstream,
+                      rate_limit=args.rate_limit, error_rate=args.error_rate, retry_after=args.retry_after,
+                      seed=args.seed)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(stub))
+    server.daemon_threads = True
+    print(f"Gemini stub on http://{args.host}:{server.server_port}/v1beta/models/stub:generateContent "
+          f"({len(stub.recorded)} recorded prompts)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(stub.stats()))
+
+
+if __name__ == "__main__":
+    main()
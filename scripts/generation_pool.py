@@ -0,0 +1,311 @@
+# scripts/generation_pool.py
+
+import os
+import sys
+import time
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, List, Optional
+
+from scripts.logs import get_request_id, reset_request_id, set_request_id, setup_logging
+
+# ───────────────────────────────────────────────────────────────
+# Worker side: runs inside the pool's child processes
+# ───────────────────────────────────────────────────────────────
+_worker_part_cache: dict = {}
+_worker_info: Dict[str, Any] = {}
+
+
+def _init_worker(libraries: Optional[List[str]]) -> None:
+    """
+    Import SKiDL and load the symbol index and part libraries once, before
+    the first task.
+    """
+    started = time.perf_counter()
+    setup_logging()
+    from scripts.kicad_generator import warm_up
+    preload = warm_up(libraries)
+    _worker_info.update({
+        "pid": os.getpid(),
+        "warmup_seconds": round(time.perf_counter() - started, 6),
+        "parts_loaded": preload["loaded"],
+        "parts_failed": len(preload["failed"]),
+    })
+
+
+def _ping() -> Dict[str, Any]:
+    return dict(_worker_info)
+
+
+def _timed_task(produce, submitted: float, request_id: Optional[str]) -> Dict[str, Any]:
+    queue_wait = time.time() - submitted
+    started = time.perf_counter()
+    token = set_request_id(request_id)
+    try:
+        path = produce()
+    finally:
+        reset_request_id(token)
+    return {
+        "path": path,
+        "worker": dict(_worker_info),
+        "queue_wait": round(max(queue_wait, 0.0), 6),
+        "generate": round(time.perf_counter() - started, 6),
+    }
+
+
+def _generate_task(filled: Dict[str, Any], spec: Any, submitted: float,
+                   request_id: Optional[str] = None) -> Dict[str, Any]:
+    from scripts.kicad_generator import generate_kicad_schematic
+    return _timed_task(lambda: generate_kicad_schematic(filled, spec, part_cache=_worker_part_cache),
+                       submitted, request_id)
+
+
+def _pcb_task(filled: Dict[str, Any], spec: Any, submitted: float,
+              request_id: Optional[str] = None) -> Dict[str, Any]:
+    from scripts.pcb_generator import generate_kicad_pcb
+    return _timed_task(lambda: generate_kicad_pcb(filled, spec), submitted, request_id)
+
+
+# ───────────────────────────────────────────────────────────────
+# Parent side
+# ───────────────────────────────────────────────────────────────
+# ProcessPoolExecutor(max_tasks_per_child=...) needs Python 3.11; before
+# that the whole pool is swapped for a fresh one every size × max_tasks tasks
+_PER_CHILD_RECYCLING = sys.version_info >= (3, 11)
+
+class GenerationPool:
+    """
+    Process pool for netlist and board generation. Each worker imports
+    SKiDL and loads the part libraries once at start-up, then generates
+    netlists and boards (placement and routing are CPU-bound pure Python)
+    for the filled templates submitted to it; a worker is replaced after
+    `max_tasks` generations to hand its memory back (on Python 3.10, the
+    whole pool after `size` × `max_tasks`).
+
+    With `size` 0 generation runs inline on the calling thread.
+    """
+
+    def __init__(self, size: int = 2, max_tasks: int = 0, libraries: Optional[List[str]] = None,
+                 timeout: float = 120.0):
+        self.size = size
+        self.max_tasks = max_tasks
+        self.libraries = libraries
+        self.timeout = timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_tasks = 0
+        self._lock = threading.Lock()
+        self._workers: Dict[int, Dict[str, Any]] = {}
+        self._warm = 0
+        self._warm_error: Optional[str] = None
+        self._counters = {
+            "submitted": 0, "completed": 0, "failed": 0, "in_flight": 0, "restarts": 0, "recycles": 0,
+            "queue_wait_total": 0.0, "queue_wait_max": 0.0,
+            "generate_total": 0.0, "generate_max": 0.0,
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        retired = None
+        with self._lock:
+            if (self._executor is not None and self.max_tasks and not _PER_CHILD_RECYCLING
+                    and self._executor_tasks >= self.max_tasks * self.size):
+                retired, self._executor = self._executor, None
+                self._counters["recycles"] += 1
+            if self._executor is None:
+                recycling = {}
+                if self.max_tasks and _PER_CHILD_RECYCLING:
+                    recycling["max_tasks_per_child"] = self.max_tasks
+                # spawn: workers must not inherit the parent's threads or SKiDL state
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.size,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.libraries,),
+                    **recycling,
+                )
+                self._executor_tasks = 0
+            executor = self._executor
+        if retired is not None:
+            # Tasks already queued on the old pool still run; warm the new one meanwhile
+            retired.shutdown(wait=False)
+            for _ in range(self.size):
+                executor.submit(_ping)
+        return executor
+
+    def _reset(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is broken:
+                self._executor = None
+                self._counters["restarts"] += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def start(self) -> None:
+        """
+        Spawn and warm every worker now rather than on the first request
+        (inline, with `size` 0: load SKiDL and the libraries on a thread).
+        Does not wait for the warm-up to finish.
+        """
+        # Spawned children re-import the main module; don't start pools from there
+        if multiprocessing.parent_process() is not None:
+            return
+        if self.size <= 0:
+            threading.Thread(target=self._warm_inline, name="generation-warm-up", daemon=True).start()
+            return
+        executor = self._get_executor()
+        for _ in range(self.size):
+            executor.submit(_ping).add_done_callback(self._record_worker)
+
+    def _warm_inline(self) -> None:
+        from scripts.kicad_generator import warm_up
+        try:
+            warm_up(self.libraries)
+        except Exception as e:
+            with self._lock:
+                self._warm_error = f"{type(e).__name__}: {e}"
+            return
+        with self._lock:
+            self._warm = 1
+
+    def _record_worker(self, fut: Future) -> None:
+        if fut.cancelled() or fut.exception() is not None:
+            with self._lock:
+                self._warm_error = "worker failed to start" if fut.cancelled() else repr(fut.exception())
+            return
+        with self._lock:
+            self._warm += 1
+            self._seen(fut.result())
+
+    def ready(self) -> Dict[str, Any]:
+        """
+        {"ready", "warm", "size", "error"}: ready once every worker (or,
+        inline, this process) has loaded SKiDL and the part libraries.
+        """
+        with self._lock:
+            warm, error = self._warm, self._warm_error
+        wanted = max(self.size, 1)
+        return {"ready": warm >= wanted, "warm": min(warm, wanted), "size": self.size, "error": error}
+
+    def _seen(self, info: Dict[str, Any]) -> None:
+        if info.get("pid"):
+            self._workers[info["pid"]] = {**info, "last_seen": time.time()}
+            # Recycled workers leave entries behind; keep only the recent ones
+            while len(self._workers) > 4 * max(self.size, 1):
+                del self._workers[min(self._workers, key=lambda pid: self._workers[pid]["last_seen"])]
+
+    def submit(self, filled: Dict[str, Any], spec: Any, board: bool = False) -> Future:
+        """
+        Queue one netlist generation (`board`: one board). The future
+        resolves to {"path", "worker", "queue_wait", "generate"}.
+        """
+        executor = self._get_executor()
+        with self._lock:
+            self._counters["submitted"] += 1
+            self._counters["in_flight"] += 1
+            if executor is self._executor:
+                self._executor_tasks += 1
+        try:
+            fut = executor.submit(_pcb_task if board else _generate_task, filled, spec, time.time(), get_request_id())
+        except Exception:
+            self._finish(None)
+            raise
+        fut.add_done_callback(self._finish)
+        return fut
+
+    def _finish(self, fut: Optional[Future]) -> None:
+        with self._lock:
+            c = self._counters
+            c["in_flight"] -= 1
+            if fut is None or fut.cancelled() or fut.exception() is not None:
+                c["failed"] += 1
+                return
+            result = fut.result()
+            self._seen(result["worker"])
+            c["completed"] += 1
+            c["queue_wait_total"] += result["queue_wait"]
+            c["queue_wait_max"] = max(c["queue_wait_max"], result["queue_wait"])
+            c["generate_total"] += result["generate"]
+            c["generate_max"] = max(c["generate_max"], result["generate"])
+
+    def generate(self, filled: Dict[str, Any], spec: Any, part_cache: Optional[dict] = None) -> str:
+        """
+        Generate a netlist and return its path, blocking until done. If the
+        pool broke (a worker died), it is rebuilt and the job retried once.
+        `part_cache` is only used inline; workers keep their own.
+        """
+        if self.size <= 0:
+            from scripts.kicad_generator import generate_kicad_schematic
+            return generate_kicad_schematic(filled, spec, part_cache=part_cache)
+        return self._run(filled, spec, board=False)
+
+    def generate_pcb(self, filled: Dict[str, Any], spec: Any) -> str:
+        """
+        Write the board for a filled template and return its path, blocking
+        until done, the same way as generate(). Inline with `size` 0.
+        """
+        if self.size <= 0:
+            from scripts.pcb_generator import generate_kicad_pcb
+            return generate_kicad_pcb(filled, spec)
+        return self._run(filled, spec, board=True)
+
+    def _run(self, filled: Dict[str, Any], spec: Any, board: bool) -> str:
+        executor = self._get_executor()
+        try:
+            return self.submit(filled, spec, board).result(timeout=self.timeout)["path"]
+        except BrokenProcessPool:
+            self._reset(executor)
+            return self.submit(filled, spec, board).result(timeout=self.timeout)["path"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            c = dict(self._counters)
+            workers = sorted(self._workers.values(), key=lambda w: w["last_seen"])
+        completed = c["completed"]
+        return {
+            "size": self.size,
+            "max_tasks": self.max_tasks,
+            "submitted": c["submitted"],
+            "completed": completed,
+            "failed": c["failed"],
+            "in_flight": c["in_flight"],
+            "restarts": c["restarts"],
+            "recycles": c["recycles"],
+            "queue_wait_avg": round(c["queue_wait_total"] / completed, 6) if completed else 0.0,
+            "queue_wait_max": round(c["queue_wait_max"], 6),
+            "generate_avg": round(c["generate_total"] / completed, 6) if completed else 0.0,
+            "generate_max": round(c["generate_max"], 6),
+            "workers_seen": len(workers),
+            "workers": workers[-self.size:] if self.size > 0 else [],
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_generation_pool: Optional[GenerationPool] = None
+_generation_pool_lock = threading.Lock()
+
+
+def get_generation_pool() -> GenerationPool:
+    """
+    Return the process-wide pool, sized by GEN_POOL_SIZE (0 = generate
+    inline) and recycled every GEN_POOL_MAX_TASKS generations (0 = never).
+    GEN_POOL_LIBRARIES optionally limits the preloaded libraries, e.g.
+    "Device,Regulator_Switching".
+    """
+    global _generation_pool
+    with _generation_pool_lock:
+        if _generation_pool is None:
+            libraries = [lib.strip() for lib in os.getenv("GEN_POOL_LIBRARIES", "").split(",") if lib.strip()]
+            _generation_pool = GenerationPool(
+                size=int(os.getenv("GEN_POOL_SIZE", "2")),
+                max_tasks=int(os.getenv("GEN_POOL_MAX_TASKS", "200")),
+                libraries=libraries or None,
+                timeout=float(os.getenv("GEN_POOL_TIMEOUT", "120")),
+            )
+            atexit.register(_generation_pool.shutdown, False)
+    return _generation_pool
@@ -0,0 +1,228 @@
+# scripts/http_client.py
+
+import time
+import queue
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: rate limiting and transient upstream failures
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LatencyTracker:
+    """
+    Rolling window of recent request latencies (seconds), used to pick the
+    hedge delay from the observed p95.
+    """
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Return the q-quantile (0..1) of the window, or None if empty."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        idx = min(len(samples) - 1, int(round(q * (len(samples) - 1))))
+        return samples[idx]
+
+
+class PooledJSONClient:
+    """
+    Keep-alive JSON POST client shared across requests.
+
+      • One requests.Session with a bounded connection pool (no per-call
+        TCP+TLS handshake)
+      • (connect, read) timeouts on every attempt
+      • Up to `max_retries` retries on 429/5xx and connection errors, with
+        full-jitter exponential backoff (Retry-After is honoured, capped)
+      • Optional hedging: the primary attempt runs on a thread of its own;
+        if it hasn't answered after the observed p95 latency, a hedged
+        attempt is submitted to a small pool. The first 200 from either is
+        returned at once and stops the other's retries (a hedge still
+        queued is dropped; a request already on the wire is left to finish
+        and its connection goes back to the pool)
+
+    `url` is a constructor argument so the client can be pointed at a local
+    stub server.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        params: Optional[Dict[str, str]] = None,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.25,
+        backoff_max: float = 4.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        hedge_default_delay: float = 2.0,
+        pool_size: int = 10,
+    ):
+        self.url = url
+        self.params = params or {}
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay = hedge_default_delay
+        self.latency = LatencyTracker()
+        self.counters = {"requests": 0, "attempts": 0, "retries": 0, "hedges": 0, "hedge_wins": 0}
+        self._counter_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="hedge") if hedge else None
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._counter_lock:
+            self.counters[key] += n
+
+    def _backoff(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Full-jitter exponential backoff, or Retry-After when the server sends one."""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(self.backoff_max, float(retry_after))
+                except ValueError:
+                    pass
+        return random.uniform(0, cap)
+
+    def _post_with_retries(
+        self, payload: Any, headers: Dict[str, str], stop: Optional[threading.Event] = None
+    ) -> Optional[requests.Response]:
+        """
+        POST once, retrying retryable failures. Returns the last response
+        (even if its status is an error); re-raises the last transport error
+        if no response was ever received. Setting `stop` abandons the
+        remaining retries (None is returned if nothing was received).
+        """
+        last_exc: Optional[Exception] = None
+        response: Optional[requests.Response] = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                delay = self._backoff(attempt - 1, response)
+                if stop is None:
+                    time.sleep(delay)
+                elif stop.wait(delay):
+                    break
+                self._count("retries")
+            elif stop is not None and stop.is_set():
+                break
+            self._count("attempts")
+            started = time.perf_counter()
+            try:
+                response = self.session.post(
+                    self.url, json=payload, headers=headers, params=self.params, timeout=self.timeout
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_exc = e
+                response = None
+                continue
+
+            if response.status_code not in RETRYABLE_STATUS:
+                if response.status_code == 200:
+                    self.latency.record(time.perf_counter() - started)
+                return response
+
+        if response is not None or last_exc is None:
+            return response
+        raise last_exc
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait before firing a hedged attempt."""
+        if self.latency.count() < self.hedge_min_samples:
+            return self.hedge_default_delay
+        return self.latency.percentile(self.hedge_quantile)
+
+    def post(self, payload: Any, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+        """
+        POST `payload` as JSON and return the response.
+        """
+        headers = headers or {"Content-Type": "application/json"}
+        self._count("requests")
+        if not self.hedge:
+            return self._post_with_retries(payload, headers)
+
+        answered = threading.Event()   # set by the first 200; stops the loser's retries
+        outcomes: "queue.Queue[Tuple[str, Optional[requests.Response], Optional[Exception]]]" = queue.Queue()
+
+        def attempt(which: str) -> None:
+            try:
+                response = self._post_with_retries(payload, headers, answered)
+            except Exception as e:
+                outcomes.put((which, None, e))
+                return
+            if response is not None and response.status_code == 200:
+                answered.set()
+            outcomes.put((which, response, None))
+
+        # The primary never waits behind hedges for a pool thread
+        threading.Thread(target=attempt, args=("primary",), name="primary", daemon=True).start()
+        hedge = None
+        outstanding = 1
+        fallback: Optional[requests.Response] = None
+        error: Optional[Exception] = None
+        while outstanding:
+            try:
+                which, response, exc = outcomes.get(timeout=None if hedge else self.hedge_delay())
+            except queue.Empty:
+                self._count("hedges")
+                hedge = self._hedge_pool.submit(attempt, "hedge")
+                outstanding += 1
+                continue
+            outstanding -= 1
+            if response is not None and response.status_code == 200:
+                if hedge is not None:
+                    hedge.cancel()
+                if which == "hedge":
+                    self._count("hedge_wins")
+                return response
+            if response is not None:
+                fallback = response
+            if exc is not None:
+                error = exc
+            if hedge is None and not outstanding:
+                break  # the primary gave up before the hedge delay: no hedge
+        if fallback is not None:
+            return fallback
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        with self._counter_lock:
+            stats = dict(self.counters)
+        stats["p50_seconds"] = self.latency.percentile(0.5)
+        stats["p95_seconds"] = self.latency.percentile(0.95)
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
@@ -0,0 +1,180 @@
+# scripts/jobs.py
+
+import os
+import time
+import uuid
+import queue
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from scripts.pipeline import run_pipeline, PipelineError
+from scripts.logs import reset_request_id, set_request_id
+
+log = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when the queue is at capacity."""
+
+
+class Job:
+    """
+    One asynchronous /generate run and its progress.
+    """
+
+    def __init__(self, prompt: str, use_cache: bool = True):
+        self.id = uuid.uuid4().hex
+        self.prompt = prompt
+        self.use_cache = use_cache
+        self.status = "queued"      # queued → running → done | failed
+        self.stage: Optional[str] = None
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.timings: Dict[str, float] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {
+            "job_id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "timings": dict(self.timings),
+            "queued_seconds": round((self.started or time.time()) - self.created, 6),
+        }
+        if self.finished is not None and self.started is not None:
+            out["total_seconds"] = round(self.finished - self.started, 6)
+        if self.result is not None:
+            out.update(self.result)
+        if self.error is not None:
+            out["error"] = self.error
+        return out
+
+
+class JobManager:
+    """
+    Bounded queue + fixed pool of worker threads running the generation
+    pipeline in the background.
+
+    Jobs live in this process's memory, so a job id is only known to the
+    worker process that accepted it; run gunicorn with one worker (and
+    --threads for HTTP concurrency) when using job mode. Worker threads are
+    started on first submit, i.e. after gunicorn has forked.
+    """
+
+    def __init__(self, workers: int = 2, queue_depth: int = 64, retention: float = 3600.0):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.retention = retention
+        self._queue: "queue.Queue[Job]" = queue.Queue(maxsize=queue_depth)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self) -> None:
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._queue.get()
+            try:
+                self._run(job)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started = time.time()
+        token = set_request_id(job.id)
+
+        def on_stage(stage: str, result: Any, seconds: float) -> None:
+            job.timings[stage] = seconds
+            job.stage = stage
+
+        try:
+            out = run_pipeline(job.prompt, use_cache=job.use_cache, on_stage=on_stage)
+        except PipelineError as e:
+            job.error = str(e)
+            job.stage = e.stage
+            job.status = "failed"
+        except Exception as e:
+            job.error = f"Unexpected error: {e}"
+            job.status = "failed"
+        else:
+            job.result = {
+                "spec": out["spec"].model_dump(),
+                "filledTemplate": out["filled"],
+                "kicad_sch_url": f"/download/{os.path.basename(out['path'])}",
+                "kicad_pcb_url": f"/download/{os.path.basename(out['pcb_path'])}" if out["pcb_path"] else None,
+                "pcb_error": out["pcb_error"],
+            }
+            job.status = "done"
+        finally:
+            job.finished = time.time()
+            reset_request_id(token)
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.retention
+        with self._lock:
+            for job_id in [j.id for j in self._jobs.values() if j.finished and j.finished < cutoff]:
+                del self._jobs[job_id]
+
+    def submit(self, prompt: str, use_cache: bool = True) -> Job:
+        """Queue a job and return it immediately. Raises JobQueueFull."""
+        self._ensure_workers()
+        self._prune()
+        job = Job(prompt, use_cache=use_cache)
+        with self._lock:
+            self._jobs[job.id] = job
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            raise JobQueueFull(f"Job queue is full ({self.queue_depth} pending)")
+        # Job records are logged under the job id; this line links it to the request
+        log.info("Queued job %s", job.id, extra={"job_id": job.id})
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [j.status for j in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "queued": self._queue.qsize(),
+            "running": statuses.count("running"),
+            "done": statuses.count("done"),
+            "failed": statuses.count("failed"),
+        }
+
+
+_job_manager: Optional[JobManager] = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    """
+    Return the process-wide JobManager (sized by JOBS_WORKERS / JOBS_QUEUE_DEPTH).
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager(
+                workers=int(os.getenv("JOBS_WORKERS", "2")),
+                queue_depth=int(os.getenv("JOBS_QUEUE_DEPTH", "64")),
+                retention=float(os.getenv("JOBS_RETENTION", "3600")),
+            )
+    return _job_manager
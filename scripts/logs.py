@@ -0,0 +1,188 @@
+# scripts/logs.py
+"""
+Structured logging for the app and the pipeline modules.
+
+Records go through a QueueHandler: the calling thread only formats the
+message and enqueues it, and a QueueListener thread does the writing,
+so a request never waits on stderr or a disk. When the queue is full
+the record is dropped and counted rather than blocking.
+
+Every record carries the current request id (a contextvar set per
+request, job or batch item). Chatty per-part and per-connection events
+are logged with `extra=SAMPLED`. They are kept for only LOG_SAMPLE_RATE
+of the requests. The choice is made per request id, so a request that
+is sampled keeps all of its verbose records.
+
+  LOG_LEVEL=INFO  LOG_FORMAT=json|text  LOG_SAMPLE_RATE=0.01  LOG_QUEUE_SIZE=10000
+"""
+
+import os
+import sys
+import json
+import queue
+import atexit
+import random
+import zlib
+import logging
+import threading
+import contextvars
+import logging.handlers
+from typing import Any, Dict, Optional, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# Our loggers; everything else (SKiDL, werkzeug, ...) keeps its own setup
+LOGGERS = ("app", "scripts", "json_to_pcb")
+
+# Pass as `extra=` to make a record subject to sampling
+SAMPLED = {"sampled": True}
+
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+def get_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str]) -> contextvars.Token:
+    """Tag this context's records with `request_id`; returns a token for reset_request_id."""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    _request_id.reset(token)
+
+
+def keep_sampled(request_id: Optional[str], rate: float = LOG_SAMPLE_RATE) -> bool:
+    """Whether a request's sampled records are kept (the same answer for the whole request)."""
+    if rate >= 1.0:
+        return True
+    if request_id is None:
+        return random.random() < rate
+    return zlib.crc32(request_id.encode("utf-8")) / 2 ** 32 < rate
+
+
+class ContextFilter(logging.Filter):
+    """Adds `request_id` and drops sampled records of unsampled requests."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return not getattr(record, "sampled", False) or keep_sampled(record.request_id)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, request_id, then any `extra=` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and key != "sampled":
+                out[key] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = "-"
+        return super().format(record)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking on a full queue."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render args now, while they still describe this moment, but leave
+        # the formatting to the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+_settings: Tuple[str, str, Any] = (LOG_LEVEL, LOG_FORMAT, None)
+_setup_lock = threading.Lock()
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream=None) -> None:
+    """
+    Route LOGGERS through the queue to `stream` (default stderr). Safe to
+    call more than once; only the first call in a process does anything.
+    """
+    global _listener, _handler, _settings
+    with _setup_lock:
+        if _listener is not None:
+            return
+        _settings = (level, fmt, stream)
+        target = logging.StreamHandler(stream or sys.stderr)
+        target.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+        q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        previous, _handler = _handler, DroppingQueueHandler(q)
+        _handler.addFilter(ContextFilter())
+        for name in LOGGERS:
+            logger = logging.getLogger(name)
+            logger.setLevel(level)
+            if previous is not None:
+                logger.removeHandler(previous)
+            logger.addHandler(_handler)
+            logger.propagate = False
+        _listener = logging.handlers.QueueListener(q, target, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush the queue and stop the listener thread."""
+    global _listener
+    with _setup_lock:
+        listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+def _restart_after_fork() -> None:
+    # A forked child (gunicorn --preload, multiprocessing "fork") inherits
+    # the queue handler but not the listener thread that drains it
+    global _listener, _setup_lock
+    _setup_lock = threading.Lock()
+    if _listener is not None:
+        _listener = None
+        setup_logging(*_settings)
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
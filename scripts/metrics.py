@@ -0,0 +1,77 @@
+# scripts/metrics.py
+"""
+Prometheus metrics for the generation pipeline, served by /metrics.
+
+Under gunicorn every worker (and every generation pool process it spawns)
+is a separate process, so gunicorn.conf.py sets PROMETHEUS_MULTIPROC_DIR
+before the app is imported: each process then writes its samples to
+files in that directory and /metrics merges them. Without the variable
+(flask run, the CLIs) the metrics simply live in this process.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest,
+)
+from prometheus_client import multiprocess
+
+# From the 1 ms template fill to a slow Gemini round trip or SKiDL run
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_SECONDS = Histogram(
+    "pcb_stage_seconds", "Wall time of one pipeline stage",
+    ["stage", "circuit_type"], buckets=STAGE_BUCKETS,
+)
+REQUEST_SECONDS = Histogram(
+    "pcb_request_seconds", "Wall time of one HTTP request, streaming included",
+    ["endpoint"], buckets=STAGE_BUCKETS,
+)
+REQUESTS = Counter("pcb_requests", "HTTP requests by endpoint and status code", ["endpoint", "status"])
+IN_FLIGHT = Gauge(
+    "pcb_requests_in_flight", "HTTP requests being served",
+    ["endpoint"], multiprocess_mode="livesum",
+)
+SPEC_PATHS = Counter("pcb_spec_paths", "Prompts answered by the local extractor, the spec cache or Gemini", ["path"])
+CACHE_LOOKUPS = Counter("pcb_cache_lookups", "Cache lookups by cache and result", ["cache", "result"])
+FALLBACKS = Counter("pcb_fallbacks", "Generation fallbacks taken", ["kind"])
+ERRORS = Counter("pcb_errors", "Pipeline stage failures", ["stage"])
+
+
+def observe_stage(stage: str, circuit_type: Optional[str], seconds: float) -> None:
+    STAGE_SECONDS.labels(stage=stage, circuit_type=circuit_type or "unknown").observe(seconds)
+
+
+@contextmanager
+def stage_timer(stage: str, circuit_type: Optional[str]) -> Iterator[None]:
+    """Observe the wall time of the `with` body, whether it raises or not."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, circuit_type, time.perf_counter() - started)
+
+
+def count_cache(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def count_fallback(kind: str) -> None:
+    FALLBACKS.labels(kind=kind).inc()
+
+
+def count_error(stage: str) -> None:
+    ERRORS.labels(stage=stage).inc()
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """(body, content type) of the Prometheus text exposition."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
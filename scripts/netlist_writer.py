@@ -0,0 +1,104 @@
+# scripts/netlist_writer.py
+
+import re
+import uuid
+from typing import Any, Dict, Iterator, List, TextIO, Tuple
+
+# Fixed namespace so the same design always gets the same tstamps
+_TSTAMP_NAMESPACE = uuid.UUID("6f1c2a52-3b4e-4f0c-9a57-8d0e1c2b3a49")
+
+TOOL_NAME = "pcbbuilder native netlist writer"
+
+# Node: (ref, pin number, pin name, pin electrical type)
+Node = Tuple[str, str, str, str]
+
+
+def quote(text: Any) -> str:
+    """Render `text` as a KiCad S-expression string literal."""
+    return '"' + str(text).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def component_tstamp(source: str, ref: str) -> str:
+    """Stable tstamp of component `ref`; the PCB writer uses it to link footprints."""
+    return str(uuid.uuid5(_TSTAMP_NAMESPACE, f"{source}/{ref}"))
+
+
+def natural_key(text: str) -> List[Any]:
+    """Sort key where "R2" < "R10" and "2" < "10"."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", text)]
+
+
+def iter_netlist(
+    source: str,
+    components: List[Dict[str, Any]],
+    libparts: Dict[Tuple[str, str], Dict[str, Any]],
+    nets: Dict[str, List[Node]],
+) -> Iterator[str]:
+    """
+    Yield a KiCad (version "E") netlist chunk by chunk.
+
+    components: [{"ref", "value", "footprint", "lib", "part", "fields": {}}]
+    libparts:   {(lib, part): {"description", "footprint", "pins": [(num, name, type)]}}
+    nets:       {net name: [(ref, pin number, pin name, pin type), ...]}
+
+    Everything is emitted in sorted order with no dates and name-derived
+    tstamps, so the same design always produces the same bytes.
+    """
+    yield "(export (version \"E\")\n"
+    yield "  (design\n"
+    yield f"    (source {quote(source)})\n"
+    yield f"    (tool {quote(TOOL_NAME)}))\n"
+
+    yield "  (components"
+    for comp in sorted(components, key=lambda c: natural_key(c["ref"])):
+        ref = comp["ref"]
+        yield f"\n    (comp (ref {quote(ref)})\n"
+        yield f"      (value {quote(comp['value'])})\n"
+        if comp.get("footprint"):
+            yield f"      (footprint {quote(comp['footprint'])})\n"
+        fields = comp.get("fields") or {}
+        if fields:
+            yield "      (fields"
+            for name in sorted(fields):
+                yield f" (field (name {quote(name)}) {quote(fields[name])})"
+            yield ")\n"
+        yield f"      (libsource (lib {quote(comp['lib'])}) (part {quote(comp['part'])}) (description \"\"))\n"
+        yield "      (sheetpath (names \"/\") (tstamps \"/\"))\n"
+        yield f"      (tstamps {quote(component_tstamp(source, ref))}))"
+    yield ")\n"
+
+    yield "  (libparts"
+    for (lib, part) in sorted(libparts):
+        info = libparts[(lib, part)]
+        yield f"\n    (libpart (lib {quote(lib)}) (part {quote(part)})\n"
+        yield f"      (description {quote(info.get('description', ''))})\n"
+        if info.get("footprint"):
+            yield f"      (footprints (fp {quote(info['footprint'])}))\n"
+        yield "      (pins"
+        for num, name, etype in sorted(info.get("pins", ()), key=lambda p: natural_key(p[0])):
+            yield f"\n        (pin (num {quote(num)}) (name {quote(name or '~')}) (type {quote(etype)}))"
+        yield "))"
+    yield ")\n"
+
+    yield "  (nets"
+    for code, name in enumerate(sorted(nets, key=natural_key), start=1):
+        yield f"\n    (net (code {quote(code)}) (name {quote(name)})"
+        for ref, num, pin_name, etype in sorted(set(nets[name]), key=lambda n: (natural_key(n[0]), natural_key(n[1]))):
+            node = f"\n      (node (ref {quote(ref)}) (pin {quote(num)})"
+            if pin_name:
+                node += f" (pinfunction {quote(pin_name)})"
+            yield node + f" (pintype {quote(etype)}))"
+        yield ")"
+    yield "))\n"
+
+
+def write_netlist(out: TextIO, *args, **kwargs) -> int:
+    """
+    Stream iter_netlist(...) into `out` (a file, socket.makefile("w"), ...)
+    without building the whole text. Returns the number of characters written.
+    """
+    written = 0
+    for chunk in iter_netlist(*args, **kwargs):
+        out.write(chunk)
+        written += len(chunk)
+    return written
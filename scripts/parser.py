@@ -1,15 +1,27 @@
 import os
-import json
-import requests
+import re
+import time
+import logging
+import threading
 from pydantic import BaseModel, field_validator, model_validator
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Any, Dict, List, Optional, Set, Tuple
+from scripts.spec_cache import PromptCache
+from scripts.http_client import PooledJSONClient
+from scripts.metrics import SPEC_PATHS, count_cache, observe_stage
+from scripts.logs import SAMPLED
 
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
+
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent"
+# Point at a local stand-in (python -m scripts.gemini_stub) for offline load tests
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-1.5-flash:generateContent",
+)
 
 # Define the expected structure of the parsed circuit specification
 class CircuitSpec(BaseModel):
@@ -57,7 +69,399 @@ class CircuitSpec(BaseModel):
             raise ValueError(f"Unsupported circuit_type: {self.circuit_type}")
         return self
 
-def call_gemini_for_spec(prompt: str) -> CircuitSpec:
+# ───────────────────────────────────────────────────────────────
+# Local rule-based extractor: fills a CircuitSpec for formulaic prompts
+# ("buck converter 12V to 5V 2A", "low pass filter 1kHz") without a
+# Gemini round trip. Values are emitted in the units the template
+# calculators expect (cutoff in kHz, frequency in Hz, LED current in mA).
+# ───────────────────────────────────────────────────────────────
+LOCAL_SPEC_ENABLED = os.getenv("LOCAL_SPEC_ENABLED", "1") != "0"
+LOCAL_SPEC_MIN_CONFIDENCE = float(os.getenv("LOCAL_SPEC_MIN_CONFIDENCE", "0.9"))
+
+# Checked in order; more specific phrasings come before the ones they contain
+_CIRCUIT_TYPE_PATTERNS = [
+    ("led_blinker_555",         r"\bled\b.*\bblink|\bblink\w*\b.*\bled\b"),
+    ("555_timer_astable",       r"\b(?:ne)?555\b"),
+    ("astable_multivibrator",   r"multivibrator|transistor\s+(?:led\s+)?flasher"),
+    ("buck_converter",          r"\bbuck\b|step[\s-]?down\s+(?:dc[\s-]?dc|switching|converter)"),
+    ("ldo_regulator",           r"\bldo\b|low[\s-]?dropout|linear\s+regulator"),
+    ("comparator_noninverting", r"non[\s-]?inverting\s+comparator"),
+    ("comparator",              r"\bcomparator\b"),
+    ("noninverting_amplifier",  r"non[\s-]?inverting\s+(?:op[\s-]?amp|amp)"),
+    ("inverting_amplifier",     r"\binverting\s+(?:op[\s-]?amp|amp)"),
+    ("voltage_divider",         r"\b(?:voltage|resistor|resistive)\s+divider\b|\bdivider\b"),
+    ("low_pass_filter",         r"\blow[\s-]?pass\b|\blpf\b"),
+    ("high_pass_filter",        r"\bhigh[\s-]?pass\b|\bhpf\b"),
+    ("bridge_rectifier",        r"\bbridge\s+rectifier\b|full[\s-]?wave\s+rectifier|\brectifier\b"),
+    ("voltage_multiplier",      r"voltage\s+(?:multiplier|doubler)|\bdoubler\b|cockcroft"),
+    ("microcontroller_board",   r"microcontroller|\bmcu\b|\bstm32|\batmega|\besp32|\brp2040"),
+]
+_CIRCUIT_TYPE_RES = [(ct, re.compile(p, re.I)) for ct, p in _CIRCUIT_TYPE_PATTERNS]
+
+# Fields each circuit type needs before the spec is usable
+LOCAL_REQUIRED_FIELDS = {
+    "buck_converter":          ["input_voltage", "output_voltage", "output_current"],
+    "ldo_regulator":           ["input_voltage", "output_voltage"],
+    "inverting_amplifier":     ["gain"],
+    "noninverting_amplifier":  ["gain"],
+    "voltage_divider":         ["Vin", "Vout"],
+    "low_pass_filter":         ["cutoff_frequency"],
+    "high_pass_filter":        ["cutoff_frequency"],
+    "555_timer_astable":       ["frequency"],
+    "bridge_rectifier":        ["input_voltage", "filter_capacitance"],
+    "voltage_multiplier":      ["input_ac"],
+    "comparator":              ["threshold_high", "threshold_low"],
+    "comparator_noninverting": ["reference_voltage", "input_signal"],
+    "led_blinker_555":         ["frequency", "led_current"],
+    "microcontroller_board":   ["mcu", "sensor", "clock_freq"],
+    "astable_multivibrator":   ["resistor_value"],
+}
+
+_SI_PREFIX = {"": 1.0, "p": 1e-12, "n": 1e-9, "u": 1e-6, "µ": 1e-6, "m": 1e-3, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9}
+
+# A number with an optional SI prefix and a unit, e.g. "12V", "2 A", "1.5kHz", "47k", "100 uF"
+_QUANTITY_RE = re.compile(
+    r"(?<![\w.])(\d+(?:\.\d+)?)\s*([pnuµmkKMG]?)\s*(v(?:olts?)?|a(?:mps?)?|hz|f|Ω|ohms?|r)?(?![a-zA-Z0-9])",
+    re.I,
+)
+_MCU_RE = re.compile(r"\b(stm32\w*|atmega\w*|attiny\w*|esp32\w*|esp8266|rp2040|pic\d+\w*|nrf52\w*)\b", re.I)
+_SENSOR_RE = re.compile(r"\b(bme\d{3}|bmp\d{3}|mpu[\s-]?\d{4}|dht\d{2}|sht\d{2}|lis3dh|ina219|vl53l0x)\b", re.I)
+_GAIN_RE = re.compile(r"gain\s*(?:of|=|:)?\s*(\d+(?:\.\d+)?)|(\d+(?:\.\d+)?)\s*x\b", re.I)
+_SIGNAL_RE = re.compile(r"input\s+signal\s*(?:is|=|:|on)?\s*([A-Za-z_][\w+-]*)", re.I)
+
+
+def _fmt(value: float) -> str:
+    """Format a number without trailing zeros: 12.0 → "12", 3.30 → "3.3"."""
+    return f"{value:g}"
+
+
+def _quantities(prompt: str) -> List[Dict[str, Any]]:
+    """
+    Every numeric quantity in the prompt, as
+    {"unit": "V"|"A"|"Hz"|"F"|"ohm"|"", "value": <SI value>, "start", "end"}.
+    """
+    out = []
+    for m in _QUANTITY_RE.finditer(prompt):
+        number, prefix, unit = m.group(1), m.group(2), (m.group(3) or "").lower()
+        if unit.startswith("v"):
+            unit = "V"
+        elif unit.startswith("a"):
+            unit = "A"
+        elif unit == "hz":
+            unit = "Hz"
+            # Nobody means millihertz: "8mhz" is 8 MHz
+            if prefix == "m":
+                prefix = "M"
+        elif unit == "f":
+            unit = "F"
+        elif unit in ("ω", "ohm", "ohms", "r") or (not unit and prefix in ("k", "K", "M")):
+            unit = "ohm"
+        # "m" with no unit is ambiguous (milli vs. mega), leave it unitless
+        out.append({
+            "unit": unit,
+            "value": float(number) * _SI_PREFIX.get(prefix, 1.0),
+            "start": m.start(),
+            "end": m.end(),
+        })
+    return out
+
+
+def _cue_before(prompt: str, q: Dict[str, Any], span: int = 16) -> Optional[str]:
+    """The last threshold cue word ("high", "low", ...) just before quantity q."""
+    window = prompt[max(0, q["start"] - span):q["start"]].lower()
+    cues = re.findall(r"\b(high|upper|rising|low|lower|falling)\b", window)
+    return cues[-1] if cues else None
+
+
+def _split_in_out(prompt: str, volts: List[Dict[str, Any]]) -> Tuple[Optional[float], Optional[float], Set[int]]:
+    """
+    Pick input and output voltages. Uses "from/in/input" and "to/out/output"
+    cues, then falls back to "larger is input" for two bare voltages.
+    Returns (vin, vout, indices of the quantities used).
+    """
+    vin = vout = None
+    used: Set[int] = set()
+    for i, q in enumerate(volts):
+        before = prompt[max(0, q["start"] - 12):q["start"]].lower()
+        after = prompt[q["end"]:q["end"] + 12].lower()
+        if vin is None and (re.search(r"\b(from|input|in|vin)\W*$", before) or re.match(r"\W*(in|input)\b", after)):
+            vin = q["value"]; used.add(i)
+        elif vout is None and (re.search(r"\b(to|output|out|vout)\W*$", before) or re.match(r"\W*(out|output)\b", after)):
+            vout = q["value"]; used.add(i)
+    rest = [(i, q) for i, q in enumerate(volts) if i not in used]
+    if vin is None and vout is None and len(rest) == 2:
+        (i, a), (j, b) = rest
+        vin, vout = max(a["value"], b["value"]), min(a["value"], b["value"])
+        used.update((i, j))
+    elif vin is None and vout is not None and rest:
+        vin = rest[0][1]["value"]; used.add(rest[0][0])
+    elif vout is None and vin is not None and rest:
+        vout = rest[0][1]["value"]; used.add(rest[0][0])
+    return vin, vout, used
+
+
+def extract_spec_locally(prompt: str) -> Tuple[Optional[CircuitSpec], float]:
+    """
+    Rule-based prompt → CircuitSpec for formulaic prompts.
+
+    Returns (spec, confidence) with confidence in [0, 1]. Confidence is 0
+    when no circuit type is recognised, and is reduced when several types
+    match, when required fields are missing, or when numbers in the prompt
+    could not be assigned to a field.
+    """
+    matches = [ct for ct, rx in _CIRCUIT_TYPE_RES if rx.search(prompt)]
+    if not matches:
+        return None, 0.0
+    ct = matches[0]
+
+    quantities = _quantities(prompt)
+    by_unit: Dict[str, List[Dict[str, Any]]] = {}
+    for q in quantities:
+        by_unit.setdefault(q["unit"], []).append(q)
+    volts, amps = by_unit.get("V", []), by_unit.get("A", [])
+    hertz, farads, ohms = by_unit.get("Hz", []), by_unit.get("F", []), by_unit.get("ohm", [])
+    consumed: Set[int] = set()  # ids of quantities assigned to a field
+
+    fields: Dict[str, str] = {}
+
+    def take(q: Dict[str, Any]) -> Dict[str, Any]:
+        consumed.add(id(q))
+        return q
+
+    if ct in ("buck_converter", "ldo_regulator", "voltage_divider"):
+        vin, vout, used = _split_in_out(prompt, volts)
+        for i in used:
+            take(volts[i])
+        in_key, out_key = ("Vin", "Vout") if ct == "voltage_divider" else ("input_voltage", "output_voltage")
+        if vin is not None:
+            fields[in_key] = f"{_fmt(vin)}V"
+        if vout is not None:
+            fields[out_key] = f"{_fmt(vout)}V"
+        if ct == "buck_converter" and len(amps) == 1:
+            fields["output_current"] = f"{_fmt(take(amps[0])['value'])}A"
+
+    elif ct in ("low_pass_filter", "high_pass_filter"):
+        if len(hertz) == 1:
+            fields["cutoff_frequency"] = _fmt(take(hertz[0])["value"] / 1e3)
+        if len(volts) == 1:
+            fields["input_voltage"] = f"{_fmt(take(volts[0])['value'])}V"
+
+    elif ct in ("555_timer_astable", "led_blinker_555"):
+        if len(hertz) == 1:
+            fields["frequency"] = _fmt(take(hertz[0])["value"])
+        if ct == "led_blinker_555" and len(amps) == 1:
+            fields["led_current"] = _fmt(take(amps[0])["value"] * 1e3)
+
+    elif ct in ("inverting_amplifier", "noninverting_amplifier"):
+        m = _GAIN_RE.search(prompt)
+        if m:
+            fields["gain"] = m.group(1) or m.group(2)
+            for q in quantities:
+                if q["start"] <= m.start(m.lastindex) < q["end"]:
+                    take(q)
+
+    elif ct == "bridge_rectifier":
+        if len(volts) == 1:
+            fields["input_voltage"] = f"{_fmt(take(volts[0])['value'])}V"
+        if len(farads) == 1:
+            fields["filter_capacitance"] = f"{_fmt(take(farads[0])['value'] * 1e6)}uF"
+
+    elif ct == "voltage_multiplier":
+        if len(volts) == 1:
+            fields["input_ac"] = f"{_fmt(take(volts[0])['value'])}V"
+
+    elif ct == "comparator":
+        high = [q for q in volts if _cue_before(prompt, q) in ("high", "upper", "rising")]
+        low = [q for q in volts if _cue_before(prompt, q) in ("low", "lower", "falling")]
+        if len(volts) == 2 and not (high or low):
+            high, low = [max(volts, key=lambda q: q["value"])], [min(volts, key=lambda q: q["value"])]
+        if len(high) == 1:
+            fields["threshold_high"] = f"{_fmt(take(high[0])['value'])}V"
+        if len(low) == 1:
+            fields["threshold_low"] = f"{_fmt(take(low[0])['value'])}V"
+
+    elif ct == "comparator_noninverting":
+        if len(volts) == 1:
+            fields["reference_voltage"] = f"{_fmt(take(volts[0])['value'])}V"
+        m = _SIGNAL_RE.search(prompt)
+        if m:
+            fields["input_signal"] = m.group(1)
+
+    elif ct == "microcontroller_board":
+        m = _MCU_RE.search(prompt)
+        if m:
+            fields["mcu"] = m.group(1).upper()
+        m = _SENSOR_RE.search(prompt)
+        if m:
+            fields["sensor"] = m.group(1).upper()
+        if len(hertz) == 1:
+            fields["clock_freq"] = f"{_fmt(take(hertz[0])['value'] / 1e6)}MHz"
+
+    elif ct == "astable_multivibrator":
+        if len(ohms) == 1:
+            r = take(ohms[0])["value"]
+            fields["resistor_value"] = f"{_fmt(r / 1e3)}k" if r >= 1e3 else _fmt(r)
+
+    try:
+        spec = CircuitSpec(circuit_type=ct, **fields)
+    except Exception:
+        return None, 0.0
+
+    required = LOCAL_REQUIRED_FIELDS[ct]
+    found = sum(1 for f in required if fields.get(f))
+    confidence = 0.5 + 0.5 * (found / len(required))
+    # Several circuit types named → the prompt is not formulaic
+    if len(set(matches)) > 1 and not _is_nested_match(matches):
+        confidence -= 0.3
+    # Numbers we could not place probably carry meaning we'd drop
+    unplaced = [q for q in quantities if id(q) not in consumed and q["unit"]]
+    confidence -= 0.15 * len(unplaced)
+    return spec, round(max(0.0, min(1.0, confidence)), 3)
+
+
+def _is_nested_match(matches: List[str]) -> bool:
+    """
+    Some patterns legitimately co-occur: "555 LED blinker" also matches
+    555_timer_astable, "non-inverting comparator" also matches comparator.
+    """
+    nested = {
+        "led_blinker_555": {"555_timer_astable"},
+        "comparator_noninverting": {"comparator"},
+        "noninverting_amplifier": {"inverting_amplifier"},
+    }
+    return set(matches[1:]) <= nested.get(matches[0], set())
+
+
+_spec_path_counts = {"local": 0, "cache": 0, "gemini": 0}
+_spec_path_lock = threading.Lock()
+
+
+def _count_spec_path(path: str) -> None:
+    with _spec_path_lock:
+        _spec_path_counts[path] += 1
+    SPEC_PATHS.labels(path=path).inc()
+
+
+def spec_path_stats() -> dict:
+    """
+    How many prompts were answered by the local extractor, the spec cache
+    and Gemini, with the fraction of traffic each path took.
+    """
+    with _spec_path_lock:
+        counts = dict(_spec_path_counts)
+    total = sum(counts.values())
+    return {
+        "counts": counts,
+        "fractions": {k: round(v / total, 4) if total else 0.0 for k, v in counts.items()},
+        "total": total,
+    }
+
+
+# ───────────────────────────────────────────────────────────────
+# Shared keep-alive Gemini client (see http_client.py)
+# ───────────────────────────────────────────────────────────────
+_gemini_client: Optional[PooledJSONClient] = None
+_gemini_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> PooledJSONClient:
+    """
+    Return the process-wide pooled Gemini client, creating it on first use.
+    """
+    global _gemini_client
+    with _gemini_client_lock:
+        if _gemini_client is None:
+            _gemini_client = PooledJSONClient(
+                url=GEMINI_API_URL,
+                params={"key": GEMINI_API_KEY},
+                connect_timeout=float(os.getenv("GEMINI_CONNECT_TIMEOUT", "3.05")),
+                read_timeout=float(os.getenv("GEMINI_READ_TIMEOUT", "30")),
+                max_retries=int(os.getenv("GEMINI_MAX_RETRIES", "2")),
+                hedge=os.getenv("GEMINI_HEDGE", "0") == "1",
+                pool_size=int(os.getenv("GEMINI_POOL_SIZE", "10")),
+            )
+    return _gemini_client
+
+
+# ───────────────────────────────────────────────────────────────
+# Prompt → spec cache (in-process LRU + on-disk SQLite, see spec_cache.py)
+# ───────────────────────────────────────────────────────────────
+SPEC_CACHE_ENABLED = os.getenv("SPEC_CACHE_ENABLED", "1") != "0"
+
+_spec_cache: Optional[PromptCache] = None
+_spec_cache_lock = threading.Lock()
+
+
+def get_spec_cache() -> PromptCache:
+    """
+    Return the process-wide spec cache, creating it on first use.
+    """
+    global _spec_cache
+    with _spec_cache_lock:
+        if _spec_cache is None:
+            _spec_cache = PromptCache(
+                path=os.getenv("SPEC_CACHE_PATH", "./cache/spec_cache.sqlite3"),
+                serialize=lambda spec: spec.model_dump_json(),
+                deserialize=CircuitSpec.model_validate_json,
+                ttl=float(os.getenv("SPEC_CACHE_TTL", "86400")),
+                memory_entries=int(os.getenv("SPEC_CACHE_MEMORY_ENTRIES", "256")),
+                disk_entries=int(os.getenv("SPEC_CACHE_DISK_ENTRIES", "10000")),
+            )
+    return _spec_cache
+
+
+def spec_cache_stats() -> dict:
+    """
+    Hit/miss counters for the spec cache (empty if caching is disabled).
+    """
+    if not SPEC_CACHE_ENABLED:
+        return {"enabled": False}
+    return {"enabled": True, **get_spec_cache().stats()}
+
+
+def call_gemini_for_spec(prompt: str, use_cache: bool = True) -> CircuitSpec:
+    """
+    Turn a prompt into a validated CircuitSpec.
+
+    Formulaic prompts are answered by extract_spec_locally when its
+    confidence reaches LOCAL_SPEC_MIN_CONFIDENCE. Everything else goes to
+    Gemini, with validated specs cached by normalized prompt. With
+    use_cache=False the cache lookup is skipped and Gemini is always called;
+    the fresh result still replaces the cached entry.
+    """
+    if LOCAL_SPEC_ENABLED:
+        spec, confidence = extract_spec_locally(prompt)
+        if spec is not None and confidence >= LOCAL_SPEC_MIN_CONFIDENCE:
+            _count_spec_path("local")
+            return spec
+
+    cache = get_spec_cache() if SPEC_CACHE_ENABLED else None
+    if cache is not None and use_cache:
+        cached = cache.get(prompt)
+        count_cache("spec", cached is not None)
+        if cached is not None:
+            _count_spec_path("cache")
+            return cached.model_copy()
+
+    # Labelled after the fact: the circuit type comes from the answer
+    started = time.perf_counter()
+    try:
+        spec = request_spec_from_gemini(prompt)
+    except Exception:
+        observe_stage("gemini", None, time.perf_counter() - started)
+        raise
+    observe_stage("gemini", spec.circuit_type, time.perf_counter() - started)
+    _count_spec_path("gemini")
+
+    if cache is not None:
+        cache.put(prompt, spec)
+    return spec.model_copy()
+
+
+def request_spec_from_gemini(prompt: str) -> CircuitSpec:
+    """
+    Make one Gemini round trip and parse the answer into a CircuitSpec.
+    """
     # Compose the system message
     SYSTEM_PROMPT = """You are a hardware design assistant. Extract exactly these fields from the user's prompt.
 Supported circuit_type values (choose one):
@@ -121,13 +525,16 @@ Only return valid JSON. Set any irrelevant fields to null. Do not add explanatio
         ]
     }
 
-    params = {"key": GEMINI_API_KEY}
+    # The system prompt is the same every time; only the user's part is worth logging
+    log.debug("Gemini request", extra={"prompt": prompt, **SAMPLED})
 
-    print(">>> Gemini payload:", json.dumps(payload, indent=2))
-
-    response = requests.post(GEMINI_API_URL, headers=headers, json=payload, params=params)
-    print(">>> Gemini status:", response.status_code)
-    print(">>> Gemini response:", response.text)
+    try:
+        response = get_gemini_client().post(payload, headers=headers)
+    except Exception as e:
+        raise Exception(f"Gemini API unreachable: {e}")
+    log.info("Gemini status %s", response.status_code, extra={"status": response.status_code,
+                                                               "response_chars": len(response.text)})
+    log.debug("Gemini response", extra={"response": response.text, **SAMPLED})
 
     if response.status_code != 200:
         raise Exception(f"Gemini API error {response.status_code}: {response.text}")
@@ -137,15 +544,13 @@ Only return valid JSON. Set any irrelevant fields to null. Do not add explanatio
     except (KeyError, IndexError) as e:
         raise Exception(f"Invalid Gemini response: {e}")
 
-    print(">>> Gemini content (raw):", content_text)
-
     # Strip markdown code block if present
     if content_text.startswith("```"):
         content_text = content_text.strip("```").strip()
         if content_text.startswith("json"):
             content_text = content_text[len("json"):].strip()
 
-    print(">>> Gemini content (cleaned):", content_text)
+    log.debug("Gemini content", extra={"content": content_text, **SAMPLED})
 
     try:
         spec = CircuitSpec.parse_raw(content_text)
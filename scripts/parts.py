@@ -0,0 +1,321 @@
+# scripts/parts.py
+#
+# Component type → KiCad symbol/footprint, and pin token → pin number.
+# Needs only the symbol index, not SKiDL, so the web process and the
+# native writers can resolve parts without importing it.
+
+import os
+import logging
+import threading
+
+from scripts.symbol_index import SymbolNotFound, get_symbol_index
+
+log = logging.getLogger(__name__)
+
+# ───────────────────────────────────────────────────────────────
+# 1) PART_LIBRARY_MAP: Exact KiCad‐symbol names as found in your .kicad_sym
+#    We include aliases so that the bare "LM2596S" or "LM2676S" defaults to "-5".
+# ───────────────────────────────────────────────────────────────
+PART_LIBRARY_MAP = {
+    # ─ Power regulators (Regulator_Switching library)
+    #   The actual symbols found via grep:
+    #     LM2596S-5, LM2596S-3.3, LM2596S-12, LM2596S-ADJ
+    #     LM2676S-5, LM2676S-12, LM2676S-ADJ
+    #
+    "LM2596S-5":   ("Regulator_Switching", "LM2596S-5",   "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+    "LM2596S-3.3": ("Regulator_Switching", "LM2596S-3.3", "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+    "LM2596S-12":  ("Regulator_Switching", "LM2596S-12",  "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+    "LM2596S-ADJ": ("Regulator_Switching", "LM2596S-ADJ", "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+
+    "LM2676S-5":   ("Regulator_Switching", "LM2676S-5",   "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+    "LM2676S-12":  ("Regulator_Switching", "LM2676S-12",  "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+    "LM2676S-ADJ": ("Regulator_Switching", "LM2676S-ADJ", "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+
+    # Aliases: if JSON uses bare "LM2596S" or "LM2676S", default to the "-5" variant
+    "LM2596S":     ("Regulator_Switching", "LM2596S-5",   "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+    "LM2676S":     ("Regulator_Switching", "LM2676S-5",   "Package_TO_SOT_SMD:TO-263-5_TabPin3"),
+
+    "AMS1117-3.3": ("Regulator_Linear",    "AMS1117-3.3", "Package_TO_SOT_SMD:SOT-223-3_TabPin2"),
+
+    # ─ Basic passives ─────────────────────────────────────────────
+    "47uH_2A":     ("Device",               "L",          "Inductor_SMD:L_0805_2012Metric"),
+    "SR560":       ("Device",               "D_Schottky", "Diode_SMD:D_SOD-123"),
+    "22uF_35V":    ("Device",               "C_Polarized","Capacitor_SMD:C_0805_2012Metric"),
+    "47uF_10V":    ("Device",               "C_Polarized","Capacitor_SMD:C_0805_2012Metric"),
+
+    # ─ Resistors ───────────────────────────────────────────────────
+    "10k":         ("Device",               "R",          "Resistor_SMD:R_0603_1608Metric"),
+    "1k":          ("Device",               "R",          "Resistor_SMD:R_0603_1608Metric"),
+    "4.7k":        ("Device",               "R",          "Resistor_SMD:R_0603_1608Metric"),
+
+    # ─ Op-amps ─────────────────────────────────────────────────────
+    "MCP6001":     ("Amplifier_Operational","MCP6001",    "Package_TO_SOT_SMD:SOT-23-5"),
+
+    # ─ Transistors ──────────────────────────────────────────────────
+    "2N3904":      ("Transistor_BJT",       "2N3904",     "Package_TO_SOT_THT:TO-92_Inline"),
+
+    # ─ Diodes ───────────────────────────────────────────────────────
+    "1N4007":      ("Diode",                "1N4007",     "Diode_THT:D_DO-41_SOD81_P10.16mm_Horizontal"),
+
+    # ─ LED ──────────────────────────────────────────────────────────
+    "LED":         ("Device",               "LED",        "LED_SMD:LED_0805_2012Metric"),
+
+    # ─ 555 Timer ─────────────────────────────────────────────────────
+    "NE555":       ("Timer",                "NE555P",     "Package_DIP:DIP-8_W7.62mm"),
+
+    # ─ Crystals & caps ───────────────────────────────────────────────
+    "Crystal_SMD": ("Device",               "Crystal",    "Crystal:Crystal_SMD_2016-4Pin_2.0x1.6mm"),
+    "Capacitor_SMD":("Device",              "C",          "Capacitor_SMD:C_0805_2012Metric"),
+
+    # ─ Sensors ───────────────────────────────────────────────────────
+    "BME280":      ("Sensor_Humidity",      "BME280",     "Package_LGA:Bosch_LGA-8_2.5x2.5mm_P0.65mm_ClockwisePinNumbering"),
+
+    # ─ MCUs ──────────────────────────────────────────────────────────
+    "STM32F103":   ("MCU_ST_STM32F1",       "STM32F103C8Tx","Package_QFP:LQFP-48_7x7mm_P0.5mm"),
+
+    # ─ Generic capacitor values ──────────────────────────────────────
+    "0.1uF":       ("Device",               "C",          "Capacitor_SMD:C_0603_1608Metric"),
+    "0.01uF":      ("Device",               "C",          "Capacitor_SMD:C_0603_1608Metric"),
+    "10uF":        ("Device",               "C_Polarized","Capacitor_SMD:C_0805_2012Metric"),
+}
+
+# ───────────────────────────────────────────────────────────────
+# 2) COMPONENT_PIN_MAP: pin-name → pin-number mapping
+# ───────────────────────────────────────────────────────────────
+COMPONENT_PIN_MAP = {
+    "LM2596S-5": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+    "LM2596S-3.3": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+    "LM2596S-12": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+    "LM2596S-ADJ": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+
+    "LM2676S-5": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+    "LM2676S-12": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+    "LM2676S-ADJ": {
+        "Vin":  "1",
+        "GND":  "3",
+        "SW":   "2",
+        "Vout": "4",
+        "FB":   "5",
+    },
+
+    "L": {
+        "1": "1",
+        "2": "2",
+    },
+    "D_Schottky": {
+        "K": "1",
+        "A": "2",
+    },
+    "C_Polarized": {
+        "+": "1",
+        "-": "2",
+    },
+    "R": {
+        "1": "1",
+        "2": "2",
+    },
+    "C": {
+        "1": "1",
+        "2": "2",
+    },
+}
+
+
+# ───────────────────────────────────────────────────────────────
+# 3) resolve_symbol: component type → (library, symbol, footprint)
+# ───────────────────────────────────────────────────────────────
+# Device-library generics used when the mapped symbol cannot be loaded
+FALLBACK_PARTS = {
+    "resistor":  ("Device", "R",           "Resistor_SMD:R_0603_1608Metric"),
+    "capacitor": ("Device", "C",           "Capacitor_SMD:C_0805_2012Metric"),
+    "polarized": ("Device", "C_Polarized", "Capacitor_SMD:C_0805_2012Metric"),
+    "ic":        ("Device", "DEVICE",      "Package_SO:SOIC-8_3.9x4.9mm_P1.27mm"),
+}
+
+
+def normalize_component_type(ctype: str) -> str:
+    """Remap bare "LM2676S"/"LM2596S" to the "-5" variant."""
+    if ctype == "LM2676S":
+        return "LM2676S-5"
+    if ctype == "LM2596S":
+        return "LM2596S-5"
+    return ctype
+
+
+def resolve_symbol(ctype: str):
+    """
+    Map a component type to (library, symbol, footprint): PART_LIBRARY_MAP
+    first, then resistor/capacitor/crystal values, then a symbol of that
+    name in any indexed library. Raises SymbolNotFound with close matches
+    when nothing fits; without a symbol index, unknown types keep the old
+    Device:DEVICE generic.
+    """
+    if ctype in PART_LIBRARY_MAP:
+        return PART_LIBRARY_MAP[ctype]
+    if ctype.endswith("k") or ctype.endswith("Ω"):
+        return ("Device", "R", "Resistor_SMD:R_0603_1608Metric")
+    if "uF" in ctype or "nF" in ctype or "pF" in ctype:
+        return ("Device", "C", "Capacitor_SMD:C_0805_2012Metric")
+    if ctype.endswith("Hz"):
+        return PART_LIBRARY_MAP["Crystal_SMD"]
+
+    index = get_symbol_index()
+    if not index.libraries:
+        log.warning("Unknown component type '%s', using generic IC", ctype)
+        return FALLBACK_PARTS["ic"]
+    found = index.find(ctype)
+    if found is None:
+        raise SymbolNotFound(f"Unknown component type '{ctype}'", index.suggest(ctype))
+    symbol_lib, symbol_name = found
+    return symbol_lib, symbol_name, index.lookup(symbol_lib, symbol_name)["footprint"]
+
+
+# ───────────────────────────────────────────────────────────────
+# 4) Pin tables: every pin token a template may use → pin number
+# ───────────────────────────────────────────────────────────────
+STRICT_PINS = os.getenv("STRICT_PINS", "0") == "1"
+
+# (lib, symbol) → {token: pin number}
+_pin_tables = {}
+_pin_tables_lock = threading.Lock()
+
+
+class PinResolutionError(ValueError):
+    """
+    Raised (with STRICT_PINS=1) when connection endpoints name pins or
+    components that do not exist; `problems` lists every one of them.
+    """
+
+    def __init__(self, circuit_type: str, problems):
+        self.problems = list(problems)
+        super().__init__(f"{len(self.problems)} unresolved pin(s) in '{circuit_type}': " + "; ".join(self.problems))
+
+
+def pin_table(symbol_lib: str, symbol_name: str, fallback_pins=()) -> dict:
+    """
+    Map every accepted pin token of lib:symbol to its pin number, in the
+    order the old connect cascade tried them: pin number or name, then
+    COMPONENT_PIN_MAP aliases, then case-insensitive names. Pins come from
+    the symbol index and the table is cached per symbol; symbols that are
+    not indexed use `fallback_pins` ([(number, name)]) and are not cached.
+    """
+    key = (symbol_lib, symbol_name)
+    table = _pin_tables.get(key)
+    if table is not None:
+        return table
+
+    entry = get_symbol_index().get(symbol_lib, symbol_name)
+    if entry is not None:
+        pins, cacheable = [(number, name) for number, name, _ in entry["pins"]], True
+    else:
+        pins, cacheable = [(number, name or "") for number, name in fallback_pins], False
+
+    table = {number: number for number, _ in pins}
+    for number, name in pins:
+        if name:
+            table.setdefault(name, number)
+    for alias, target in COMPONENT_PIN_MAP.get(symbol_name, {}).items():
+        if target in table:
+            table.setdefault(alias, table[target])
+    for token, number in list(table.items()):
+        table.setdefault(token.casefold(), number)
+
+    if cacheable:
+        with _pin_tables_lock:
+            _pin_tables[key] = table
+    return table
+
+
+def _part_pins(part) -> dict:
+    return {str(pin.num): (pin.name, pin) for pin in part.pins}
+
+
+def resolve_connections(connections: list, parts: dict, pins_of=_part_pins):
+    """
+    Resolve every "REF.PIN" endpoint of `connections` to a pin object
+    before anything is connected. Endpoints without a "." are net labels
+    (e.g. "to": "GND") and need no pin.
+
+    `parts` maps ref → (part, (lib, symbol, footprint)); `pins_of(part)`
+    returns {pin number: (pin name, pin object)} (SKiDL pins by default).
+    Returns ([(net_name, [(token, pin object), ...]), ...], [problem, ...]).
+    """
+    pins_by_ref = {}   # ref → {pin number: (name, pin object)}
+    tables = {}        # ref → pin_table(...)
+    resolved, problems = [], []
+    for conn in connections:
+        endpoints = []
+        for token in (conn["from"], conn["to"]):
+            if "." not in token:
+                continue
+            ref, pin_token = token.split(".", 1)
+            if ref not in parts:
+                problems.append(f"{token}: no component '{ref}'")
+                continue
+            part, (symbol_lib, symbol_name, _) = parts[ref]
+            if ref not in pins_by_ref:
+                pins_by_ref[ref] = pins_of(part)
+                tables[ref] = pin_table(symbol_lib, symbol_name,
+                                        [(num, name) for num, (name, _) in pins_by_ref[ref].items()])
+            table = tables[ref]
+            number = table.get(pin_token) or table.get(pin_token.casefold())
+            if number not in pins_by_ref[ref]:
+                names = [f"{num}/{name}" if name and name != num else num
+                         for num, (name, _) in pins_by_ref[ref].items()]
+                problems.append(f"{token}: no pin '{pin_token}' on {symbol_lib}:{symbol_name} "
+                                f"(pins: {', '.join(names) or 'none'})")
+                continue
+            endpoints.append((token, pins_by_ref[ref][number][1]))
+        resolved.append((conn["net"], endpoints))
+    return resolved, problems
+
+
+def report_pin_problems(circuit_type: str, problems: list) -> None:
+    """Raise PinResolutionError under STRICT_PINS, otherwise warn once."""
+    if not problems:
+        return
+    if STRICT_PINS:
+        raise PinResolutionError(circuit_type, problems)
+    log.warning("%d unresolved pin(s) in '%s' (skipped): %s", len(problems), circuit_type, "; ".join(problems),
+                extra={"circuit_type": circuit_type, "problems": problems})
+
+
+def index_pins(entry: dict):
+    """Pin getter for resolve_connections over symbol-index entries."""
+    return {num: (name, (num, name, etype)) for num, name, etype in entry["pins"]}
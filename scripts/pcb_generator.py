@@ -0,0 +1,217 @@
+# scripts/pcb_generator.py
+
+import os
+import logging
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from scripts.artifact_cache import ARTIFACT_CACHE_ENABLED, artifact_key, get_artifact_cache
+from scripts.metrics import count_cache, observe_stage
+from scripts.footprints import installed_footprint, load_footprint
+from scripts.parts import (
+    COMPONENT_PIN_MAP, normalize_component_type, resolve_symbol, resolve_connections, report_pin_problems,
+)
+from scripts.pcb_writer import EDGE_MARGIN, ORIGIN, Placed, board_outline, grid_placement, write_pcb
+from scripts.placement import place, wirelength
+from scripts.router import GRID, route
+from scripts.symbol_index import SymbolNotFound, get_symbol_index
+from scripts.utils import output_location
+
+log = logging.getLogger(__name__)
+
+# "anneal": connectivity-driven placement (scripts/placement.py); "grid": rows of 5 in reference order
+PLACEMENT_ENGINE = os.getenv("PLACEMENT_ENGINE", "anneal")
+# Share of an automatically sized board covered by courtyards
+PLACEMENT_UTILIZATION = float(os.getenv("PLACEMENT_UTILIZATION", "0.4"))
+# Upper bound on the annealing phase per board, in seconds
+PLACEMENT_TIME_BUDGET = float(os.getenv("PLACEMENT_TIME_BUDGET", "2.0"))
+
+# Copper tracks by the maze router (scripts/router.py); "0" leaves ratsnest only
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "1") != "0"
+ROUTER_GRID = float(os.getenv("ROUTER_GRID", str(GRID)))
+# Nets still queued when the budget (seconds) runs out stay unrouted. Sized for
+# a /generate request; raise it for offline json_to_pcb.py runs
+ROUTER_TIME_BUDGET = float(os.getenv("ROUTER_TIME_BUDGET", "5"))
+
+
+def generate_kicad_pcb(filled_json: dict, spec: Any) -> str:
+    """
+    Write a .kicad_pcb for the filled template and return its filepath:
+    one footprint per component (read from the KiCad footprint libraries,
+    or synthesized when not installed), placed by PLACEMENT_ENGINE, with
+    every pad on its net and, with ROUTER_ENABLED, copper tracks. No
+    pcbnew or SKiDL needed; the pipeline runs it on the generation pool
+    (GenerationPool.generate_pcb) so it stays off the request threads.
+
+    Boards are content-addressed like netlists (see artifact_cache.py).
+    """
+    cache = get_artifact_cache() if ARTIFACT_CACHE_ENABLED else None
+    if cache is not None:
+        backend = f"pcb-{PLACEMENT_ENGINE}" + ("-routed" if ROUTER_ENABLED else "")
+        key = artifact_key(filled_json, spec, backend=backend)
+        hit = cache.lookup(key)
+        count_cache("pcb", hit is not None)
+        if hit is not None:
+            log.info("Reusing cached board %s", hit.name)
+            return str(hit)
+
+    path = _generate_pcb_file(filled_json, spec)
+    if cache is not None:
+        cache.store(key, Path(path))
+    return path
+
+
+def _pin_tokens(connections: List[dict]) -> Dict[str, List[str]]:
+    """ref → pin tokens its connections use, in first-use order."""
+    tokens: Dict[str, Dict[str, None]] = {}
+    for conn in connections:
+        for token in (conn["from"], conn["to"]):
+            if "." in token:
+                ref, pin = token.split(".", 1)
+                tokens.setdefault(ref, {}).setdefault(pin)
+    return {ref: list(pins) for ref, pins in tokens.items()}
+
+
+def _board_part(ctype: str, template_footprint: Optional[str]) -> Tuple[str, str, str]:
+    """
+    (symbol lib, symbol, footprint) for one component on the board. The
+    footprint is the one the template names when it is installed, else the
+    symbol's default; a part the symbol index does not know still gets a
+    board footprint, from the template (synthesized if not installed).
+    """
+    try:
+        symbol_lib, symbol_name, symbol_footprint = resolve_symbol(ctype)
+    except SymbolNotFound:
+        if not template_footprint:
+            raise
+        return "", ctype, template_footprint
+    if template_footprint and (installed_footprint(template_footprint) is not None
+                               or installed_footprint(symbol_footprint) is None):
+        return symbol_lib, symbol_name, template_footprint
+    return symbol_lib, symbol_name, symbol_footprint
+
+
+def place_board(filled_json: dict, circuit_type: str, board: Optional[Tuple[float, float]] = None,
+                engine: Optional[str] = None) -> Tuple[List[Placed], Dict[str, Any]]:
+    """
+    Resolve the filled template into placed footprints with their pad
+    nets, ready for pcb_writer.write_pcb. Footprints are loaded once per
+    process and shared by every board that uses them.
+
+    `board` is the (width, height) in mm to place into (default: sized
+    from the parts). Returns (placed, report) where the report has the
+    engine, wirelength, runtime and the Edge.Cuts outline.
+    """
+    index = get_symbol_index()
+    connections = filled_json.get("connections", [])
+    tokens = _pin_tokens(connections)
+
+    footprints, values, parts = {}, {}, {}
+    for comp in filled_json.get("components", []):
+        ref = comp["ref"]
+        ctype = normalize_component_type(comp["type"])
+        symbol_lib, symbol_name, footprint_name = _board_part(ctype, comp.get("footprint"))
+        entry = index.get(symbol_lib, symbol_name)
+        if entry is not None:
+            # Symbol pin numbers are the footprint's pad numbers
+            pins = {num: (name, num) for num, name, _ in entry["pins"]}
+            footprint = load_footprint(footprint_name, pins)
+        else:
+            # No symbol data: the pads are whatever the connections name
+            aliases = COMPONENT_PIN_MAP.get(symbol_name, {})
+            footprint = load_footprint(footprint_name, [aliases.get(t, t) for t in tokens.get(ref, [])])
+            pins = {num: (num, num) for num in footprint.pads_by_number}
+        footprints[ref] = footprint
+        values[ref] = ctype
+        parts[ref] = (pins, (symbol_lib, symbol_name, footprint_name))
+
+    resolved_connections, problems = resolve_connections(connections, parts, pins_of=lambda pins: pins)
+
+    pad_nets: Dict[str, Dict[str, str]] = {ref: {} for ref in footprints}
+    for net_name, endpoints in resolved_connections:
+        for token, pad in endpoints:
+            ref = token.split(".", 1)[0]
+            if pad not in footprints[ref].pads_by_number:
+                problems.append(f"{token}: pin {pad} has no pad on footprint {footprints[ref].name}")
+                continue
+            pad_nets[ref][pad] = net_name
+    report_pin_problems(circuit_type, problems)
+
+    engine = engine or PLACEMENT_ENGINE
+    started = time.perf_counter()
+    if engine == "grid":
+        positions = grid_placement(footprints)
+        report = {"parts": len(footprints), "hpwl": round(wirelength(footprints, pad_nets, positions), 3),
+                  "seconds": round(time.perf_counter() - started, 4)}
+    elif engine == "anneal":
+        positions, report = place(
+            footprints, pad_nets, board=board, origin=(ORIGIN[0] + EDGE_MARGIN, ORIGIN[1] + EDGE_MARGIN),
+            utilization=PLACEMENT_UTILIZATION, time_budget=PLACEMENT_TIME_BUDGET,
+        )
+    else:
+        raise ValueError(f"Unknown placement engine {engine!r} (expected 'anneal' or 'grid')")
+
+    placed = [{"ref": ref, "value": values[ref], "footprint": footprints[ref], "at": positions[ref],
+               "pad_nets": pad_nets[ref]} for ref in footprints]
+    if board:
+        outline = (ORIGIN[0], ORIGIN[1], ORIGIN[0] + board[0] + 2 * EDGE_MARGIN, ORIGIN[1] + board[1] + 2 * EDGE_MARGIN)
+    else:
+        outline = board_outline(placed)
+    return placed, {"engine": engine, **report, "outline": [round(v, 4) for v in outline]}
+
+
+def route_board(placed: List[Placed], report: Dict[str, Any]) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """Route the placed board inside the outline from place_board's report."""
+    return route(placed, tuple(report["outline"]), grid=ROUTER_GRID, time_budget=ROUTER_TIME_BUDGET)
+
+
+def placement_summary(report: Dict[str, Any]) -> str:
+    """
+    One line for the board's title block. Leaves out the runtime so the
+    same design still produces the same bytes.
+    """
+    text = f"Placement ({report['engine']}): {report['parts']} parts, HPWL {report['hpwl']:.1f} mm"
+    if "hpwl_initial" in report:
+        text += f" (rows in reference order: {report['hpwl_initial']:.1f} mm)"
+    return text
+
+
+def routing_summary(report: Dict[str, Any]) -> str:
+    """One line for the board's title block (no runtime, like placement_summary)."""
+    text = (f"Routing: {report['routed']}/{report['nets']} nets, {report['vias']} vias, "
+            f"{report['track_length_mm']:.1f} mm of track")
+    if report["unrouted"]:
+        text += f"; unrouted: {', '.join(report['unrouted'][:5])}" + (" ..." if len(report["unrouted"]) > 5 else "")
+    return text
+
+
+def _generate_pcb_file(filled_json: dict, spec: Any) -> str:
+    output_dir, filename = output_location(spec, suffix=".kicad_pcb")
+    filepath = output_dir / filename
+    log.info("Generating KiCad board %s", filename)
+
+    placed, report = place_board(filled_json, spec.circuit_type)
+    comments = [placement_summary(report)]
+    log.info("%s in %.3fs", comments[0], report["seconds"])
+    observe_stage("placement", spec.circuit_type, report["seconds"])
+    tracks = None
+    if ROUTER_ENABLED:
+        tracks, routing = route_board(placed, report)
+        comments.append(routing_summary(routing))
+        log.info("%s in %.3fs", comments[1], routing["seconds"])
+        observe_stage("routing", spec.circuit_type, routing["seconds"])
+
+    # Stream into a temp file next to the target, then move it into place
+    tmp_path = output_dir / f".{filename}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+            write_pcb(f, spec.circuit_type, placed, title=spec.circuit_type,
+                      outline=report["outline"], comments=comments, tracks=tracks)
+        os.replace(tmp_path, filepath)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+    log.info("Generated %s", filepath)
+    return str(filepath)
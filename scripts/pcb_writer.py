@@ -0,0 +1,174 @@
+# scripts/pcb_writer.py
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from scripts.footprints import Footprint
+from scripts.netlist_writer import component_tstamp, natural_key, quote
+from scripts.sexpr import Quoted, dump_sexpr
+
+# Board file format: KiCad 7 (the version the image installs), unless a copied
+# footprint comes from a newer library, whose syntax then needs KiCad 8
+PCB_VERSION = "20221018"
+PCB_VERSION_KICAD8 = "20240108"
+GENERATOR = "pcbbuilder"
+
+# Where the first footprint goes on the sheet, and the gap between courtyards (mm)
+ORIGIN = (30.0, 30.0)
+CLEARANCE = 2.0
+EDGE_MARGIN = 3.0
+
+LAYERS = [
+    (0, "F.Cu", "signal", None), (31, "B.Cu", "signal", None),
+    (32, "B.Adhes", "user", "B.Adhesive"), (33, "F.Adhes", "user", "F.Adhesive"),
+    (34, "B.Paste", "user", None), (35, "F.Paste", "user", None),
+    (36, "B.SilkS", "user", "B.Silkscreen"), (37, "F.SilkS", "user", "F.Silkscreen"),
+    (38, "B.Mask", "user", None), (39, "F.Mask", "user", None),
+    (40, "Dwgs.User", "user", "User.Drawings"), (41, "Cmts.User", "user", "User.Comments"),
+    (42, "Eco1.User", "user", "User.Eco1"), (43, "Eco2.User", "user", "User.Eco2"),
+    (44, "Edge.Cuts", "user", None), (45, "Margin", "user", None),
+    (46, "B.CrtYd", "user", "B.Courtyard"), (47, "F.CrtYd", "user", "F.Courtyard"),
+    (48, "B.Fab", "user", None), (49, "F.Fab", "user", None),
+]
+
+# Footprint-file bookkeeping that does not belong inside a board
+_DROPPED = {"version", "generator", "generator_version", "tedit", "at", "path", "net"}
+# Item ids repeat in every copy of a footprint; KiCad assigns fresh ones when absent
+_ITEM_IDS = {"tstamp", "uuid"}
+
+# Placed footprint: {"ref", "value", "footprint": Footprint, "at": (x, y), "pad_nets": {pad: net}}
+Placed = Dict[str, Any]
+
+
+def mm(value: float) -> str:
+    """Format a coordinate the way KiCad does: up to 4 decimals, no trailing zeros."""
+    text = f"{value:.4f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+
+def grid_placement(footprints: Dict[str, Footprint], per_row: int = 5) -> Dict[str, Tuple[float, float]]:
+    """
+    Place footprints in rows of `per_row` (in reference order), like the old
+    json_to_pcb.py grid, but spaced by courtyard size so nothing overlaps.
+    Returns {ref: (x, y)} footprint origins in mm.
+    """
+    positions: Dict[str, Tuple[float, float]] = {}
+    refs = sorted(footprints, key=natural_key)
+    y = ORIGIN[1]
+    for start in range(0, len(refs), per_row):
+        row = refs[start:start + per_row]
+        top = min(footprints[r].bbox[1] for r in row)
+        bottom = max(footprints[r].bbox[3] for r in row)
+        x = ORIGIN[0]
+        for ref in row:
+            x0, _, x1, _ = footprints[ref].bbox
+            positions[ref] = (x - x0, y - top)
+            x += (x1 - x0) + CLEARANCE
+        y += (bottom - top) + CLEARANCE
+    return positions
+
+
+def board_outline(placed: List[Placed], margin: float = EDGE_MARGIN) -> Tuple[float, float, float, float]:
+    """Edge.Cuts rectangle (x0, y0, x1, y1) around every courtyard plus `margin`."""
+    if not placed:
+        return ORIGIN[0], ORIGIN[1], ORIGIN[0] + 10.0, ORIGIN[1] + 10.0
+    boxes = [(p["at"][0] + fp.bbox[0], p["at"][1] + fp.bbox[1], p["at"][0] + fp.bbox[2], p["at"][1] + fp.bbox[3])
+             for p in placed for fp in [p["footprint"]]]
+    return (min(b[0] for b in boxes) - margin, min(b[1] for b in boxes) - margin,
+            max(b[2] for b in boxes) + margin, max(b[3] for b in boxes) + margin)
+
+
+def pcb_version(placed: List[Placed]) -> str:
+    """The board format the placed footprints' library versions can be written in."""
+    newest = max((int(node[1]) for item in placed for node in item["footprint"].tree[2:]
+                  if isinstance(node, list) and len(node) > 1 and node[0] == "version" and node[1].isdigit()),
+                 default=0)
+    return PCB_VERSION if newest <= int(PCB_VERSION) else PCB_VERSION_KICAD8
+
+
+def _footprint(source: str, item: Placed, net_codes: Dict[str, int]) -> Iterator[str]:
+    """The footprint tree of `item`, placed, renamed and with nets on its pads."""
+    fp: Footprint = item["footprint"]
+    x, y = item["at"]
+    pad_nets = item.get("pad_nets") or {}
+    yield f"  (footprint {quote(fp.name)}"
+    for node in fp.tree[2:]:
+        if not isinstance(node, list) or not node:
+            continue
+        head = node[0]
+        if head in _DROPPED:
+            continue
+        node = [child for child in node if not (isinstance(child, list) and child and child[0] in _ITEM_IDS)]
+        if head == "fp_text" and len(node) > 2 and node[1] in ("reference", "value"):
+            node = node[:2] + [Quoted(item["ref"] if node[1] == "reference" else item["value"])] + node[3:]
+        elif head == "property" and len(node) > 2 and node[1] in ("Reference", "Value"):
+            node = node[:2] + [Quoted(item["ref"] if node[1] == "Reference" else item["value"])] + node[3:]
+        elif head == "pad" and len(node) > 1 and str(node[1]) in pad_nets:
+            net = pad_nets[str(node[1])]
+            node = [child for child in node if not (isinstance(child, list) and child and child[0] == "net")]
+            node.append(["net", str(net_codes[net]), Quoted(net)])
+        yield f"\n    {dump_sexpr(node)}"
+        if head == "layer":
+            yield f"\n    (at {mm(x)} {mm(y)})"
+            yield f"\n    (path {quote('/' + component_tstamp(source, item['ref']))})"
+    yield ")\n"
+
+
+def iter_pcb(source: str, placed: List[Placed], title: str = "",
+             outline: Optional[Tuple[float, float, float, float]] = None,
+             comments: Sequence[str] = (), tracks: Optional[Dict[str, List[Dict[str, Any]]]] = None) -> Iterator[str]:
+    """
+    Yield a .kicad_pcb (format: see pcb_version) chunk by chunk: layer
+    stack, nets, every placed footprint (see Placed), the copper `tracks`
+    ({"segments", "vias"} from scripts/router.py) and an Edge.Cuts
+    `outline` (default: around the footprints). `comments` go into the
+    title block.
+    Nets are numbered in sorted order and footprints written in reference
+    order, so the same design always produces the same bytes.
+    """
+    nets = sorted({net for item in placed for net in (item.get("pad_nets") or {}).values()}, key=natural_key)
+    net_codes = {name: code for code, name in enumerate(nets, start=1)}
+
+    yield f"(kicad_pcb (version {pcb_version(placed)}) (generator {quote(GENERATOR)})\n"
+    yield "  (general (thickness 1.6))\n"
+    yield "  (paper \"A4\")\n"
+    if title or comments:
+        yield "  (title_block" + (f" (title {quote(title)})" if title else "")
+        for number, comment in enumerate(comments[:9], start=1):
+            yield f" (comment {number} {quote(comment)})"
+        yield ")\n"
+    yield "  (layers"
+    for number, name, kind, user_name in LAYERS:
+        yield f"\n    ({number} {quote(name)} {kind}" + (f" {quote(user_name)})" if user_name else ")")
+    yield ")\n"
+    yield "  (setup (pad_to_mask_clearance 0))\n"
+    yield "  (net 0 \"\")\n"
+    for name in nets:
+        yield f"  (net {net_codes[name]} {quote(name)})\n"
+
+    for item in sorted(placed, key=lambda p: natural_key(p["ref"])):
+        yield from _footprint(source, item, net_codes)
+
+    for seg in (tracks or {}).get("segments", ()):
+        yield (f"  (segment (start {mm(seg['start'][0])} {mm(seg['start'][1])})"
+               f" (end {mm(seg['end'][0])} {mm(seg['end'][1])}) (width {mm(seg['width'])})"
+               f" (layer {quote(seg['layer'])}) (net {net_codes[seg['net']]}))\n")
+    for via in (tracks or {}).get("vias", ()):
+        yield (f"  (via (at {mm(via['at'][0])} {mm(via['at'][1])}) (size {mm(via['size'])})"
+               f" (drill {mm(via['drill'])}) (layers \"F.Cu\" \"B.Cu\") (net {net_codes[via['net']]}))\n")
+
+    x0, y0, x1, y1 = outline or board_outline(placed)
+    yield (f"  (gr_rect (start {mm(x0)} {mm(y0)}) (end {mm(x1)} {mm(y1)})"
+           " (stroke (width 0.05) (type default)) (fill none) (layer \"Edge.Cuts\"))\n")
+    yield ")\n"
+
+
+def write_pcb(out: TextIO, *args, **kwargs) -> int:
+    """
+    Stream iter_pcb(...) into `out` without building the whole text.
+    Returns the number of characters written.
+    """
+    written = 0
+    for chunk in iter_pcb(*args, **kwargs):
+        out.write(chunk)
+        written += len(chunk)
+    return written
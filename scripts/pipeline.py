@@ -0,0 +1,138 @@
+# scripts/pipeline.py
+
+import os
+import time
+import queue
+import threading
+import contextvars
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from scripts.parser import call_gemini_for_spec
+from scripts.template_matcher import match_and_fill_template
+from scripts.generation_pool import get_generation_pool
+from scripts.metrics import count_error, observe_stage
+
+# Stage name → prefix used in error messages returned to clients
+STAGES = {
+    "parse": "Parsing error",
+    "fill": "Template matching error",
+    "generate": "KiCad generation error",
+    "pcb": "PCB generation error",
+}
+
+# Seconds without an event before stream_pipeline yields a heartbeat
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "10"))
+
+class PipelineError(Exception):
+    """
+    Raised when a pipeline stage fails; `stage` names the failing stage and
+    str(e) matches the error text /generate has always returned.
+    """
+
+    def __init__(self, stage: str, cause: Exception):
+        self.stage = stage
+        self.cause = cause
+        super().__init__(f"{STAGES[stage]}: {cause}")
+
+
+def run_pipeline(
+    prompt: str,
+    use_cache: bool = True,
+    on_stage: Optional[Callable[[str, Any, float], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Run prompt → spec → filled template → netlist → board.
+
+    `on_stage(stage, result, seconds)` is called after each stage finishes.
+    Returns {"spec", "filled", "path", "pcb_path", "pcb_error", "timings"}
+    where timings maps each stage name to its wall time in seconds. A failed
+    board does not fail the run: pcb_path is None and pcb_error says why.
+    """
+    timings: Dict[str, float] = {}
+    circuit_type: Optional[str] = None
+
+    def run_stage(stage: str, fn: Callable[[], Any]) -> Any:
+        nonlocal circuit_type
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as e:
+            observe_stage(stage, circuit_type, time.perf_counter() - started)
+            count_error(stage)
+            raise PipelineError(stage, e)
+        timings[stage] = round(time.perf_counter() - started, 6)
+        if stage == "parse":
+            circuit_type = result.circuit_type
+        observe_stage(stage, circuit_type, timings[stage])
+        if on_stage is not None:
+            on_stage(stage, result, timings[stage])
+        return result
+
+    spec = run_stage("parse", lambda: call_gemini_for_spec(prompt, use_cache=use_cache))
+    filled = run_stage("fill", lambda: match_and_fill_template(spec))
+    path = run_stage("generate", lambda: get_generation_pool().generate(filled, spec))
+    try:
+        pcb_path, pcb_error = run_stage("pcb", lambda: get_generation_pool().generate_pcb(filled, spec)), None
+    except PipelineError as e:
+        pcb_path, pcb_error = None, str(e)
+
+    return {"spec": spec, "filled": filled, "path": path, "pcb_path": pcb_path, "pcb_error": pcb_error,
+            "timings": timings}
+
+
+def _stage_event(stage: str, result: Any) -> Dict[str, Any]:
+    """The client-facing payload of one finished stage."""
+    if stage == "parse":
+        return {"spec": result.model_dump()}
+    if stage == "fill":
+        return {"filledTemplate": result}
+    if stage == "generate":
+        return {"kicad_sch_url": f"/download/{os.path.basename(result)}"}
+    return {"kicad_pcb_url": f"/download/{os.path.basename(result)}"}
+
+
+def stream_pipeline(prompt: str, use_cache: bool = True,
+                    heartbeat: float = STREAM_HEARTBEAT) -> Iterator[Dict[str, Any]]:
+    """
+    Run the pipeline on a background thread and yield an event dict as
+    each stage finishes: {"event": stage, "seconds", "elapsed", ...payload},
+    then {"event": "done", "timings", "pcb_error", "elapsed"} or
+    {"event": "error", "stage", "error", "elapsed"}. {"event": "heartbeat"}
+    is yielded after `heartbeat` quiet seconds so proxies keep the
+    connection open.
+
+    The run carries on if the consumer stops early; its artifacts are
+    cached as usual.
+    """
+    events: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+    started = time.perf_counter()
+
+    def elapsed() -> float:
+        return round(time.perf_counter() - started, 6)
+
+    def on_stage(stage: str, result: Any, seconds: float) -> None:
+        events.put({"event": stage, "seconds": seconds, "elapsed": elapsed(), **_stage_event(stage, result)})
+
+    def run() -> None:
+        try:
+            out = run_pipeline(prompt, use_cache=use_cache, on_stage=on_stage)
+        except PipelineError as e:
+            events.put({"event": "error", "stage": e.stage, "error": str(e), "elapsed": elapsed()})
+        except Exception as e:
+            events.put({"event": "error", "stage": None, "error": f"Unexpected error: {e}", "elapsed": elapsed()})
+        else:
+            events.put({"event": "done", "timings": out["timings"], "pcb_error": out["pcb_error"],
+                        "elapsed": elapsed()})
+
+    # The run logs under the caller's request id
+    context = contextvars.copy_context()
+    threading.Thread(target=context.run, args=(run,), name="generate-stream", daemon=True).start()
+    while True:
+        try:
+            event = events.get(timeout=heartbeat)
+        except queue.Empty:
+            yield {"event": "heartbeat", "elapsed": elapsed()}
+            continue
+        yield event
+        if event["event"] in ("done", "error"):
+            return
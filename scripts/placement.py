@@ -0,0 +1,422 @@
+# scripts/placement.py
+"""
+Connectivity-driven component placement for the PCB writer.
+
+Minimizes the total half-perimeter wirelength (HPWL) of the nets in
+three steps:
+
+  1. Force-directed global placement: pins are springs to their net's
+     centroid, solved with conjugate gradients, while growing anchor
+     springs pull parts towards a spread-out copy of the placement
+     (vectorized with bincount; no pairwise forces).
+  2. Legalization into rows: parts sorted by y are cut into rows, slide
+     along x (and rows along y) towards their targets, keeping their
+     order and a clearance, so courtyard boxes never overlap.
+  3. Simulated annealing over moves that keep the placement legal:
+     swapping two parts of equal size anywhere, or two neighbours in a
+     row.
+
+Positions are footprint origins in mm inside a board outline starting
+at `origin`.
+"""
+
+import math
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from scripts.footprints import Footprint
+
+
+class PlacementError(ValueError):
+    """Raised when the parts cannot fit inside the requested board outline."""
+
+
+class Netlist:
+    """
+    The placement problem as flat arrays: part sizes (courtyard boxes plus
+    clearance) and one row per pin with its part, net and offset from
+    the part's box center. Nets with fewer than two pins are dropped.
+    """
+
+    def __init__(self, footprints: Dict[str, Footprint], pad_nets: Dict[str, Dict[str, str]], clearance: float):
+        self.refs = list(footprints)
+        index = {ref: i for i, ref in enumerate(self.refs)}
+        boxes = np.array([footprints[ref].bbox for ref in self.refs], dtype=float).reshape(-1, 4)
+        self.size = np.stack([boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]], axis=1) + clearance
+        # Footprint origin relative to its box center
+        self.origin_offset = -np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, (boxes[:, 1] + boxes[:, 3]) / 2], axis=1)
+
+        pins: List[Tuple[int, str, float, float]] = []
+        for ref, nets in pad_nets.items():
+            i = index[ref]
+            for pad_number, net in nets.items():
+                for pad in footprints[ref].pads_by_number.get(pad_number, ()):
+                    pins.append((i, net, pad.x, pad.y))
+        degree: Dict[str, int] = {}
+        for _, net, _, _ in pins:
+            degree[net] = degree.get(net, 0) + 1
+        self.net_names = sorted(net for net, n in degree.items() if n >= 2)
+        net_index = {net: k for k, net in enumerate(self.net_names)}
+        pins = sorted((p for p in pins if p[1] in net_index), key=lambda p: net_index[p[1]])
+
+        self.pin_part = np.array([p[0] for p in pins], dtype=np.int64)
+        self.pin_net = np.array([net_index[p[1]] for p in pins], dtype=np.int64)
+        self.pin_offset = (np.array([(p[2], p[3]) for p in pins], dtype=float).reshape(-1, 2)
+                           + self.origin_offset[self.pin_part])
+        # Pins are grouped by net: net k owns pins net_start[k]:net_start[k + 1]
+        self.net_start = np.searchsorted(self.pin_net, np.arange(len(self.net_names) + 1))
+        self.part_pins: List[np.ndarray] = [np.flatnonzero(self.pin_part == i) for i in range(len(self.refs))]
+        self.part_nets: List[np.ndarray] = [np.unique(self.pin_net[p]) for p in self.part_pins]
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def pin_positions(self, centers: np.ndarray) -> np.ndarray:
+        return centers[self.pin_part] + self.pin_offset
+
+    def net_hpwl(self, centers: np.ndarray) -> np.ndarray:
+        """Half-perimeter wirelength of every net, in mm."""
+        if not self.net_names:
+            return np.zeros(0)
+        pts = self.pin_positions(centers)
+        starts = self.net_start[:-1]
+        span = np.maximum.reduceat(pts, starts, axis=0) - np.minimum.reduceat(pts, starts, axis=0)
+        return span.sum(axis=1)
+
+    def hpwl(self, centers: np.ndarray) -> float:
+        return float(self.net_hpwl(centers).sum())
+
+
+def _rows(order: np.ndarray, width: np.ndarray, board_width: float) -> List[np.ndarray]:
+    """Greedily cut `order` into rows whose widths add up to at most board_width."""
+    rows, start, used = [], 0, 0.0
+    w = width[order]
+    for k in range(len(order)):
+        if used + w[k] > board_width and k > start:
+            rows.append(order[start:k])
+            start, used = k, 0.0
+        used += w[k]
+    if start < len(order):
+        rows.append(order[start:])
+    return rows
+
+
+def legalize(centers: np.ndarray, size: np.ndarray, board_width: float,
+             board_height: Optional[float] = None, fill: float = 1.0) -> np.ndarray:
+    """
+    Overlap-free placement close to `centers`: parts sorted by y are cut
+    into rows of at most `fill` times the board width. Within a row parts
+    keep their x order and slide as close to their targets as neighbours
+    and board edges allow; rows do the same along y. Raises
+    PlacementError when the rows exceed `board_height`.
+    """
+    if np.any(size[:, 0] > board_width):
+        raise PlacementError(f"a part is wider ({size[:, 0].max():.2f} mm) than the board ({board_width:.2f} mm)")
+    order = np.lexsort((centers[:, 0], centers[:, 1]))
+    n_rows = max(1, math.ceil(size[:, 0].sum() / (board_width * fill)))
+    capacity = min(board_width, max(size[:, 0].sum() / n_rows, size[:, 0].max()) + 1e-9)
+    rows = _rows(order, size[:, 0], capacity)
+
+    out = np.empty_like(centers)
+    heights, wanted = [], []
+    for row in rows:
+        row = row[np.argsort(centers[row, 0], kind="stable")]
+        out[row, 0] = _slide(centers[row, 0], size[row, 0], board_width)
+        heights.append(size[row, 1].max())
+        wanted.append(centers[row, 1].mean())
+    heights = np.array(heights)
+    needed = float(heights.sum())
+    if board_height is not None and needed > board_height + 1e-9:
+        raise PlacementError(f"parts need {needed:.2f} mm of board height, outline has {board_height:.2f} mm")
+    row_y = _slide(np.array(wanted), heights, board_height if board_height is not None else math.inf)
+    for row, y, h in zip(rows, row_y, heights):
+        # Parts sit at the top of their row
+        out[row, 1] = y - h / 2 + size[row, 1] / 2
+    return out
+
+
+def _slide(target: np.ndarray, length: np.ndarray, limit: float) -> np.ndarray:
+    """
+    Centers for intervals of `length`, in the given order, that do not
+    overlap, fit in [0, limit] and sit as close to `target` as that allows.
+    """
+    before = np.concatenate(([0.0], np.cumsum(length)[:-1]))
+    # In "reduced" coordinates (start minus the lengths before it) any
+    # non-decreasing sequence is overlap-free, so clip and take a running max
+    reduced = np.clip(target - length / 2 - before, 0.0, limit - length.sum())
+    return np.maximum.accumulate(reduced) + before + length / 2
+
+
+def _spread(centers: np.ndarray, size: np.ndarray, board: Tuple[float, float]) -> np.ndarray:
+    """Overlap-tolerant spreading targets: rows of equal total width, parts evenly spaced within them."""
+    board_w, board_h = board
+    order = np.lexsort((centers[:, 0], centers[:, 1]))
+    area_w = np.cumsum(size[order, 0])
+    n_rows = max(1, math.ceil(area_w[-1] / board_w))
+    row_of = np.minimum((area_w - size[order, 0] / 2) / (area_w[-1] / n_rows), n_rows - 1).astype(int)
+    out = np.empty_like(centers)
+    out[order, 1] = (row_of + 0.5) * board_h / n_rows
+    for r in range(n_rows):
+        members = order[row_of == r]
+        if not len(members):
+            continue
+        members = members[np.argsort(centers[members, 0], kind="stable")]
+        w = size[members, 0]
+        slack = max(board_w - w.sum(), 0.0) / (len(members) + 1)
+        out[members, 0] = np.cumsum(w + slack) - w / 2
+    return out
+
+
+def _conjugate_gradient(matvec, b: np.ndarray, x: np.ndarray, iterations: int = 60, tol: float = 1e-6) -> np.ndarray:
+    r = b - matvec(x)
+    p = r.copy()
+    rr = float(r @ r)
+    stop = tol * tol * max(float(b @ b), 1e-12)
+    for _ in range(iterations):
+        if rr <= stop:
+            break
+        ap = matvec(p)
+        step = rr / float(p @ ap)
+        x = x + step * p
+        r = r - step * ap
+        rr_new = float(r @ r)
+        p = r + (rr_new / rr) * p
+        rr = rr_new
+    return x
+
+
+def force_directed(net: Netlist, board: Tuple[float, float], iterations: int = 12,
+                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    Global placement: pins are springs to their net's centroid (weighted
+    1/(pins - 1), so big nets do not dominate). Each iteration solves for
+    the minimum-energy positions with conjugate gradients, then ties every
+    part with a stiffer spring to its spread-out position (FastPlace
+    style) so parts stop piling up in the middle.
+    """
+    rng = rng or np.random.default_rng(0)
+    n = len(net)
+    board_arr = np.array(board, dtype=float)
+    centers = board_arr / 2 + (rng.random((n, 2)) - 0.5) * 1e-3 * board_arr
+    if not len(net.pin_part):
+        return _spread(centers, net.size, board)
+
+    n_nets = len(net.net_names)
+    net_deg = np.bincount(net.pin_net, minlength=n_nets).astype(float)
+    pin_weight = (1.0 / (net_deg - 1.0))[net.pin_net]
+
+    def spring(values: np.ndarray) -> np.ndarray:
+        """Per part: sum of weighted pin displacements from their net centroids."""
+        mean = np.bincount(net.pin_net, values, minlength=n_nets) / net_deg
+        return np.bincount(net.pin_part, pin_weight * (values - mean[net.pin_net]), minlength=n)
+
+    stiffness = np.bincount(net.pin_part, pin_weight, minlength=n)
+    base = max(float(stiffness.mean()), 1e-6)
+    anchor = np.full(n, 1e-3 * base)
+    target = centers.copy()
+    for it in range(iterations):
+        for d in (0, 1):
+            # Minimize spring energy + anchor * (x - target)^2 along axis d
+            b = anchor * target[:, d] - spring(net.pin_offset[:, d])
+            centers[:, d] = _conjugate_gradient(lambda v: spring(v[net.pin_part]) + anchor * v, b, centers[:, d])
+        target = _spread(centers, net.size, board)
+        anchor = np.full(n, base * 0.1 * (it + 1))
+    return centers
+
+
+def anneal(net: Netlist, centers: np.ndarray, moves: int, time_budget: float,
+           rng: Optional[np.random.Generator] = None, max_net_pins: int = 64) -> Tuple[np.ndarray, int]:
+    """
+    Simulated annealing over swaps that keep the placement legal: two parts
+    of equal size anywhere, or two neighbours in a row. Each move only
+    recomputes the nets of the parts involved; nets with more than
+    `max_net_pins` pins (power, ground) barely change with a swap and are
+    left out. Starts cool (about a part width) since the global placement
+    is already good. Returns (centers, accepted moves).
+    """
+    rng = rng or np.random.default_rng(0)
+    n = len(net)
+    if n < 2 or not len(net.pin_part):
+        return centers, 0
+    size = net.size
+    net_len = net.net_hpwl(centers)
+    pts = net.pin_positions(centers)
+
+    # Per part: the pins of its nets, grouped by net, for one reduceat per move
+    starts = net.net_start
+    small = [k for k in range(len(net.net_names)) if starts[k + 1] - starts[k] <= max_net_pins]
+    ranges = {k: np.arange(starts[k], starts[k + 1]) for k in small}
+    bundles = []
+    for nets in net.part_nets:
+        nets = [k for k in nets.tolist() if k in ranges]
+        pins = [ranges[k] for k in nets]
+        bundles.append((np.array(nets, dtype=np.int64),
+                        np.concatenate(pins) if pins else np.zeros(0, dtype=np.int64),
+                        np.cumsum([0] + [len(p) for p in pins])[:len(pins)].astype(np.int64)))
+
+    # Parts of equal size can trade places anywhere on the board
+    groups: Dict[Tuple[float, float], List[int]] = {}
+    for i, (w, h) in enumerate(np.round(size, 4).tolist()):
+        groups.setdefault((w, h), []).append(i)
+    same_size = [groups[(w, h)] for w, h in np.round(size, 4).tolist()]
+
+    # Rows in x order (legalize aligns every row's tops); swaps keep them up to date
+    order = np.lexsort((centers[:, 0], np.round(centers[:, 1] - size[:, 1] / 2, 6)))
+    row_top = np.round(centers[order, 1] - size[order, 1] / 2, 6)
+    rows = [chunk.tolist() for chunk in np.split(order, np.flatnonzero(np.diff(row_top)) + 1)]
+    row_of, slot = [0] * n, [0] * n
+    for r, row in enumerate(rows):
+        for k, i in enumerate(row):
+            row_of[i], slot[i] = r, k
+
+    net_sets = [set(nets.tolist()) for nets, _, _ in bundles]
+    w, h = size[:, 0].tolist(), size[:, 1].tolist()
+    xy = centers.tolist()
+    temperature = float(np.median(size[:, 0]))
+    cooling = 0.001 ** (1.0 / max(moves, 1))
+    deadline = time.perf_counter() + time_budget
+    accepted = 0
+    for step, (pick, kind, peer, luck) in enumerate(rng.random((moves, 4)).tolist()):
+        if step % 256 == 0 and time.perf_counter() > deadline:
+            break
+        temperature *= cooling
+        a = int(pick * n)
+        if kind < 0.5:
+            row = rows[row_of[a]]
+            if len(row) < 2:
+                continue
+            k = min(slot[a], len(row) - 2)
+            a, b = row[k], row[k + 1]
+            # b takes a's left edge, a ends at b's old right edge; both keep the row's top
+            top = xy[a][1] - h[a] / 2
+            shift = (w[b] - w[a]) / 2
+            new_a, new_b = [xy[b][0] + shift, top + h[a] / 2], [xy[a][0] + shift, top + h[b] / 2]
+        else:
+            peers = same_size[a]
+            b = peers[int(peer * len(peers))]
+            if a == b:
+                continue
+            new_a, new_b = xy[b], xy[a]
+
+        (nets_a, pins_a, cut_a), (nets_b, pins_b, cut_b) = bundles[a], bundles[b]
+        if not len(nets_a) and not len(nets_b):
+            continue
+        pts[net.part_pins[a]] = net.pin_offset[net.part_pins[a]] + new_a
+        pts[net.part_pins[b]] = net.pin_offset[net.part_pins[b]] + new_b
+        p = pts[np.concatenate((pins_a, pins_b))]
+        cuts = np.concatenate((cut_a, cut_b + len(pins_a)))
+        new_len = (np.maximum.reduceat(p, cuts) - np.minimum.reduceat(p, cuts)).sum(axis=1)
+        nets = np.concatenate((nets_a, nets_b))
+        if not net_sets[a].isdisjoint(net_sets[b]):
+            # Nets shared by a and b appear in both bundles; count them once
+            nets, first = np.unique(nets, return_index=True)
+            new_len = new_len[first]
+        delta = float(new_len.sum() - net_len[nets].sum())
+        if delta <= 0 or luck < math.exp(-delta / temperature):
+            net_len[nets] = new_len
+            xy[a], xy[b] = new_a, new_b
+            rows[row_of[a]][slot[a]], rows[row_of[b]][slot[b]] = b, a
+            row_of[a], row_of[b] = row_of[b], row_of[a]
+            slot[a], slot[b] = slot[b], slot[a]
+            accepted += 1
+        else:
+            pts[net.part_pins[a]] = net.pin_offset[net.part_pins[a]] + xy[a]
+            pts[net.part_pins[b]] = net.pin_offset[net.part_pins[b]] + xy[b]
+    return np.array(xy, dtype=float), accepted
+
+
+def count_overlaps(centers: np.ndarray, size: np.ndarray, tolerance: float = 1e-6) -> int:
+    """Number of overlapping box pairs (sweep over x; fine for thousands of parts)."""
+    lo, hi = centers - size / 2, centers + size / 2
+    order = np.argsort(lo[:, 0])
+    active: List[int] = []
+    overlaps = 0
+    for i in order:
+        active = [j for j in active if hi[j, 0] > lo[i, 0] + tolerance]
+        overlaps += sum(1 for j in active if hi[j, 1] > lo[i, 1] + tolerance and hi[i, 1] > lo[j, 1] + tolerance)
+        active.append(i)
+    return overlaps
+
+
+def wirelength(footprints: Dict[str, Footprint], pad_nets: Dict[str, Dict[str, str]],
+               positions: Dict[str, Tuple[float, float]]) -> float:
+    """Total HPWL (mm) of `pad_nets` with footprint origins at `positions`."""
+    if not footprints:
+        return 0.0
+    net = Netlist(footprints, pad_nets, 0.0)
+    origins = np.array([positions[ref] for ref in net.refs], dtype=float)
+    return net.hpwl(origins - net.origin_offset)
+
+
+def auto_board(size: np.ndarray, utilization: float, aspect: float = 1.5) -> Tuple[float, float]:
+    """A board outline with `utilization` of its area covered by parts."""
+    area = float((size[:, 0] * size[:, 1]).sum()) / utilization
+    width = max(math.sqrt(area * aspect), float(size[:, 0].max()))
+    return width, area / width
+
+
+def place(
+    footprints: Dict[str, Footprint],
+    pad_nets: Dict[str, Dict[str, str]],
+    board: Optional[Tuple[float, float]] = None,
+    origin: Tuple[float, float] = (0.0, 0.0),
+    clearance: float = 1.0,
+    utilization: float = 0.4,
+    moves_per_part: int = 100,
+    time_budget: float = 2.0,
+    seed: int = 0,
+) -> Tuple[Dict[str, Tuple[float, float]], Dict[str, Any]]:
+    """
+    Place `footprints` ({ref: Footprint}) to minimize the HPWL of
+    `pad_nets` ({ref: {pad number: net}}) inside `board` (width, height
+    in mm; sized for `utilization` when None) whose corner is `origin`.
+
+    Returns ({ref: (x, y) footprint origin}, report) where the report has
+    the board size, HPWL of a plain row placement and of the result,
+    remaining overlaps (always 0) and the runtime.
+    """
+    started = time.perf_counter()
+    if not footprints:
+        return {}, {"parts": 0, "nets": 0, "board": [0.0, 0.0], "hpwl_initial": 0.0, "hpwl": 0.0,
+                    "overlaps": 0, "moves_accepted": 0, "seconds": 0.0}
+    net = Netlist(footprints, pad_nets, clearance)
+    # An automatic board only fixes the width; it grows as tall as the rows need
+    height_limit = float(board[1]) if board else None
+    board = (float(board[0]), float(board[1])) if board else auto_board(net.size, utilization)
+    rng = np.random.default_rng(seed)
+
+    fill = math.sqrt(utilization)
+
+    def legal(targets: np.ndarray) -> np.ndarray:
+        try:
+            return legalize(targets, net.size, board[0], height_limit, fill)
+        except PlacementError:
+            if fill >= 1.0:
+                raise
+            return legalize(targets, net.size, board[0], height_limit)
+
+    # Reference: rows filled in reference order, ignoring connectivity
+    baseline = legal(np.stack([np.arange(len(net), dtype=float), np.zeros(len(net))], 1))
+    hpwl_initial = net.hpwl(baseline)
+
+    centers = legal(force_directed(net, board, rng=rng))
+    if net.hpwl(centers) > hpwl_initial:
+        centers = baseline
+    centers, accepted = anneal(net, centers, moves_per_part * len(net), time_budget, rng=rng)
+    if height_limit is None:
+        board = (board[0], float((centers[:, 1] + net.size[:, 1] / 2).max()))
+
+    origins = centers + net.origin_offset + np.asarray(origin, dtype=float) + clearance / 2
+    positions = {ref: (round(float(x), 4), round(float(y), 4)) for ref, (x, y) in zip(net.refs, origins)}
+    return positions, {
+        "parts": len(net),
+        "nets": len(net.net_names),
+        "board": [round(board[0], 3), round(board[1], 3)],
+        "hpwl_initial": round(hpwl_initial, 3),
+        "hpwl": round(net.hpwl(centers), 3),
+        "overlaps": count_overlaps(centers, net.size - clearance),
+        "moves_accepted": accepted,
+        "seconds": round(time.perf_counter() - started, 4),
+    }
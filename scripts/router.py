@@ -0,0 +1,511 @@
+# scripts/router.py
+"""
+Two-layer maze router for the PCB writer: turns the pad nets of a placed
+board into copper tracks (F.Cu / B.Cu segments) and vias.
+
+The board is a grid of `grid` mm cells per layer. NumPy arrays record
+which net's copper covers each cell (pads and tracks separately); for
+every connection the cells too close to other nets' copper for this
+net's track width and clearance are blocked by a vectorized dilation,
+and A* searches the free cells with a cost per cell (cheaper along the
+layer's preferred direction) and a cost per via. Connections are
+searched in a window around their pins that grows when they fail.
+
+Nets are routed shortest first, each as a tree (every pin joins the
+copper already laid for its net). A net that cannot be routed searches
+again treating other nets' tracks as expensive instead of blocked; the
+nets in its way are ripped up and queued to be routed again after it.
+
+Pads are joined on F.Cu (every copper pad is there) and block other
+nets on both layers. Net classes set track width, clearance and via
+size per net; KiCad keeps net classes in the project file, so they only
+show in the board as the track widths.
+"""
+
+import heapq
+import math
+import re
+import time
+from collections import deque
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+LAYERS = ("F.Cu", "B.Cu")
+
+# Grid resolution and cost model (cells)
+GRID = 0.25
+VIA_COST = 10.0
+# Cost of a step across a layer's preferred direction (F.Cu horizontal, B.Cu vertical)
+CROSS_COST = 1.5
+# Extra cost of a step over another net's track while looking for nets to rip up
+RIPUP_PENALTY = 30.0
+# Clearance (mm) between tracks and the board edge
+EDGE_CLEARANCE = 0.5
+# How often a net may be ripped up before it is left unrouted
+MAX_RIPUPS = 3
+# Cells around a connection's pins to search; a failed search retries with the next
+SEARCH_MARGINS = (8, 32, 96)
+
+
+class NetClass(NamedTuple):
+    """Design rules for a group of nets, in mm."""
+    track_width: float
+    clearance: float
+    via_diameter: float
+    via_drill: float
+
+
+NET_CLASSES: Dict[str, NetClass] = {
+    "Default": NetClass(track_width=0.25, clearance=0.2, via_diameter=0.6, via_drill=0.3),
+    "Power": NetClass(track_width=0.5, clearance=0.25, via_diameter=0.8, via_drill=0.4),
+}
+
+# Net name → class; the first matching pattern wins, everything else is "Default"
+NET_CLASS_PATTERNS: List[Tuple[str, str]] = [
+    (r"^([AD]?GND|VSS|VEE|VCC|VDD|VIN|VOUT|VBAT|VBUS|V\+|V-)\b", "Power"),
+    (r"^[+-]?\d+(\.\d+)?V\d*$", "Power"),
+]
+
+
+def net_class_of(net: str, patterns: Sequence[Tuple[str, str]] = NET_CLASS_PATTERNS) -> str:
+    for pattern, name in patterns:
+        if re.search(pattern, net, re.IGNORECASE):
+            return name
+    return "Default"
+
+
+def _cells(length: float, grid: float) -> int:
+    """Cells on each side of a center cell covered by copper reaching `length` mm from its center."""
+    return max(0, math.ceil(length / grid - 0.5))
+
+
+def _keepout(distance: float, grid: float) -> int:
+    """
+    Dilation (cells) keeping a copper edge `distance` mm from copper in the
+    dilated cells, which may fill their cell up to its boundary.
+    """
+    return max(0, math.ceil(distance / grid + 0.5) - 1)
+
+
+def _estimate(layer: int, d_row: int, d_col: int) -> float:
+    """
+    A* lower bound to a target on F.Cu: columns cost 1 on F.Cu; rows cost
+    CROSS_COST there, or 1 on B.Cu after a via down and back up.
+    """
+    if layer:
+        return d_col + d_row + VIA_COST
+    return d_col + min(CROSS_COST * d_row, d_row + 2 * VIA_COST)
+
+
+def _dilate(mask: np.ndarray, r: int) -> np.ndarray:
+    """Square dilation of the last two axes by r cells."""
+    if r <= 0 or not mask.any():
+        return mask.copy()
+    out = mask.copy()
+    for shift in range(1, r + 1):
+        out[..., shift:, :] |= mask[..., :-shift, :]
+        out[..., :-shift, :] |= mask[..., shift:, :]
+    rows = out.copy()
+    for shift in range(1, r + 1):
+        out[..., :, shift:] |= rows[..., :, :-shift]
+        out[..., :, :-shift] |= rows[..., :, shift:]
+    return out
+
+
+def _enclosed(blocked: np.ndarray, via_blocked: np.ndarray, start: Tuple[int, int], goals: np.ndarray,
+              steps: int = 48) -> bool:
+    """
+    Lee wavefront from F.Cu `start` over the free cells (vias where
+    allowed): True if it dies out within `steps` before touching `goals`.
+    Cheap proof that the start sits in a pocket, which is when a full A*
+    is most costly.
+    """
+    free = ~blocked
+    via_free = ~via_blocked
+    reached = np.zeros_like(blocked)
+    reached[0][start] = True
+    for _ in range(steps):
+        if (reached & goals).any():
+            return False
+        grown = reached.copy()
+        grown[:, 1:, :] |= reached[:, :-1, :]
+        grown[:, :-1, :] |= reached[:, 1:, :]
+        grown[:, :, 1:] |= reached[:, :, :-1]
+        grown[:, :, :-1] |= reached[:, :, 1:]
+        grown |= (grown.any(axis=0) & via_free)[None]
+        grown &= free
+        if np.array_equal(grown, reached):
+            return True
+        reached = grown
+    return False
+
+
+class Router:
+    """
+    Routing state of one board: pad and track owner grids (net ids, 0 =
+    free, -1 = keep-out), the laid paths per net, and the net classes.
+    """
+
+    def __init__(self, outline: Tuple[float, float, float, float], grid: float = GRID,
+                 net_classes: Optional[Dict[str, NetClass]] = None,
+                 net_class_patterns: Sequence[Tuple[str, str]] = NET_CLASS_PATTERNS):
+        x0, y0, x1, y1 = outline
+        self.grid = grid
+        self.x0, self.y0 = x0, y0
+        self.width = int(math.floor((x1 - x0) / grid)) + 1
+        self.height = int(math.floor((y1 - y0) / grid)) + 1
+        self.net_classes = net_classes or NET_CLASSES
+        self.net_class_patterns = net_class_patterns
+        shape = (len(LAYERS), self.height, self.width)
+        self.pads = np.zeros(shape, dtype=np.int32)
+        self.tracks = np.zeros(shape, dtype=np.int32)
+        edge = _cells(EDGE_CLEARANCE, grid) + 1
+        self.pads[:, :edge, :] = self.pads[:, -edge:, :] = -1
+        self.pads[:, :, :edge] = self.pads[:, :, -edge:] = -1
+        self.net_ids: Dict[str, int] = {}
+        self.net_names: List[str] = [""]
+        # net → [(row, col, pad rectangle (x0, y0, x1, y1) in mm)]
+        self.pins: Dict[str, List[Tuple[int, int, Tuple[float, float, float, float]]]] = {}
+        self.paths: Dict[str, List[List[Tuple[int, int, int]]]] = {}
+
+    # ── Grid helpers ─────────────────────────────────────────────────────────
+    def cell(self, x: float, y: float) -> Tuple[int, int]:
+        """(row, column) of the cell whose center is nearest to (x, y) mm."""
+        return (min(max(int(round((y - self.y0) / self.grid)), 0), self.height - 1),
+                min(max(int(round((x - self.x0) / self.grid)), 0), self.width - 1))
+
+    def point(self, row: int, col: int) -> Tuple[float, float]:
+        return round(self.x0 + col * self.grid, 4), round(self.y0 + row * self.grid, 4)
+
+    def rules(self, net: str) -> NetClass:
+        return self.net_classes.get(net_class_of(net, self.net_class_patterns), self.net_classes["Default"])
+
+    def net_id(self, net: str) -> int:
+        if net not in self.net_ids:
+            self.net_ids[net] = len(self.net_names)
+            self.net_names.append(net)
+        return self.net_ids[net]
+
+    # ── Pads ─────────────────────────────────────────────────────────────────
+    def add_pad(self, net: Optional[str], x: float, y: float, width: float, height: float):
+        """
+        Mark a pad's copper on both layers; pads without a net block every
+        net. Pads with a net become pins of it.
+        """
+        g = self.grid
+        r0 = max(math.ceil((y - height / 2 - self.y0) / g - 0.5), 0)
+        r1 = min(math.floor((y + height / 2 - self.y0) / g + 0.5), self.height - 1)
+        c0 = max(math.ceil((x - width / 2 - self.x0) / g - 0.5), 0)
+        c1 = min(math.floor((x + width / 2 - self.x0) / g + 0.5), self.width - 1)
+        owner = self.net_id(net) if net else -1
+        region = self.pads[:, r0:r1 + 1, c0:c1 + 1]
+        # Keep-out (-1) wins over nets; pads of different nets never share cells
+        region[region == 0] = owner
+        if net:
+            row, col = self.cell(x, y)
+            rect = (x - width / 2, y - height / 2, x + width / 2, y + height / 2)
+            self.pins.setdefault(net, []).append((row, col, rect))
+
+    # ── Tracks ───────────────────────────────────────────────────────────────
+    def _mark(self, net: str, path: List[Tuple[int, int, int]]):
+        """Record the copper of `path`: the track's width, or the via's diameter on both layers."""
+        owner = self.net_ids[net]
+        rules = self.rules(net)
+        r_track = _cells(rules.track_width / 2, self.grid)
+        r_via = _cells(rules.via_diameter / 2, self.grid)
+        for (layer, row, col), nxt in zip(path, path[1:] + [None]):
+            r = r_track
+            layers = [layer]
+            if nxt is not None and nxt[0] != layer:
+                r, layers = max(r_track, r_via), list(range(len(LAYERS)))
+            for l in layers:
+                region = self.tracks[l, max(row - r, 0):row + r + 1, max(col - r, 0):col + r + 1]
+                region[region == 0] = owner
+
+    def rip_up(self, net: str):
+        self.tracks[self.tracks == self.net_ids[net]] = 0
+        self.paths.pop(net, None)
+
+    # ── Search ───────────────────────────────────────────────────────────────
+    def _search(self, net: str, sources: List[Tuple[int, int, int]], target: Tuple[int, int],
+                margin: int, penalize_tracks: bool = False) -> Optional[List[Tuple[int, int, int]]]:
+        """
+        A* from any of `sources` (layer, row, col) to `target` on F.Cu,
+        inside the sources' and target's bounding box grown by `margin`
+        cells. Returns the path (source first) or None.
+        """
+        nid = self.net_ids[net]
+        rules = self.rules(net)
+        g = self.grid
+        k_track = _keepout(rules.track_width / 2 + rules.clearance, g)
+        k_via = _keepout(rules.via_diameter / 2 + rules.clearance, g)
+
+        rows = [s[1] for s in sources] + [target[0]]
+        cols = [s[2] for s in sources] + [target[1]]
+        wr0, wr1 = max(min(rows) - margin, 0), min(max(rows) + margin, self.height - 1)
+        wc0, wc1 = max(min(cols) - margin, 0), min(max(cols) + margin, self.width - 1)
+        h, w = wr1 - wr0 + 1, wc1 - wc0 + 1
+        # Read other nets' copper with enough border for the dilation
+        pad = max(k_track, k_via)
+        br0, br1 = max(wr0 - pad, 0), min(wr1 + pad, self.height - 1)
+        bc0, bc1 = max(wc0 - pad, 0), min(wc1 + pad, self.width - 1)
+        pads = self.pads[:, br0:br1 + 1, bc0:bc1 + 1]
+        tracks = self.tracks[:, br0:br1 + 1, bc0:bc1 + 1]
+        crop = (slice(None), slice(wr0 - br0, wr0 - br0 + h), slice(wc0 - bc0, wc0 - bc0 + w))
+
+        foreign_pads = (pads != 0) & (pads != nid)
+        foreign_tracks = (tracks != 0) & (tracks != nid)
+        blocked = _dilate(foreign_pads, k_track)[crop]
+        via_blocked = _dilate(foreign_pads.any(axis=0), k_via)[crop[1:]]
+        if penalize_tracks:
+            slow = _dilate(foreign_tracks, k_track)[crop]
+            slow_via = _dilate(foreign_tracks.any(axis=0), k_via)[crop[1:]]
+        else:
+            blocked |= _dilate(foreign_tracks, k_track)[crop]
+            via_blocked |= _dilate(foreign_tracks.any(axis=0), k_via)[crop[1:]]
+        # The net's own pads are enterable wherever the track's copper stays
+        # inside them (at least at their center cell)
+        hw = rules.track_width / 2
+        for row, col, (x0, y0, x1, y1) in self.pins[net]:
+            if not (wr0 <= row <= wr1 and wc0 <= col <= wc1):
+                continue
+            r0, r1 = math.ceil((y0 + hw - self.y0) / g), math.floor((y1 - hw - self.y0) / g)
+            c0, c1 = math.ceil((x0 + hw - self.x0) / g), math.floor((x1 - hw - self.x0) / g)
+            if r0 > r1:
+                r0 = r1 = row
+            if c0 > c1:
+                c0 = c1 = col
+            blocked[0, max(r0, wr0) - wr0:min(r1, wr1) - wr0 + 1, max(c0, wc0) - wc0:min(c1, wc1) - wc0 + 1] = False
+
+        tr, tc = target[0] - wr0, target[1] - wc0
+        if blocked[0, tr, tc]:
+            return None
+        if margin > SEARCH_MARGINS[0]:
+            # A failed search floods the whole window; rule out a walled-in target first
+            goals = np.zeros_like(blocked)
+            for layer, row, col in sources:
+                if wr0 <= row <= wr1 and wc0 <= col <= wc1:
+                    goals[layer, row - wr0, col - wc0] = True
+            if _enclosed(blocked, via_blocked, (tr, tc), goals & ~blocked):
+                return None
+
+        layer_size = h * w
+        blocked_flat = blocked.ravel().tolist()
+        via_flat = via_blocked.ravel().tolist()
+        extra = [0.0] * (2 * layer_size)
+        extra_via = [0.0] * layer_size
+        if penalize_tracks:
+            extra = (slow.ravel() * RIPUP_PENALTY).tolist()
+            extra_via = (slow_via.ravel() * RIPUP_PENALTY * 4).tolist()
+
+        goal = tr * w + tc
+        best = [math.inf] * (2 * layer_size)
+        came = [-1] * (2 * layer_size)
+        heap = []
+        for layer, row, col in sources:
+            if not (wr0 <= row <= wr1 and wc0 <= col <= wc1):
+                continue
+            idx = layer * layer_size + (row - wr0) * w + (col - wc0)
+            if blocked_flat[idx]:
+                continue
+            best[idx] = 0.0
+            heapq.heappush(heap, (_estimate(layer, abs(row - wr0 - tr), abs(col - wc0 - tc)), -0.0, idx,
+                                  layer, row - wr0, col - wc0))
+
+        push, pop = heapq.heappush, heapq.heappop
+        along, across = (1.0, CROSS_COST), (CROSS_COST, 1.0)
+        while heap:
+            # Ties go to the cell furthest along, which keeps the search narrow
+            _, cost, idx, layer, row, col = pop(heap)
+            cost = -cost
+            if cost > best[idx]:
+                continue
+            if idx == goal:
+                break
+            # (neighbour, layer, row, col, step cost): along rows is F.Cu's preferred direction
+            steps = []
+            if col > 0:
+                steps.append((idx - 1, layer, row, col - 1, along[layer]))
+            if col < w - 1:
+                steps.append((idx + 1, layer, row, col + 1, along[layer]))
+            if row > 0:
+                steps.append((idx - w, layer, row - 1, col, across[layer]))
+            if row < h - 1:
+                steps.append((idx + w, layer, row + 1, col, across[layer]))
+            rest = idx - layer * layer_size
+            if not via_flat[rest]:
+                steps.append((rest if layer else rest + layer_size, 1 - layer, row, col, VIA_COST + extra_via[rest]))
+            for nxt, n_layer, n_row, n_col, step in steps:
+                if blocked_flat[nxt]:
+                    continue
+                new_cost = cost + step + extra[nxt]
+                if new_cost < best[nxt]:
+                    best[nxt] = new_cost
+                    came[nxt] = idx
+                    d_row, d_col = abs(n_row - tr), abs(n_col - tc)
+                    # _estimate(), inlined
+                    estimate = d_col + (d_row + VIA_COST if n_layer else min(CROSS_COST * d_row, d_row + 2 * VIA_COST))
+                    push(heap, (new_cost + estimate, -new_cost, nxt, n_layer, n_row, n_col))
+        if best[goal] == math.inf:
+            return None
+
+        path = []
+        idx = goal
+        while idx != -1:
+            layer, rest = divmod(idx, layer_size)
+            row, col = divmod(rest, w)
+            path.append((layer, row + wr0, col + wc0))
+            idx = came[idx]
+        return path[::-1]
+
+    def _victims(self, net: str, path: List[Tuple[int, int, int]]) -> List[str]:
+        """Other nets whose tracks come too close to `path`."""
+        rules = self.rules(net)
+        k = _keepout(max(rules.track_width, rules.via_diameter) / 2 + rules.clearance, self.grid)
+        owners = set()
+        for layer, row, col in path:
+            near = self.tracks[:, max(row - k, 0):row + k + 1, max(col - k, 0):col + k + 1]
+            owners.update(np.unique(near).tolist())
+        owners.discard(0)
+        owners.discard(self.net_ids[net])
+        return [self.net_names[o] for o in sorted(owners) if o > 0]
+
+    def route_net(self, net: str, penalize_tracks: bool = False, give_up: bool = False) -> Tuple[bool, List[str]]:
+        """
+        Connect every pin of `net` to one tree (closest pin first), or stop
+        at the first unreachable pin if `give_up`. Returns (fully routed,
+        nets that must be ripped up when `penalize_tracks`).
+        """
+        pins = self.pins.get(net, [])
+        self.paths[net] = []
+        if len(pins) < 2:
+            return True, []
+        tree = np.array([(0, pins[0][0], pins[0][1])], dtype=np.int64)
+        todo = np.array([(row, col) for row, col, _ in pins[1:]], dtype=np.int64)
+        victims: List[str] = []
+        ok = True
+        while len(todo):
+            # Next: the pin closest to the tree
+            dist = (np.abs(todo[:, None, 0] - tree[None, :, 1]) + np.abs(todo[:, None, 1] - tree[None, :, 2]))
+            k = int(dist.min(axis=1).argmin())
+            row, col = todo[k].tolist()
+            near = tree[np.argsort(dist[k], kind="stable")[:64]]
+            todo = np.delete(todo, k, axis=0)
+            if dist[k].min() == 0 and (tree[:, 0] == 0).any():
+                if ((tree[:, 0] == 0) & (tree[:, 1] == row) & (tree[:, 2] == col)).any():
+                    continue
+            path = None
+            for margin in SEARCH_MARGINS:
+                path = self._search(net, [tuple(c) for c in near.tolist()], (row, col), margin, penalize_tracks)
+                if path is not None:
+                    break
+            if path is None:
+                ok = False
+                if give_up:
+                    break
+                continue
+            if penalize_tracks:
+                victims.extend(v for v in self._victims(net, path) if v not in victims)
+            self.paths[net].append(path)
+            self._mark(net, path)
+            tree = np.concatenate((tree, np.array(path, dtype=np.int64)))
+        return ok, victims
+
+    # ── Output ───────────────────────────────────────────────────────────────
+    def copper(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """(segments, vias) of every laid path, one segment per straight run."""
+        segments, vias = [], []
+        for net in sorted(self.paths):
+            rules = self.rules(net)
+            for path in self.paths[net]:
+                run = [path[0]]
+                for cell in path[1:] + [None]:
+                    if cell is not None and cell[0] == run[-1][0]:
+                        run.append(cell)
+                        continue
+                    corners = _corners(run)
+                    for a, b in zip(corners, corners[1:]):
+                        segments.append({"net": net, "layer": LAYERS[a[0]], "start": self.point(a[1], a[2]),
+                                         "end": self.point(b[1], b[2]), "width": rules.track_width})
+                    if cell is not None:
+                        vias.append({"net": net, "at": self.point(cell[1], cell[2]),
+                                     "size": rules.via_diameter, "drill": rules.via_drill})
+                        run = [cell]
+        return segments, vias
+
+
+def _corners(run: List[Tuple[int, int, int]]) -> List[Tuple[int, int, int]]:
+    """First, last and every cell where a same-layer run changes direction."""
+    corners = [run[0]]
+    for prev, cur, nxt in zip(run, run[1:], run[2:]):
+        if (cur[1] - prev[1], cur[2] - prev[2]) != (nxt[1] - cur[1], nxt[2] - cur[2]):
+            corners.append(cur)
+    if len(run) > 1:
+        corners.append(run[-1])
+    return corners
+
+
+def route(placed: List[Dict[str, Any]], outline: Tuple[float, float, float, float], grid: float = GRID,
+          net_classes: Optional[Dict[str, NetClass]] = None,
+          time_budget: Optional[float] = None) -> Tuple[Dict[str, List[Dict[str, Any]]], Dict[str, Any]]:
+    """
+    Route the pad nets of `placed` (see pcb_writer.Placed) inside
+    `outline` (x0, y0, x1, y1 mm). Returns ({"segments": [...], "vias":
+    [...]}, report) with routed/unrouted net counts, rip-ups and the time
+    spent per net. Nets left when `time_budget` seconds run out stay
+    unrouted.
+    """
+    started = time.perf_counter()
+    router = Router(outline, grid, net_classes)
+    for item in placed:
+        x, y = item["at"]
+        pad_nets = item.get("pad_nets") or {}
+        for pad in item["footprint"].pads:
+            router.add_pad(pad_nets.get(pad.number), x + pad.x, y + pad.y, pad.width, pad.height)
+
+    def span(net: str) -> int:
+        pins = router.pins[net]
+        return (max(p[0] for p in pins) - min(p[0] for p in pins)) + (max(p[1] for p in pins) - min(p[1] for p in pins))
+
+    nets = sorted((net for net, pins in router.pins.items() if len(pins) >= 2), key=lambda n: (span(n), n))
+    queue = deque(nets)
+    ripups: Dict[str, int] = {}
+    routed: Dict[str, bool] = {}
+    seconds: Dict[str, float] = {}
+    while queue:
+        if time_budget is not None and time.perf_counter() - started > time_budget:
+            break
+        net = queue.popleft()
+        net_started = time.perf_counter()
+        can_rip_up = ripups.get(net, 0) < MAX_RIPUPS
+        ok, _ = router.route_net(net, give_up=can_rip_up)
+        if not ok and can_rip_up:
+            # Find who is in the way, move them out, and try again
+            router.rip_up(net)
+            _, victims = router.route_net(net, penalize_tracks=True)
+            router.rip_up(net)
+            victims = [v for v in victims if ripups.get(v, 0) < MAX_RIPUPS]
+            for victim in victims:
+                router.rip_up(victim)
+                ripups[victim] = ripups.get(victim, 0) + 1
+                routed[victim] = False
+                queue.append(victim)
+            ripups[net] = ripups.get(net, 0) + 1
+            ok, _ = router.route_net(net)
+        routed[net] = ok
+        seconds[net] = seconds.get(net, 0.0) + time.perf_counter() - net_started
+
+    segments, vias = router.copper()
+    unrouted = sorted(net for net in nets if not routed.get(net))
+    return {"segments": segments, "vias": vias}, {
+        "nets": len(nets),
+        "routed": len(nets) - len(unrouted),
+        "unrouted": unrouted,
+        "segments": len(segments),
+        "vias": len(vias),
+        "ripups": sum(ripups.values()),
+        "track_length_mm": round(sum(math.dist(s["start"], s["end"]) for s in segments), 3),
+        "seconds": round(time.perf_counter() - started, 4),
+        "seconds_per_net": {net: round(s, 5) for net, s in sorted(seconds.items())},
+    }
@@ -0,0 +1,83 @@
+# scripts/sexpr.py
+
+import re
+from typing import Any, List, Union
+
+# "(", ")", a quoted string (with \" escapes), or a bare atom
+_TOKEN_RE = re.compile(r'\(|\)|"((?:[^"\\]|\\.)*)"|([^\s()"]+)', re.S)
+_ESCAPE_RE = re.compile(r"\\(.)", re.S)
+_ESCAPES = {"n": "\n", "t": "\t"}
+
+SExpr = Union[str, List[Any]]
+
+# Bare atoms that dump_sexpr can write without quotes
+_BARE_RE = re.compile(r'[^\s()"\\]+')
+
+
+class Quoted(str):
+    """A string atom that was written in double quotes (see keep_quotes)."""
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text:
+        return text
+    return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1), m.group(1)), text)
+
+
+def parse_sexpr(text: str, keep_quotes: bool = False) -> SExpr:
+    """
+    Parse KiCad's S-expression format (.kicad_sym, .kicad_mod, .kicad_pcb)
+    into nested lists of strings: '(pin passive line (number "1"))' becomes
+    ['pin', 'passive', 'line', ['number', '1']]. Numbers stay strings.
+    With keep_quotes, quoted atoms come back as Quoted so dump_sexpr can
+    write them the same way (KiCad keywords must stay bare).
+    Raises ValueError on unbalanced parentheses.
+    """
+    stack: List[List[Any]] = [[]]
+    for m in _TOKEN_RE.finditer(text):
+        quoted, atom = m.group(1), m.group(2)
+        if atom is not None:
+            stack[-1].append(atom)
+        elif quoted is not None:
+            stack[-1].append(Quoted(_unescape(quoted)) if keep_quotes else _unescape(quoted))
+        elif m.group(0) == "(":
+            node: List[Any] = []
+            stack[-1].append(node)
+            stack.append(node)
+        else:
+            if len(stack) == 1:
+                raise ValueError(f"unbalanced ')' at offset {m.start()}")
+            stack.pop()
+    if len(stack) != 1:
+        raise ValueError("unexpected end of input: unclosed '('")
+    top = stack[0]
+    return top[0] if len(top) == 1 else top
+
+
+def find_all(node: SExpr, key: str) -> List[List[Any]]:
+    """Direct children of `node` that are lists starting with `key`."""
+    if not isinstance(node, list):
+        return []
+    return [child for child in node if isinstance(child, list) and child and child[0] == key]
+
+
+def find(node: SExpr, key: str) -> Any:
+    """First direct child list starting with `key`, or None."""
+    for child in find_all(node, key):
+        return child
+    return None
+
+
+def quote_atom(atom: str) -> str:
+    """Write a string atom: bare if it can be, else a quoted literal."""
+    if not isinstance(atom, Quoted) and _BARE_RE.fullmatch(atom):
+        return atom
+    escaped = atom.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def dump_sexpr(node: SExpr) -> str:
+    """Inverse of parse_sexpr(..., keep_quotes=True), on a single line."""
+    if isinstance(node, list):
+        return "(" + " ".join(dump_sexpr(child) for child in node) + ")"
+    return quote_atom(node)
@@ -0,0 +1,208 @@
+# scripts/spec_cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Fold whitespace and case so that "Buck  converter 12V" and
+    "buck converter 12v" share one cache entry.
+    """
+    return " ".join(prompt.split()).casefold()
+
+
+def prompt_key(prompt: str) -> str:
+    """
+    Stable cache key (sha256 hex) for a prompt, after normalization.
+    """
+    return hashlib.sha256(normalize_prompt(prompt).encode("utf-8")).hexdigest()
+
+
+class PromptCache:
+    """
+    Two-tier cache for prompt → value lookups.
+
+      • Tier 1: in-process LRU (OrderedDict), bounded by `memory_entries`
+      • Tier 2: SQLite file on disk that survives restarts and is shared by
+        every gunicorn worker, bounded by `disk_entries`
+
+    Both tiers expire entries after `ttl` seconds. Values are written to disk
+    with `serialize` and read back with `deserialize`. Disk hits refresh a
+    row's LRU position in memory only; the access times are written back
+    `touch_batch` at a time (and before every trim), so reads never commit.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        serialize: Callable[[Any], str],
+        deserialize: Callable[[str], Any],
+        ttl: float = 86400.0,
+        memory_entries: int = 256,
+        disk_entries: int = 10000,
+        touch_batch: int = 64,
+    ):
+        self.path = Path(path)
+        self.serialize = serialize
+        self.deserialize = deserialize
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.touch_batch = touch_batch
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()  # key → (expires_at, value)
+        self._touched: Dict[str, float] = {}                       # key → last disk-hit time, not yet written
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self._counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "puts": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+    # ───────────────────────────────────────────────────────────────
+    # Disk tier
+    # ───────────────────────────────────────────────────────────────
+    def _db(self) -> sqlite3.Connection:
+        """Return this process's SQLite connection (re-opened after fork)."""
+        if self._conn is None or self._conn_pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompt_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " created REAL NOT NULL,"
+                " accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS prompt_cache_accessed ON prompt_cache(accessed)")
+            conn.commit()
+            self._conn = conn
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        """(serialized value, created) for `key`, or None if absent or expired."""
+        db = self._db()
+        row = db.execute("SELECT value, created FROM prompt_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if now - created > self.ttl:
+            db.execute("DELETE FROM prompt_cache WHERE key = ?", (key,))
+            db.commit()
+            self._counters["expired"] += 1
+            return None
+        self._touched[key] = now
+        if len(self._touched) >= self.touch_batch:
+            self._flush_touches()
+        return value, created
+
+    def _flush_touches(self) -> None:
+        """Write buffered access times back in one transaction."""
+        if not self._touched:
+            return
+        db = self._db()
+        db.executemany(
+            "UPDATE prompt_cache SET accessed = MAX(accessed, ?) WHERE key = ?",
+            [(accessed, key) for key, accessed in self._touched.items()],
+        )
+        db.commit()
+        self._touched.clear()
+
+    def _disk_put(self, key: str, value: str, now: float) -> None:
+        self._touched.pop(key, None)
+        self._flush_touches()
+        db = self._db()
+        db.execute(
+            "INSERT OR REPLACE INTO prompt_cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+            (key, value, now, now),
+        )
+        # TTL sweep, then trim least-recently-used rows beyond the size bound
+        cur = db.execute("DELETE FROM prompt_cache WHERE created < ?", (now - self.ttl,))
+        self._counters["expired"] += cur.rowcount
+        cur = db.execute(
+            "DELETE FROM prompt_cache WHERE key IN ("
+            " SELECT key FROM prompt_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.disk_entries,),
+        )
+        self._counters["evictions"] += cur.rowcount
+        db.commit()
+
+    # ───────────────────────────────────────────────────────────────
+    # Public API
+    # ───────────────────────────────────────────────────────────────
+    def get(self, prompt: str) -> Optional[Any]:
+        """Return the cached value for `prompt`, or None on a miss."""
+        key = prompt_key(prompt)
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at >= now:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+            row = self._disk_get(key, now)
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+
+            raw, created = row
+            value = self.deserialize(raw)
+            # Expire from memory when the disk row does, not a full ttl from now
+            self._memory_put(key, value, created)
+            self._counters["disk_hits"] += 1
+            return value
+
+    def put(self, prompt: str, value: Any) -> None:
+        """Store `value` for `prompt` in both tiers."""
+        key = prompt_key(prompt)
+        now = time.time()
+        raw = self.serialize(value)
+        with self._lock:
+            self._memory_put(key, value, now)
+            self._disk_put(key, raw, now)
+            self._counters["puts"] += 1
+
+    def _memory_put(self, key: str, value: Any, created: float) -> None:
+        self._memory[key] = (created + self.ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers (counters are kept)."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            db = self._db()
+            db.execute("DELETE FROM prompt_cache")
+            db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_size"] = len(self._memory)
+            stats["disk_size"] = self._db().execute("SELECT COUNT(*) FROM prompt_cache").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
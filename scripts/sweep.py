@@ -0,0 +1,198 @@
+# scripts/sweep.py
+"""
+Design-space sweeps: component values for a circuit type across whole
+ranges of its inputs in one call, using the array calculators in
+template_matcher.py. Served by /sweep.
+
+Each input is a fixed value ("12", 12 or "12V"), a list of values, or a
+range {"start", "stop", "num", "scale": "linear"|"log"}. With more than
+one input swept, every combination is a point (the first input varies
+slowest). Netlists and boards can be generated for chosen points through
+the batch pipeline.
+"""
+
+import os
+import re
+import time
+import itertools
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from scripts.template_matcher import (
+    compute_555_astable_arrays, compute_divider_R2_array, compute_high_pass_arrays, compute_low_pass_arrays,
+)
+from scripts.metrics import observe_stage
+
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", "1000000"))
+SWEEP_MAX_GENERATE = int(os.getenv("SWEEP_MAX_GENERATE", "20"))
+
+# circuit_type → (inputs with their units, calculator, output units)
+SWEEPS: Dict[str, Tuple[Dict[str, str], Callable[..., Dict[str, np.ndarray]], Dict[str, str]]] = {
+    "voltage_divider": (
+        {"Vin": "V", "Vout": "V"},
+        lambda Vin, Vout: {"R2_value": compute_divider_R2_array(Vin, Vout)},
+        {"R2_value": "kΩ"},
+    ),
+    "low_pass_filter": (
+        {"cutoff_frequency": "kHz"}, compute_low_pass_arrays, {"R1_value": "kΩ", "C1_value": "nF"},
+    ),
+    "high_pass_filter": (
+        {"cutoff_frequency": "kHz"}, compute_high_pass_arrays, {"R1_value": "kΩ", "C1_value": "nF"},
+    ),
+    "555_timer_astable": (
+        {"frequency": "Hz"}, compute_555_astable_arrays, {"R1_value": "kΩ", "R2_value": "kΩ", "C1_value": "µF"},
+    ),
+}
+
+_NUMBER_RE = re.compile(r"^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*([a-zA-ZµΩ]*)\s*$")
+
+
+class SweepError(ValueError):
+    """The sweep request is malformed or too large."""
+
+
+def _number(name: str, value: Any) -> float:
+    """12, "12" or "12V" → 12.0 (a trailing unit is ignored, as the scalar calculators do)."""
+    if isinstance(value, bool):
+        raise SweepError(f"'{name}': expected a number, got {value!r}")
+    if isinstance(value, (int, float)):
+        return float(value)
+    m = _NUMBER_RE.match(value) if isinstance(value, str) else None
+    if m is None:
+        raise SweepError(f"'{name}': expected a number, got {value!r}")
+    return float(m.group(1))
+
+
+def _axis(name: str, value: Any) -> np.ndarray:
+    """The values one input takes: a 1-element array when it is fixed."""
+    if isinstance(value, list):
+        if not value:
+            raise SweepError(f"'{name}': empty list")
+        return np.array([_number(name, v) for v in value])
+    if isinstance(value, dict):
+        try:
+            start, stop = _number(name, value["start"]), _number(name, value["stop"])
+            num = int(value["num"])
+        except KeyError as e:
+            raise SweepError(f"'{name}': range needs {e.args[0]!r}")
+        except (TypeError, ValueError):
+            raise SweepError(f"'{name}': 'num' must be an integer")
+        if not 1 <= num <= SWEEP_MAX_POINTS:
+            raise SweepError(f"'{name}': 'num' must be between 1 and {SWEEP_MAX_POINTS}")
+        scale = value.get("scale", "linear")
+        if scale == "log":
+            if start <= 0 or stop <= 0:
+                raise SweepError(f"'{name}': a log range needs positive start and stop")
+            return np.geomspace(start, stop, num)
+        if scale != "linear":
+            raise SweepError(f"'{name}': scale must be 'linear' or 'log'")
+        return np.linspace(start, stop, num)
+    return np.array([_number(name, value)])
+
+
+def run_sweep(circuit_type: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compute the value table for `circuit_type` over `params`.
+    Returns {"circuit_type", "points", "swept", "columns": {name: 1-D array},
+    "constants": {name: float}, "units", "invalid": index array, "seconds"};
+    inputs come first in "columns", and values that do not change across
+    the sweep are reported once under "constants" instead. Invalid points
+    (e.g. Vout >= Vin) are NaN in every output column.
+    """
+    if circuit_type not in SWEEPS:
+        raise SweepError(f"Cannot sweep '{circuit_type}' (sweepable: {', '.join(sorted(SWEEPS))})")
+    inputs, calculate, output_units = SWEEPS[circuit_type]
+    unknown = set(params) - set(inputs)
+    missing = [name for name in inputs if name not in params]
+    if unknown:
+        raise SweepError(f"Unknown input(s) for {circuit_type}: {', '.join(sorted(unknown))}")
+    if missing:
+        raise SweepError(f"Missing input(s) for {circuit_type}: {', '.join(missing)}")
+
+    started = time.perf_counter()
+    axes = {name: _axis(name, params[name]) for name in inputs}
+    points = int(np.prod([len(a) for a in axes.values()], dtype=np.int64))
+    if points > SWEEP_MAX_POINTS:
+        raise SweepError(f"Too many points ({points} > {SWEEP_MAX_POINTS})")
+
+    # Cartesian product as broadcast views, first input slowest
+    grids = np.meshgrid(*axes.values(), indexing="ij", sparse=True)
+    shape = tuple(len(a) for a in axes.values())
+    values = {name: np.broadcast_to(g, shape) for name, g in zip(axes, grids)}
+    outputs = calculate(*values.values())
+
+    columns: Dict[str, np.ndarray] = {}
+    constants: Dict[str, float] = {}
+    for name, array in (*values.items(), *outputs.items()):
+        flat = np.broadcast_to(array, shape).reshape(-1)
+        if len(axes.get(name, ())) == 1 or (name not in axes and array.strides == (0,) * array.ndim):
+            constants[name] = float(flat[0])
+        else:
+            columns[name] = flat
+    invalid = np.flatnonzero(np.isnan(np.broadcast_to(next(iter(outputs.values())), shape).reshape(-1)))
+    seconds = time.perf_counter() - started
+    observe_stage("sweep", circuit_type, seconds)
+    return {
+        "circuit_type": circuit_type,
+        "points": points,
+        "swept": [name for name, a in axes.items() if len(a) > 1],
+        "columns": columns,
+        "constants": constants,
+        "units": {**inputs, **output_units},
+        "invalid": invalid,
+        "seconds": round(seconds, 6),
+    }
+
+
+def point_value(sweep: Dict[str, Any], name: str, index: int) -> float:
+    if name in sweep["columns"]:
+        return float(sweep["columns"][name][index])
+    return sweep["constants"][name]
+
+
+def point_specs(sweep: Dict[str, Any], indices: List[int]) -> List[Dict[str, Any]]:
+    """CircuitSpec dicts (inputs formatted as the calculators expect) for the chosen points."""
+    if len(indices) > SWEEP_MAX_GENERATE:
+        raise SweepError(f"Too many points to generate ({len(indices)} > {SWEEP_MAX_GENERATE})")
+    inputs = SWEEPS[sweep["circuit_type"]][0]
+    specs = []
+    for index in indices:
+        if isinstance(index, bool) or not isinstance(index, int) or not 0 <= index < sweep["points"]:
+            raise SweepError(f"Point index {index!r} is out of range (0..{sweep['points'] - 1})")
+        specs.append({"circuit_type": sweep["circuit_type"],
+                      **{name: f"{point_value(sweep, name, index):.10g}" for name in inputs}})
+    return specs
+
+
+def sweep_json(sweep: Dict[str, Any]) -> Dict[str, Any]:
+    """The sweep as plain JSON types, with null for the outputs of invalid points."""
+    outputs = SWEEPS[sweep["circuit_type"]][2]
+    invalid = sweep["invalid"].tolist()
+    columns = {}
+    for name, array in sweep["columns"].items():
+        column = array.tolist()
+        if name in outputs:
+            for i in invalid:
+                column[i] = None
+        columns[name] = column
+    constants = {name: None if np.isnan(value) else value for name, value in sweep["constants"].items()}
+    return {**sweep, "columns": columns, "constants": constants, "invalid": len(invalid)}
+
+
+def _csv_cell(value: float) -> str:
+    return "" if value != value else repr(value)
+
+
+def iter_csv(sweep: Dict[str, Any], rows: int = 65536) -> Iterator[str]:
+    """The sweep table as CSV (constants included as columns), in chunks of `rows` rows."""
+    names = [*sweep["columns"], *sweep["constants"]]
+    yield ",".join(f"{name} ({sweep['units'][name]})" for name in names) + "\n"
+    for start in range(0, sweep["points"], rows):
+        stop = min(start + rows, sweep["points"])
+        cells = [
+            map(_csv_cell, sweep["columns"][name][start:stop].tolist()) if name in sweep["columns"]
+            else itertools.repeat(_csv_cell(sweep["constants"][name]), stop - start)
+            for name in names
+        ]
+        yield "\n".join(map(",".join, zip(*cells))) + "\n"
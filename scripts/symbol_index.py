@@ -0,0 +1,360 @@
+# scripts/symbol_index.py
+"""
+Index of the KiCad symbol libraries (.kicad_sym): library → symbol → pins,
+with `extends` aliases resolved, pickled so it loads in milliseconds.
+
+  $ python -m scripts.symbol_index build [--dir /usr/share/kicad/symbols] [--out cache/symbol_index.pkl]
+  $ python -m scripts.symbol_index lookup Device:R
+  $ python -m scripts.symbol_index stats
+"""
+
+import os
+import sys
+import time
+import pickle
+import difflib
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from scripts.sexpr import parse_sexpr, find, find_all
+
+log = logging.getLogger(__name__)
+
+# Bump when the pickled layout changes
+INDEX_VERSION = 1
+
+# Where KiCad installs its symbol libraries (first existing ones are used)
+DEFAULT_SYMBOL_DIRS = [
+    "/Applications/KiCad/KiCad.app/Contents/SharedSupport/symbols",
+    "/usr/share/kicad/symbols",
+    "C:/Program Files/KiCad/share/kicad/symbols",
+    "C:/Program Files (x86)/KiCad/share/kicad/symbols",
+]
+SYMBOL_DIR_ENV_VARS = ["KICAD_SYMBOL_DIR", "KICAD8_SYMBOL_DIR", "KICAD7_SYMBOL_DIR", "KICAD6_SYMBOL_DIR"]
+
+# (number, name, electrical type); unnamed pins ("~") have name ""
+Pin = Tuple[str, str, str]
+
+
+class SymbolNotFound(LookupError):
+    """
+    Raised when a library or symbol is not in the index; `suggestions`
+    holds "lib:symbol" close matches.
+    """
+
+    def __init__(self, message: str, suggestions: Optional[List[str]] = None):
+        self.suggestions = suggestions or []
+        if self.suggestions:
+            message += f" (did you mean: {', '.join(self.suggestions)}?)"
+        super().__init__(message)
+
+
+def symbol_dirs() -> List[str]:
+    """
+    Directories to index: SYMBOL_INDEX_DIRS (os.pathsep separated) if set,
+    otherwise the KICAD*_SYMBOL_DIR variables and the usual install paths.
+    """
+    explicit = os.getenv("SYMBOL_INDEX_DIRS")
+    if explicit:
+        candidates = explicit.split(os.pathsep)
+    else:
+        candidates = [os.getenv(var, "") for var in SYMBOL_DIR_ENV_VARS] + DEFAULT_SYMBOL_DIRS
+    dirs = []
+    for d in candidates:
+        if d and os.path.isdir(d) and os.path.realpath(d) not in map(os.path.realpath, dirs):
+            dirs.append(d)
+    return dirs
+
+
+def library_files(dirs: List[str]) -> Dict[str, Path]:
+    """library name → .kicad_sym path; earlier directories win."""
+    files: Dict[str, Path] = {}
+    for d in dirs:
+        for path in sorted(Path(d).glob("*.kicad_sym")):
+            files.setdefault(path.stem, path)
+    return files
+
+
+def _fingerprint(path: Path) -> Tuple[int, int]:
+    st = path.stat()
+    return st.st_size, st.st_mtime_ns
+
+
+def _collect_pins(node: List[Any], pins: Dict[str, Pin]) -> None:
+    for pin in find_all(node, "pin"):
+        number = find(pin, "number")
+        if number is None or len(number) < 2:
+            continue
+        name = find(pin, "name")
+        name = name[1] if name is not None and len(name) > 1 else ""
+        # De Morgan / multi-unit variants repeat pins; keep the first
+        pins.setdefault(number[1], (number[1], "" if name == "~" else name, pin[1] if len(pin) > 1 else ""))
+    for unit in find_all(node, "symbol"):
+        _collect_pins(unit, pins)
+
+
+def parse_symbol_library(path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Read one .kicad_sym file into {symbol: {"pins": (Pin, ...), "footprint",
+    "extends"}}. Symbols that `extends` another take its pins.
+    """
+    root = parse_sexpr(Path(path).read_text(encoding="utf-8"))
+    symbols: Dict[str, Dict[str, Any]] = {}
+    for node in find_all(root, "symbol"):
+        if len(node) < 2:
+            continue
+        pins: Dict[str, Pin] = {}
+        _collect_pins(node, pins)
+        footprint = ""
+        for prop in find_all(node, "property"):
+            if len(prop) > 2 and prop[1] == "Footprint":
+                footprint = prop[2]
+        extends = find(node, "extends")
+        symbols[node[1]] = {
+            "pins": tuple(pins.values()),
+            "footprint": footprint,
+            "extends": extends[1] if extends is not None and len(extends) > 1 else None,
+        }
+
+    # Resolve aliases (possibly chained) to their base symbol's pins
+    for name, entry in symbols.items():
+        base, seen = entry, {name}
+        while base["extends"] and not base["pins"] and base["extends"] in symbols and base["extends"] not in seen:
+            seen.add(base["extends"])
+            base = symbols[base["extends"]]
+        if not entry["pins"]:
+            entry["pins"] = base["pins"]
+        if not entry["footprint"]:
+            entry["footprint"] = base["footprint"]
+    return symbols
+
+
+class SymbolIndex:
+    """
+    In-memory index of every indexed library. Lookups are dictionary hits;
+    misses raise SymbolNotFound with close-match suggestions.
+    """
+
+    def __init__(self, libraries: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+                 fingerprints: Optional[Dict[str, Tuple[str, int, int]]] = None):
+        self.libraries = libraries or {}
+        # library → (path, size, mtime_ns) at the time it was indexed
+        self.fingerprints = fingerprints or {}
+        self._lower: Optional[Dict[str, List[Tuple[str, str]]]] = None
+
+    # ─ building / persistence ─────────────────────────────────────
+    @classmethod
+    def build(cls, dirs: List[str], previous: Optional["SymbolIndex"] = None) -> "SymbolIndex":
+        """
+        Index every library under `dirs`. Libraries whose file is unchanged
+        since `previous` was built are reused rather than re-parsed.
+        """
+        libraries, fingerprints = {}, {}
+        for lib, path in library_files(dirs).items():
+            fp = (str(path), *_fingerprint(path))
+            if previous is not None and previous.fingerprints.get(lib) == fp:
+                libraries[lib] = previous.libraries[lib]
+            else:
+                try:
+                    libraries[lib] = parse_symbol_library(path)
+                except (OSError, ValueError) as e:
+                    log.warning("Skipping symbol library %s: %s", path, e)
+                    continue
+            fingerprints[lib] = fp
+        return cls(libraries, fingerprints)
+
+    def is_stale(self, dirs: List[str]) -> bool:
+        """True if any library was added, removed or modified since indexing."""
+        files = library_files(dirs)
+        if set(files) != set(self.fingerprints):
+            return True
+        try:
+            return any(self.fingerprints[lib] != (str(path), *_fingerprint(path)) for lib, path in files.items())
+        except OSError:
+            return True
+
+    def save(self, path: str) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            pickle.dump(
+                {"version": INDEX_VERSION, "libraries": self.libraries, "fingerprints": self.fingerprints},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["SymbolIndex"]:
+        """Load a saved index, or None if missing, unreadable or outdated."""
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+            return None
+        return cls(data["libraries"], data["fingerprints"])
+
+    # ─ lookups ────────────────────────────────────────────────────
+    def has_library(self, lib: str) -> bool:
+        return lib in self.libraries
+
+    def get(self, lib: str, name: str) -> Optional[Dict[str, Any]]:
+        """Like lookup, but returns None on a miss (no suggestions computed)."""
+        return self.libraries.get(lib, {}).get(name)
+
+    def lookup(self, lib: str, name: str) -> Dict[str, Any]:
+        """
+        Return {"pins", "footprint", "extends"} for lib:name.
+        Raises SymbolNotFound with suggestions on a miss.
+        """
+        symbols = self.libraries.get(lib)
+        if symbols is None:
+            # Suggest where a symbol of that name does live
+            raise SymbolNotFound(f"Unknown symbol library '{lib}' for '{name}'", self.suggest(name))
+        entry = symbols.get(name)
+        if entry is None:
+            raise SymbolNotFound(f"Unknown symbol '{lib}:{name}'", self.suggest(name, lib))
+        return entry
+
+    def pins(self, lib: str, name: str) -> Tuple[Pin, ...]:
+        return self.lookup(lib, name)["pins"]
+
+    def find(self, name: str) -> Optional[Tuple[str, str]]:
+        """
+        Find a symbol by name in any library (case-insensitive); returns
+        (lib, symbol) or None. An exact-case match wins.
+        """
+        matches = self._lowered().get(name.lower(), [])
+        for lib, symbol in matches:
+            if symbol == name:
+                return lib, symbol
+        return matches[0] if matches else None
+
+    def suggest(self, name: str, lib: Optional[str] = None, n: int = 5) -> List[str]:
+        """
+        Close matches for `name` as "lib:symbol", from `lib` first and then
+        from every library.
+        """
+        out: List[str] = []
+        if lib in self.libraries:
+            out += [f"{lib}:{s}" for s in difflib.get_close_matches(name, list(self.libraries[lib]), n=n)]
+        if len(out) < n:
+            lowered = self._lowered()
+            for key in difflib.get_close_matches(name.lower(), list(lowered), n=n, cutoff=0.75):
+                out += [f"{l}:{s}" for l, s in lowered[key] if f"{l}:{s}" not in out]
+        return out[:n]
+
+    def _lowered(self) -> Dict[str, List[Tuple[str, str]]]:
+        if self._lower is None:
+            lower: Dict[str, List[Tuple[str, str]]] = {}
+            for lib in sorted(self.libraries):
+                for symbol in self.libraries[lib]:
+                    lower.setdefault(symbol.lower(), []).append((lib, symbol))
+            self._lower = lower
+        return self._lower
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "libraries": len(self.libraries),
+            "symbols": sum(len(s) for s in self.libraries.values()),
+            "pins": sum(len(e["pins"]) for s in self.libraries.values() for e in s.values()),
+        }
+
+
+SYMBOL_INDEX_PATH = os.getenv("SYMBOL_INDEX_PATH", "./cache/symbol_index.pkl")
+SYMBOL_INDEX_CHECK_INTERVAL = float(os.getenv("SYMBOL_INDEX_CHECK_INTERVAL", "30"))
+
+_index: Optional[SymbolIndex] = None
+_index_checked = 0.0
+_index_lock = threading.Lock()
+
+
+def get_symbol_index() -> SymbolIndex:
+    """
+    Return the process-wide symbol index: loaded from SYMBOL_INDEX_PATH,
+    and rebuilt (changed libraries only) and re-saved when the library
+    files change. Staleness is checked at most every
+    SYMBOL_INDEX_CHECK_INTERVAL seconds.
+    """
+    global _index, _index_checked
+    with _index_lock:
+        now = time.monotonic()
+        if _index is not None and now - _index_checked < SYMBOL_INDEX_CHECK_INTERVAL:
+            return _index
+        _index_checked = now
+
+        if _index is None:
+            _index = SymbolIndex.load(SYMBOL_INDEX_PATH)
+        dirs = symbol_dirs()
+        if _index is None or _index.is_stale(dirs):
+            _index = SymbolIndex.build(dirs, previous=_index)
+            try:
+                _index.save(SYMBOL_INDEX_PATH)
+            except OSError as e:
+                log.warning("Could not save symbol index to %s: %s", SYMBOL_INDEX_PATH, e)
+        return _index
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = ap.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="(re)build the index from the .kicad_sym libraries")
+    build.add_argument("--dir", action="append", dest="dirs", help="symbol directory (repeatable)")
+    build.add_argument("--out", default=SYMBOL_INDEX_PATH)
+    build.add_argument("--full", action="store_true", help="re-parse every library, even unchanged ones")
+    lookup = sub.add_parser("lookup", help="show the pins of LIB:SYMBOL")
+    lookup.add_argument("symbol")
+    lookup.add_argument("--index", default=SYMBOL_INDEX_PATH)
+    stats = sub.add_parser("stats", help="summarize a saved index")
+    stats.add_argument("--index", default=SYMBOL_INDEX_PATH)
+    args = ap.parse_args(argv)
+
+    if args.command == "build":
+        dirs = args.dirs or symbol_dirs()
+        if not dirs:
+            print("No KiCad symbol directories found; pass --dir or set SYMBOL_INDEX_DIRS.")
+            return 1
+        started = time.perf_counter()
+        previous = None if args.full else SymbolIndex.load(args.out)
+        index = SymbolIndex.build(dirs, previous=previous)
+        index.save(args.out)
+        s = index.stats()
+        print(f"Indexed {s['libraries']} libraries, {s['symbols']} symbols, {s['pins']} pins "
+              f"in {time.perf_counter() - started:.2f}s → {args.out}")
+        return 0
+
+    index = SymbolIndex.load(args.index)
+    if index is None:
+        print(f"No symbol index at {args.index}; run: python -m scripts.symbol_index build")
+        return 1
+    if args.command == "stats":
+        for key, value in index.stats().items():
+            print(f"{key}: {value}")
+        return 0
+
+    lib, _, name = args.symbol.partition(":")
+    try:
+        if not name:
+            # Bare symbol name: search every library
+            found = index.find(lib)
+            if found is None:
+                raise SymbolNotFound(f"Unknown symbol '{lib}'", index.suggest(lib))
+            lib, name = found
+        entry = index.lookup(lib, name)
+    except SymbolNotFound as e:
+        print(e)
+        return 1
+    print(f"footprint: {entry['footprint'] or '-'}" + (f"  (extends {entry['extends']})" if entry["extends"] else ""))
+    for number, pin_name, etype in entry["pins"]:
+        print(f"  {number:>4}  {pin_name or '~':<16} {etype}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,12 @@
 # scripts/template_matcher.py
 
-import os
-import json
-from typing import Dict, Any
-from scripts.utils import load_json, replace_placeholders
+import logging
+import numpy as np
+from typing import Dict, Any, Optional, Set, Tuple
+from scripts.utils import compile_placeholders
+from scripts.template_registry import get_template_registry
+
+log = logging.getLogger(__name__)
 
 
 def compute_divider_R2_value(Vin: str, Vout: str) -> str:
@@ -125,20 +128,68 @@ def compute_comparator_values(th_high: str, th_low: str, supply: str) -> Dict[st
     return {"R1_value": "10", "R2_value": "10"}
 
 
-def match_and_fill_template(spec: Any) -> Dict[str, Any]:
+# ───────────────────────────────────────────────────────────────
+# Array versions of the calculators above, for design-space sweeps:
+# the same formulas and rounding over whole NumPy arrays (any shapes
+# that broadcast). Points the scalar version would reject come out NaN.
+# ───────────────────────────────────────────────────────────────
+def compute_divider_R2_array(Vin, Vout) -> np.ndarray:
+    """R2 in kΩ for a 10k R1 divider, for every (Vin, Vout) pair; NaN where Vout >= Vin."""
+    vin, vout = np.asarray(Vin, dtype=float), np.asarray(Vout, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2_k = np.round(10.0 * vout / (vin - vout), 2)
+    return np.where(vout < vin, r2_k, np.nan)
+
+
+def _positive(x) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return np.where(x > 0, x, np.nan)
+
+
+def compute_low_pass_arrays(cutoff_khz) -> Dict[str, np.ndarray]:
+    """{"R1_value": kΩ, "C1_value": nF} for an RC low-pass with C1 = 10 nF."""
+    f_hz = _positive(cutoff_khz) * 1e3
+    r1_k = np.round(1.0 / (2 * np.pi * f_hz * 10e-9) / 1e3, 2)
+    return {"R1_value": r1_k, "C1_value": np.broadcast_to(10.0, r1_k.shape)}
+
+
+def compute_high_pass_arrays(cutoff_khz) -> Dict[str, np.ndarray]:
+    """{"R1_value": kΩ, "C1_value": nF} for an RC high-pass with R1 = 10 kΩ."""
+    f_hz = _positive(cutoff_khz) * 1e3
+    c1_n = np.round(1.0 / (2 * np.pi * f_hz * 10e3) * 1e9, 2)
+    return {"R1_value": np.broadcast_to(10.0, c1_n.shape), "C1_value": c1_n}
+
+
+def compute_555_astable_arrays(freq_hz) -> Dict[str, np.ndarray]:
+    """{"R1_value", "R2_value": kΩ, "C1_value": µF} for a 50% duty 555 astable with C1 = 0.01 µF."""
+    r_k = np.round(1.44 / (3 * _positive(freq_hz) * 0.01e-6) / 1e3, 2)
+    return {"R1_value": r_k, "R2_value": r_k, "C1_value": np.broadcast_to(0.01, r_k.shape)}
+
+
+def match_and_fill_template(spec: Any, template: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Fill the template for spec.circuit_type (see fill_template) and return
+    the filled JSON. Unresolved placeholders are reported as a warning.
     """
-    1) Load JSON template from ./templates/<circuit_type>.json
+    filled, unresolved = fill_template(spec, template)
+    if unresolved:
+        log.warning("Unresolved placeholders in '%s': %s", spec.circuit_type, ", ".join(sorted(unresolved)))
+    return filled
+
+
+def fill_template(spec: Any, template: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], Set[str]]:
+    """
+    1) Take the pre-compiled template for <circuit_type> from the registry
+       (or compile an explicitly passed `template`)
     2) Build values dict from spec fields
     3) Compute any derived placeholder values (e.g. R2_value, filter caps, etc.)
-    4) Recursively replace placeholders
-    5) Return the filled JSON
+    4) Fill placeholders in one flat pass
+    5) Return (filled JSON, names of placeholders left unresolved)
     """
-    template_dir = os.getenv("KICAD_TEMPLATE_PATH", "./templates")
-    template_path = os.path.join(template_dir, f"{spec.circuit_type}.json")
-    if not os.path.exists(template_path):
-        raise FileNotFoundError(f"Template not found for '{spec.circuit_type}'")
-
-    template = load_json(template_path)
+    if template is None:
+        compiled = get_template_registry().get(spec.circuit_type).compiled
+    else:
+        compiled = compile_placeholders(template)
 
     # Build placeholder→value mapping
     values: Dict[str, str] = {}
@@ -230,6 +281,5 @@ def match_and_fill_template(spec: Any) -> Dict[str, Any]:
     # Bridge rectifier & voltage_multiplier & microcontroller_board only substitute placeholders
     # No numeric computations needed.
 
-    # Finally, replace placeholders in the entire template
-    filled = replace_placeholders(template, values)
-    return filled
+    # Finally, fill every placeholder slot of the compiled template
+    return compiled.fill(values)
@@ -0,0 +1,179 @@
+# scripts/template_registry.py
+
+import os
+import json
+import time
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from scripts.utils import compile_placeholders
+
+
+class TemplateError(Exception):
+    """Raised for a template file that is missing, unreadable or malformed."""
+
+
+def validate_template(data: Any, circuit_type: str) -> None:
+    """
+    Structural checks on a template: circuit_type matches the file name and
+    every component/connection carries the keys the generators rely on.
+    Raises TemplateError describing the first problem found.
+    """
+    if not isinstance(data, dict):
+        raise TemplateError("template must be a JSON object")
+    if data.get("circuit_type") != circuit_type:
+        raise TemplateError(f"circuit_type '{data.get('circuit_type')}' does not match file name '{circuit_type}'")
+
+    components = data.get("components")
+    if not isinstance(components, list) or not components:
+        raise TemplateError("'components' must be a non-empty list")
+    refs = set()
+    for i, comp in enumerate(components):
+        if not isinstance(comp, dict) or "ref" not in comp or "type" not in comp:
+            raise TemplateError(f"components[{i}] needs 'ref' and 'type'")
+        if comp["ref"] in refs:
+            raise TemplateError(f"duplicate component ref '{comp['ref']}'")
+        refs.add(comp["ref"])
+
+    connections = data.get("connections", [])
+    if not isinstance(connections, list):
+        raise TemplateError("'connections' must be a list")
+    for i, conn in enumerate(connections):
+        if not isinstance(conn, dict) or not {"net", "from", "to"} <= set(conn):
+            raise TemplateError(f"connections[{i}] needs 'net', 'from' and 'to'")
+
+
+class CompiledTemplate:
+    """
+    A validated template held in memory, pre-tokenized for placeholder
+    filling (see utils.CompiledPlaceholders), with its slots listed up front.
+    """
+
+    def __init__(self, circuit_type: str, path: Path, mtime: float, data: Dict[str, Any]):
+        self.circuit_type = circuit_type
+        self.path = path
+        self.mtime = mtime
+        self.data = data
+        self.compiled = compile_placeholders(data)
+        self.slots = sorted(self.compiled.slot_names)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "circuit_type": self.circuit_type,
+            "description": self.data.get("description"),
+            "slots": self.slots,
+            "components": len(self.data.get("components", [])),
+            "connections": len(self.data.get("connections", [])),
+        }
+
+
+class TemplateRegistry:
+    """
+    Loads every templates/<circuit_type>.json once and serves them from
+    memory. A template whose file mtime changes is re-read on its next
+    lookup (stat'ed at most once per `check_interval` seconds); a broken
+    edit keeps the last good version and is recorded in `errors`.
+    """
+
+    def __init__(self, template_dir: str, check_interval: float = 1.0):
+        self.template_dir = Path(template_dir).resolve()
+        self.check_interval = check_interval
+        self.errors: Dict[str, str] = {}
+        self._templates: Dict[str, CompiledTemplate] = {}
+        self._checked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, circuit_type: str) -> Path:
+        return self.template_dir / f"{circuit_type}.json"
+
+    def _load(self, circuit_type: str) -> CompiledTemplate:
+        path = self._path(circuit_type)
+        try:
+            mtime = path.stat().st_mtime
+            data = json.loads(path.read_text())
+        except FileNotFoundError:
+            raise TemplateError(f"Template not found for '{circuit_type}'")
+        except (OSError, ValueError) as e:
+            raise TemplateError(f"{path.name}: {e}")
+        try:
+            validate_template(data, circuit_type)
+        except TemplateError as e:
+            raise TemplateError(f"{path.name}: {e}")
+        return CompiledTemplate(circuit_type, path, mtime, data)
+
+    def load_all(self) -> Dict[str, str]:
+        """
+        (Re)load every *.json in the template folder. Returns the errors
+        found, keyed by circuit_type.
+        """
+        templates, errors = {}, {}
+        for path in sorted(self.template_dir.glob("*.json")):
+            try:
+                templates[path.stem] = self._load(path.stem)
+            except TemplateError as e:
+                errors[path.stem] = str(e)
+        now = time.monotonic()
+        with self._lock:
+            self._templates = templates
+            self._checked = {ct: now for ct in templates}
+            self.errors = errors
+        return errors
+
+    def get(self, circuit_type: str) -> CompiledTemplate:
+        """
+        Return the compiled template, reloading it if its file changed.
+        Raises TemplateError if it does not exist or never loaded cleanly.
+        """
+        now = time.monotonic()
+        with self._lock:
+            current = self._templates.get(circuit_type)
+            due = current is None or now - self._checked.get(circuit_type, 0.0) >= self.check_interval
+            if due:
+                self._checked[circuit_type] = now
+        if not due:
+            return current
+
+        if current is not None:
+            try:
+                if self._path(circuit_type).stat().st_mtime == current.mtime:
+                    return current
+            except OSError:
+                return current
+
+        try:
+            fresh = self._load(circuit_type)
+        except TemplateError as e:
+            with self._lock:
+                self.errors[circuit_type] = str(e)
+            if current is not None:
+                return current
+            raise
+        with self._lock:
+            self._templates[circuit_type] = fresh
+            self.errors.pop(circuit_type, None)
+        return fresh
+
+    def circuit_types(self) -> List[str]:
+        with self._lock:
+            return sorted(self._templates)
+
+
+_registry: Optional[TemplateRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """
+    Return the process-wide registry for KICAD_TEMPLATE_PATH, loading all
+    templates on first use.
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            registry = TemplateRegistry(
+                os.getenv("KICAD_TEMPLATE_PATH", "./templates"),
+                check_interval=float(os.getenv("TEMPLATE_RELOAD_INTERVAL", "1.0")),
+            )
+            registry.load_all()
+            _registry = registry
+    return _registry
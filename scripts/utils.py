@@ -1,9 +1,14 @@
 # scripts/utils.py
 
 import os
+import re
 import json
+import time
+import uuid
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, List, Set, Tuple
+
+PLACEHOLDER_RE = re.compile(r"\{([^}]+)\}")
 
 def load_json(filepath: str) -> Dict[str, Any]:
     """
@@ -41,8 +46,84 @@ def replace_placeholders(obj: Any, values: Dict[str, str]) -> Any:
     else:
         return obj
 
+class CompiledPlaceholders:
+    """
+    A template pre-tokenized for placeholder substitution.
+
+    Compiling walks the template once and records, for every string that
+    contains a "{key}", its location (a path of dict keys / list indices)
+    and its segments: literal text and slot names alternating. Everything
+    else is frozen into a JSON skeleton. fill() rebuilds the structure from
+    the skeleton with json.loads (one C-level pass) and then writes each
+    slot string in a single flat loop, with no regex and no recursion.
+    """
+
+    def __init__(self, obj: Any):
+        self.slots: List[Tuple[Tuple[Any, ...], List[str]]] = []
+        self.slot_names: Set[str] = set()
+        self._skeleton = json.dumps(self._tokenize(obj, ()))
+
+    def _tokenize(self, node: Any, path: Tuple[Any, ...]) -> Any:
+        if isinstance(node, str):
+            # re.split with one group → [literal, key, literal, key, ..., literal]
+            segments = PLACEHOLDER_RE.split(node)
+            if len(segments) == 1:
+                return node
+            self.slots.append((path, segments))
+            self.slot_names.update(segments[1::2])
+            return None
+        if isinstance(node, dict):
+            return {k: self._tokenize(v, path + (k,)) for k, v in node.items()}
+        if isinstance(node, list):
+            return [self._tokenize(v, path + (i,)) for i, v in enumerate(node)]
+        return node
+
+    def fill(self, values: Dict[str, str]) -> Tuple[Any, Set[str]]:
+        """
+        Return (filled_copy, unresolved) where unresolved holds the slot
+        names missing from `values`. Missing slots keep their "{key}" text,
+        as replace_placeholders does.
+        """
+        out = json.loads(self._skeleton)
+        unresolved: Set[str] = set()
+        for path, segments in self.slots:
+            parts = segments[:]
+            for i in range(1, len(parts), 2):
+                key = parts[i]
+                if key in values:
+                    parts[i] = str(values[key])
+                else:
+                    unresolved.add(key)
+                    parts[i] = "{" + key + "}"
+            text = "".join(parts)
+            if not path:
+                return text, unresolved
+            target = out
+            for step in path[:-1]:
+                target = target[step]
+            target[path[-1]] = text
+        return out, unresolved
+
+
+def compile_placeholders(obj: Any) -> CompiledPlaceholders:
+    """
+    Pre-tokenize a template once so it can be filled many times with
+    CompiledPlaceholders.fill().
+    """
+    return CompiledPlaceholders(obj)
+
+
 def ensure_folder(path: str) -> None:
     """
     Create a folder (and parents) if it doesn’t exist.
     """
     Path(path).mkdir(parents=True, exist_ok=True)
+
+def output_location(spec: Any, suffix: str = ".net") -> Tuple[Path, str]:
+    """
+    Return (output dir, unique file name) for a new artifact of `spec`.
+    """
+    output_dir = Path(os.getenv("KICAD_OUTPUT_PATH", "./output")).resolve()
+    ensure_folder(str(output_dir))
+    timestamp = int(time.time())
+    return output_dir, f"{spec.circuit_type}_{timestamp}_{uuid.uuid4().hex[:8]}{suffix}"